@@ -17,6 +17,12 @@ from datetime import datetime
 import traceback
 import sys
 
+from eda_plots import render_eda_plots
+from flights_cleaning import clean_flights, clean_flights_out_of_core
+from flights_io import (DTYPES_FLIGHTS, memory_report, read_flights_dataset,
+                        read_flights_sampled, write_flights_dataset)
+from streaming_stats import SummaryStats, summarize_csv, summarize_dataset
+
 warnings.filterwarnings('ignore')
 sns.set_style('whitegrid')
 plt.rcParams['figure.figsize'] = (12, 6)
@@ -26,10 +32,24 @@ SEED = 42
 np.random.seed(SEED)
 print(f"Random seed configurado: {SEED}")
 
+# Fração amostrada de flights.csv (1.0 = dataset completo). A amostragem é
+# determinística por hash da chave do voo, não depende do seed global.
+SAMPLE_FRACTION = float(os.environ.get('EDA_SAMPLE_FRACTION', '0.1'))
+# Modo preview: plots em dpi baixo em docs/eda_plots/preview/ (iteração rápida)
+PLOT_PREVIEW = os.environ.get('EDA_PLOT_PREVIEW') == '1'
+# Estatísticas de passada única sobre o flights.csv completo (1 = liga): uma
+# leitura extra do CSV bruto inteiro, em paralelo por faixas de bytes
+FULL_STATS = os.environ.get('EDA_FULL_STATS', '0') == '1'
+# Limpeza out-of-core em duas passadas (memória limitada pelo bloco do CSV);
+# os plots usam então uma amostra de PLOT_SAMPLE_FRACTION do dataset limpo
+OUT_OF_CORE = os.environ.get('EDA_OUT_OF_CORE') == '1'
+PLOT_SAMPLE_FRACTION = float(os.environ.get('EDA_PLOT_SAMPLE_FRACTION', '0.1'))
+
 # Diretórios
 DATA_PATH = Path('./data')
 PLOTS_PATH = Path('./docs/eda_plots')
 PROCESSED_PATH = Path('./data/processed')
+CLEANED_PATH = PROCESSED_PATH / 'flights_cleaned.parquet'
 
 PLOTS_PATH.mkdir(parents=True, exist_ok=True)
 PROCESSED_PATH.mkdir(parents=True, exist_ok=True)
@@ -50,25 +70,17 @@ def main():
         print("Carregando airports.csv...")
         df_airports = pd.read_csv(DATA_PATH / 'airports.csv')
         
-        print("Carregando flights.csv (amostra de 10% com dtypes otimizados)...")
-        dtypes_flights = {
-            'YEAR': 'int16', 'MONTH': 'int8', 'DAY': 'int8', 'DAY_OF_WEEK': 'int8',
-            'AIRLINE': 'category', 'FLIGHT_NUMBER': 'int32', 'TAIL_NUMBER': 'category',
-            'ORIGIN_AIRPORT': 'category', 'DESTINATION_AIRPORT': 'category',
-            'SCHEDULED_DEPARTURE': 'int16', 'DEPARTURE_TIME': 'float32', 'DEPARTURE_DELAY': 'float32',
-            'TAXI_OUT': 'float32', 'WHEELS_OFF': 'float32', 'SCHEDULED_TIME': 'float32',
-            'ELAPSED_TIME': 'float32', 'AIR_TIME': 'float32', 'DISTANCE': 'int16',
-            'WHEELS_ON': 'float32', 'TAXI_IN': 'float32', 'SCHEDULED_ARRIVAL': 'int16',
-            'ARRIVAL_TIME': 'float32', 'ARRIVAL_DELAY': 'float32', 'DIVERTED': 'int8',
-            'CANCELLED': 'int8', 'CANCELLATION_REASON': 'category'
-        }
-        
-        df_flights = pd.read_csv(
-            DATA_PATH / 'flights.csv',
-            dtype=dtypes_flights,
-            skiprows=lambda i: i > 0 and np.random.random() > 0.1
-        )
-        print(f"Flights (amostra) carregado: {df_flights.shape}")
+        if OUT_OF_CORE:
+            print("Modo out-of-core: flights.csv é lido em blocos na FASE 2")
+        else:
+            print(f"Carregando flights.csv (amostra de {SAMPLE_FRACTION:.0%} por hash da chave do voo)...")
+            df_flights = read_flights_sampled(
+                DATA_PATH / 'flights.csv',
+                fraction=SAMPLE_FRACTION,
+                dtypes=DTYPES_FLIGHTS,
+            )
+            print(f"Flights (amostra) carregado: {df_flights.shape}")
+            memory_report(df_flights, "01_eda")
         
         print("✅ FASE 1 completada com sucesso\n")
         
@@ -77,103 +89,38 @@ def main():
         print("FASE 2: EXPLORAÇÃO & VALIDAÇÃO (LIMPEZA)")
         print("=" * 80)
 
-        rows_before = len(df_flights)
-        memory_before = df_flights.memory_usage(deep=True).sum() / 1024**2
-        transformations = []
-        
-        # 1. Tratamento de missing values e remoção de colunas esparsas
-        sparse_cols = ['CANCELLATION_REASON', 'AIR_SYSTEM_DELAY', 'SECURITY_DELAY', 
-                       'AIRLINE_DELAY', 'LATE_AIRCRAFT_DELAY', 'WEATHER_DELAY']
-        df_flights.drop(columns=sparse_cols, inplace=True, errors='ignore')
-        transformations.append({
-            'step': 1, 'name': 'Remoção de colunas com >80% missing', 
-            'action': f"Removido {len(sparse_cols)} colunas de atraso detalhado"
-        })
-
-        # 2. Imputação de dados contínuos com a média
-        for col in ['DEPARTURE_DELAY', 'ARRIVAL_DELAY', 'AIR_TIME', 'ELAPSED_TIME', 'TAXI_OUT', 'TAXI_IN']:
-            if col in df_flights.columns:
-                mean_val = df_flights[col].mean()
-                df_flights[col].fillna(mean_val, inplace=True)
-        transformations.append({
-            'step': 2, 'name': 'Imputação de valores nulos (Média)', 
-            'action': 'DEPARTURE_DELAY, ARRIVAL_DELAY, AIR_TIME, ELAPSED_TIME preenchidos com media'
-        })
-        
-        # 3. Remover valores nulos de data/hora categórica residual
-        df_flights.dropna(subset=['TAIL_NUMBER', 'DEPARTURE_TIME', 'ARRIVAL_TIME'], inplace=True)
-        transformations.append({
-            'step': 3, 'name': 'Remoção de nulos residuais', 
-            'rows_removed': rows_before - len(df_flights)
-        })
-        temp_len = len(df_flights)
-
-        # 4. Outliers detection (IQR in ArrDelay)
-        Q1 = df_flights['ARRIVAL_DELAY'].quantile(0.25)
-        Q3 = df_flights['ARRIVAL_DELAY'].quantile(0.75)
-        IQR = Q3 - Q1
-        lower_bound = Q1 - 3 * IQR
-        upper_bound = Q3 + 3 * IQR
-        df_flights_clean = df_flights[
-            (df_flights['ARRIVAL_DELAY'] >= lower_bound) & 
-            (df_flights['ARRIVAL_DELAY'] <= upper_bound)
-        ]
-        transformations.append({
-            'step': 4, 'name': 'Remoção de Outliers (IQR) em ARRIVAL_DELAY', 
-            'rows_removed': temp_len - len(df_flights_clean),
-            'bounds': [float(lower_bound), float(upper_bound)]
-        })
-        df_flights = df_flights_clean
-
-        # 5. Variáveis Derivadas (Datas e Categorias)
-        # Convertemos para str pra preencher zeros e entao pra data
-        df_flights['FlightDate'] = pd.to_datetime(
-            df_flights[['YEAR', 'MONTH', 'DAY']].rename(columns={'YEAR':'year', 'MONTH':'month', 'DAY':'day'})
-        )
-        
-        def categorize_delay(minutes):
-            if minutes <= 0: return 'On-time'
-            elif minutes <= 15: return 'Short (1-15 min)'
-            elif minutes <= 60: return 'Medium (16-60 min)'
-            else: return 'Long (>60 min)'
-            
-        df_flights['DelayCategory'] = df_flights['ARRIVAL_DELAY'].apply(categorize_delay)
-        df_flights['Hour'] = (df_flights['SCHEDULED_DEPARTURE'] // 100).astype('int8')
-        df_flights['IS_DELAYED'] = (df_flights['ARRIVAL_DELAY'] > 0).astype(int)
-        
-        def get_season(month):
-            if month in [12, 1, 2]: return 'Winter'
-            elif month in [3, 4, 5]: return 'Spring'
-            elif month in [6, 7, 8]: return 'Summer'
-            else: return 'Fall'
-            
-        df_flights['Season'] = df_flights['MONTH'].apply(get_season)
-        transformations.append({
-            'step': 5, 'name': 'Criação de Variáveis Derivadas', 
-            'action': 'Criado FlightDate, DelayCategory, Hour, Season, IS_DELAYED'
-        })
-        
-        # 6. Duplicatas
-        dup_count = df_flights.duplicated(subset=['FlightDate', 'FLIGHT_NUMBER', 'AIRLINE', 'ORIGIN_AIRPORT', 'DESTINATION_AIRPORT']).sum()
-        df_flights.drop_duplicates(subset=['FlightDate', 'FLIGHT_NUMBER', 'AIRLINE', 'ORIGIN_AIRPORT', 'DESTINATION_AIRPORT'], inplace=True)
-        transformations.append({
-            'step': 6, 'name': 'Remoção de Duplicatas', 
-            'rows_removed': int(dup_count)
-        })
-
-        rows_after = len(df_flights)
-        memory_after = df_flights.memory_usage(deep=True).sum() / 1024**2
-
-        transformation_log = {
-            'timestamp': datetime.now().isoformat(),
-            'total_rows_before': rows_before,
-            'total_rows_after': rows_after,
-            'memory_before_mb': memory_before,
-            'memory_after_mb': memory_after,
-            'transformations': transformations
-        }
+        # Passos de limpeza em src/flights_cleaning.py: colunas esparsas, imputação
+        # pela média, nulos residuais, outliers 3×IQR, derivadas e duplicatas
+        if OUT_OF_CORE:
+            print(f"Limpeza out-of-core em duas passadas → {CLEANED_PATH}/ ...")
+            transformation_log = clean_flights_out_of_core(
+                DATA_PATH / 'flights.csv', CLEANED_PATH, fraction=SAMPLE_FRACTION,
+            )
+            rows_before = transformation_log['total_rows_before']
+            rows_after = transformation_log['total_rows_after']
+            # Plots usam uma amostra por hash do dataset limpo
+            print(f"Lendo amostra de {PLOT_SAMPLE_FRACTION:.0%} do dataset limpo para os plots...")
+            df_flights = read_flights_dataset(CLEANED_PATH, fraction=PLOT_SAMPLE_FRACTION)
+        else:
+            rows_before = len(df_flights)
+            memory_before = df_flights.memory_usage(deep=True).sum() / 1024**2
+            df_flights, transformations = clean_flights(df_flights)
+            rows_after = len(df_flights)
+            memory_after = df_flights.memory_usage(deep=True).sum() / 1024**2
+
+            transformation_log = {
+                'timestamp': datetime.now().isoformat(),
+                'total_rows_before': rows_before,
+                'total_rows_after': rows_after,
+                'memory_before_mb': memory_before,
+                'memory_after_mb': memory_after,
+                'transformations': transformations
+            }
         with open(PROCESSED_PATH / 'transformation_log.json', 'w') as f:
             json.dump(transformation_log, f, indent=2)
+        for t in transformation_log['transformations']:
+            if 'rows_removed' in t:
+                print(f"  Passo {t['step']} ({t['name']}): {t['rows_removed']:,} linhas removidas")
 
         print("✅ FASE 2 completada com sucesso\n")
         
@@ -182,160 +129,29 @@ def main():
         print("FASE 3: VISUALIZAÇÕES & INSIGHTS (8-10 UNIVARIATE / BIVARIATE)")
         print("=" * 80)
         
-        # UNIVARIADAS
-        # 01. Histograma ArrDelay
-        fig, ax = plt.subplots(figsize=(10, 5))
-        sns.histplot(df_flights['ARRIVAL_DELAY'], bins=50, kde=True, ax=ax, color='steelblue')
-        ax.set_title('01. Distribution of Arrival Delays (Cleaned)')
-        plt.savefig(PLOTS_PATH / '01_arr_delay_distribution.png', bbox_inches='tight', dpi=300)
-        plt.close()
-        
-        # 02. Histograma DepDelay
-        fig, ax = plt.subplots(figsize=(10, 5))
-        sns.histplot(df_flights['DEPARTURE_DELAY'], bins=50, kde=True, ax=ax, color='coral')
-        ax.set_title('02. Distribution of Departure Delays')
-        plt.savefig(PLOTS_PATH / '02_dep_delay_distribution.png', bbox_inches='tight', dpi=300)
-        plt.close()
-
-        # 03. Histograma Distance
-        fig, ax = plt.subplots(figsize=(10, 5))
-        sns.histplot(df_flights['DISTANCE'], bins=50, ax=ax, color='green')
-        ax.set_title('03. Distribution of Flight Distances')
-        plt.savefig(PLOTS_PATH / '03_distance_distribution.png', bbox_inches='tight', dpi=300)
-        plt.close()
-        
-        # 04. Airtime Distribution
-        fig, ax = plt.subplots(figsize=(10, 5))
-        sns.histplot(df_flights['AIR_TIME'], bins=50, ax=ax, color='purple')
-        ax.set_title('04. Distribution of Air Time')
-        plt.savefig(PLOTS_PATH / '04_airtime_distribution.png', bbox_inches='tight', dpi=300)
-        plt.close()
-
-        # 05. Top 10 Airlines Barplot
-        fig, ax = plt.subplots(figsize=(10, 5))
-        top_airlines = df_flights['AIRLINE'].value_counts().head(10)
-        sns.barplot(x=top_airlines.values, y=top_airlines.index, palette='viridis')
-        ax.set_title('05. Top 10 Airlines by Flight Count')
-        plt.savefig(PLOTS_PATH / '05_top_airlines.png', bbox_inches='tight', dpi=300)
-        plt.close()
-
-        # 06. Top 10 Origin Airports
-        fig, ax = plt.subplots(figsize=(10, 5))
-        top_origin = df_flights['ORIGIN_AIRPORT'].value_counts().head(10)
-        sns.barplot(x=top_origin.values, y=top_origin.index, palette='magma')
-        ax.set_title('06. Top 10 Origin Airports')
-        plt.savefig(PLOTS_PATH / '06_top_origins.png', bbox_inches='tight', dpi=300)
-        plt.close()
-
-        # 07. Top 10 Dest Airports
-        fig, ax = plt.subplots(figsize=(10, 5))
-        top_dest = df_flights['DESTINATION_AIRPORT'].value_counts().head(10)
-        sns.barplot(x=top_dest.values, y=top_dest.index, palette='magma')
-        ax.set_title('07. Top 10 Destination Airports')
-        plt.savefig(PLOTS_PATH / '07_top_dests.png', bbox_inches='tight', dpi=300)
-        plt.close()
-
-        # 08. Boxplot ArrDelay
-        fig, ax = plt.subplots(figsize=(10, 5))
-        sns.boxplot(x=df_flights['ARRIVAL_DELAY'], color='lightblue')
-        ax.set_title('08. Boxplot of Arrival Delays (Outliers Managed)')
-        plt.savefig(PLOTS_PATH / '08_arrdelay_boxplot.png', bbox_inches='tight', dpi=300)
-        plt.close()
-        
-        # 09. Delay Category Pie Chart
-        fig, ax = plt.subplots(figsize=(8, 8))
-        delay_cats = df_flights['DelayCategory'].value_counts()
-        ax.pie(delay_cats, labels=delay_cats.index, autopct='%1.1f%%', startangle=90)
-        ax.set_title('09. Delay Categories Proportion')
-        plt.savefig(PLOTS_PATH / '09_delay_category_pie.png', bbox_inches='tight', dpi=300)
-        plt.close()
-
-        # 10. Season Distribution
-        fig, ax = plt.subplots(figsize=(10, 5))
-        season_counts = df_flights['Season'].value_counts()
-        sns.barplot(x=season_counts.index, y=season_counts.values, palette='coolwarm')
-        ax.set_title('10. Flights by Season')
-        plt.savefig(PLOTS_PATH / '10_season_distribution.png', bbox_inches='tight', dpi=300)
-        plt.close()
-
-        # BIVARIADAS
-        # 11. Heatmap de Correlações
-        numeric_cols = ['ARRIVAL_DELAY', 'DEPARTURE_DELAY', 'DISTANCE', 'AIR_TIME', 'TAXI_OUT', 'TAXI_IN']
-        corr = df_flights[numeric_cols].corr()
-        fig, ax = plt.subplots(figsize=(10, 8))
-        sns.heatmap(corr, annot=True, cmap='coolwarm', fmt=".2f", ax=ax, square=True)
-        ax.set_title('11. Correlation Matrix')
-        plt.savefig(PLOTS_PATH / '11_correlation_matrix.png', bbox_inches='tight', dpi=300)
-        plt.close()
-        
-        # 12. Distance vs ArrDelay
-        fig, ax = plt.subplots(figsize=(10, 5))
-        sns.scatterplot(x='DISTANCE', y='ARRIVAL_DELAY', data=df_flights.sample(10000), alpha=0.3, ax=ax)
-        ax.set_title('12. Distance vs Arrival Delay')
-        plt.savefig(PLOTS_PATH / '12_distance_vs_arrdelay.png', bbox_inches='tight', dpi=300)
-        plt.close()
-
-        # 13. DepDelay vs ArrDelay
-        fig, ax = plt.subplots(figsize=(10, 5))
-        sns.scatterplot(x='DEPARTURE_DELAY', y='ARRIVAL_DELAY', data=df_flights.sample(10000), alpha=0.3, ax=ax, color='red')
-        ax.set_title('13. Departure Delay vs Arrival Delay (High Corr)')
-        plt.savefig(PLOTS_PATH / '13_depdelay_vs_arrdelay.png', bbox_inches='tight', dpi=300)
-        plt.close()
-
-        # 14. ArrDelay by Airline Boxplot
-        fig, ax = plt.subplots(figsize=(14, 6))
-        sns.boxplot(x='AIRLINE', y='ARRIVAL_DELAY', data=df_flights, ax=ax)
-        ax.set_title('14. Arrival Delay Distribution by Airline')
-        plt.savefig(PLOTS_PATH / '14_arrdelay_by_airline_boxplot.png', bbox_inches='tight', dpi=300)
-        plt.close()
-
-        # 15. Average Delay by Day Of Week
-        fig, ax = plt.subplots(figsize=(10, 5))
-        dow_delays = df_flights.groupby('DAY_OF_WEEK')['ARRIVAL_DELAY'].mean()
-        sns.barplot(x=dow_delays.index, y=dow_delays.values, palette='husl', ax=ax)
-        ax.set_title('15. Average Arrival Delay by Day of Week')
-        plt.savefig(PLOTS_PATH / '15_avg_delay_by_dayofweek.png', bbox_inches='tight', dpi=300)
-        plt.close()
-
-        # 16. Average Delay by Month
-        fig, ax = plt.subplots(figsize=(10, 5))
-        month_delays = df_flights.groupby('MONTH')['ARRIVAL_DELAY'].mean()
-        sns.barplot(x=month_delays.index, y=month_delays.values, palette='coolwarm', ax=ax)
-        ax.set_title('16. Average Arrival Delay by Month')
-        plt.savefig(PLOTS_PATH / '16_avg_delay_by_month.png', bbox_inches='tight', dpi=300)
-        plt.close()
-
-        # 17. Average Delay by Airline (Bar)
-        fig, ax = plt.subplots(figsize=(12, 6))
-        avg_delay_airline = df_flights.groupby('AIRLINE')['ARRIVAL_DELAY'].mean().sort_values(ascending=False)
-        sns.barplot(x=avg_delay_airline.index, y=avg_delay_airline.values, palette='rocket', ax=ax)
-        ax.set_title('17. Average Arrival Delay by Airline')
-        plt.savefig(PLOTS_PATH / '17_avg_delay_by_airline.png', bbox_inches='tight', dpi=300)
-        plt.close()
-
-        # 18. AirTime vs ArrDelay
-        fig, ax = plt.subplots(figsize=(10, 5))
-        sns.scatterplot(x='AIR_TIME', y='ARRIVAL_DELAY', data=df_flights.sample(10000), alpha=0.3, ax=ax, color='green')
-        ax.set_title('18. AirTime vs Arrival Delay')
-        plt.savefig(PLOTS_PATH / '18_airtime_vs_arrdelay.png', bbox_inches='tight', dpi=300)
-        plt.close()
-
-        # 19. Delay by Hour
-        fig, ax = plt.subplots(figsize=(12, 5))
-        hour_delays = df_flights.groupby('Hour')['ARRIVAL_DELAY'].mean()
-        sns.lineplot(x=hour_delays.index, y=hour_delays.values, ax=ax, linewidth=3, color='orange')
-        ax.set_title('19. Average Arrival Delay by Hour of Day')
-        ax.set_xticks(range(0, 24))
-        plt.savefig(PLOTS_PATH / '19_delay_by_hour.png', bbox_inches='tight', dpi=300)
-        plt.close()
-
-        # 20. Temporal Trend (Flights over explicitly continuous months)
-        fig, ax = plt.subplots(figsize=(14, 5))
-        temporal_trend = df_flights.groupby('MONTH').size()
-        sns.lineplot(x=temporal_trend.index, y=temporal_trend.values, marker='o', color='purple')
-        ax.set_title('20. Flight Volume Trend Over Months')
-        plt.savefig(PLOTS_PATH / '20_temporal_trend.png', bbox_inches='tight', dpi=300)
-        plt.close()
+        # Jobs registrados em src/eda_plots.py: cada figura recebe só as colunas
+        # que usa, roda em um pool de processos e é pulada se o fingerprint
+        # (dados + parâmetros + código) não mudou desde a última execução.
+        render_eda_plots(
+            df_flights, PLOTS_PATH, preview=PLOT_PREVIEW,
+            force=os.environ.get('EDA_PLOT_FORCE') == '1',
+            bins_dir=PROCESSED_PATH / 'eda_bins',
+        )
+
+        # Estatísticas e correlações do eda_summary.json e do relatório, pelos
+        # mesmos acumuladores mescláveis usados na passada sobre o dataset completo
+        if OUT_OF_CORE:
+            stats = summarize_dataset(CLEANED_PATH, SummaryStats.for_eda())
+        else:
+            stats = SummaryStats.for_eda().update(df_flights)
+        corr = stats.comoments.corr()
+
+        full_stats = None
+        if FULL_STATS:
+            print("Estatísticas em streaming sobre flights.csv completo...")
+            t0 = time.time()
+            full_stats = summarize_csv(DATA_PATH / 'flights.csv', SummaryStats.for_eda())
+            print(f"  ✓ {full_stats.rows:,} voos resumidos em {time.time() - t0:.1f}s")
 
         print("✅ FASE 3 completada com sucesso\n")
         
@@ -344,10 +160,10 @@ def main():
         print("FASE 4: SALVAMENTO, RELATÓRIOS E VALIDAÇÃO")
         print("=" * 80)
         
-        # Salvar Dataset Limpo
-        print("Salvando flights_cleaned.csv...")
-        # Reduce size by saving a chunk or just the remaining sampled frame
-        df_flights.to_csv(PROCESSED_PATH / 'flights_cleaned.csv', index=False)
+        # Salvar Dataset Limpo (Parquet particionado por YEAR/MONTH, categóricas em dicionário)
+        if not OUT_OF_CORE:  # no modo out-of-core a passada 2 já gravou o dataset
+            print("Salvando flights_cleaned.parquet/ (particionado por YEAR/MONTH)...")
+            write_flights_dataset(df_flights, CLEANED_PATH)
         
         # Montar EDA summary (formato JSON da subtask 4.2)
         print("Gerando eda_summary.json...")
@@ -356,30 +172,27 @@ def main():
                 "date": datetime.now().strftime("%Y-%m-%d"),
                 "version": "1.0",
                 "python_version": f"{sys.version_info.major}.{sys.version_info.minor}",
-                "random_seed": SEED
+                "random_seed": SEED,
+                "sample_fraction": SAMPLE_FRACTION
             },
             "datasets": {
                 "airlines": {"shape": list(df_airlines.shape), "columns": list(df_airlines.columns)},
                 "airports": {"shape": list(df_airports.shape), "columns": list(df_airports.columns)},
-                "flights_sample": {"shape": list(df_flights.shape), "columns": list(df_flights.columns)}
+                "flights_sample": {"shape": [rows_after, df_flights.shape[1]], "columns": list(df_flights.columns)}
             },
             "statistics": {
                 "numeric": {
-                    "ARRIVAL_DELAY": {
-                        "mean": float(df_flights['ARRIVAL_DELAY'].mean()),
-                        "median": float(df_flights['ARRIVAL_DELAY'].median()),
-                        "std": float(df_flights['ARRIVAL_DELAY'].std()),
-                        "min": float(df_flights['ARRIVAL_DELAY'].min()),
-                        "max": float(df_flights['ARRIVAL_DELAY'].max())
-                    }
+                    "ARRIVAL_DELAY": stats.describe('ARRIVAL_DELAY')
                 },
                 "categorical": {
                     "AIRLINE": {
-                        "nunique": int(df_flights['AIRLINE'].nunique()),
-                        "top_5": df_flights['AIRLINE'].value_counts().head(5).to_dict()
+                        "nunique": stats.heavy_hitters['AIRLINE'].nunique,
+                        "top_5": stats.heavy_hitters['AIRLINE'].top(5)
                     }
                 }
             },
+            # flights.csv inteiro, bruto (antes da limpeza); null sem EDA_FULL_STATS=1
+            "statistics_full_dataset": full_stats.to_dict() if full_stats else None,
             "correlations": {
                 "strong_positive": [
                     {"pair": ["DEPARTURE_DELAY", "ARRIVAL_DELAY"], "value": float(corr.loc['DEPARTURE_DELAY', 'ARRIVAL_DELAY'])}
@@ -422,12 +235,12 @@ def main():
         report_md = f"""# Análise Exploratória de Dados (EDA) - Relatório Final
 
 ## 📋 Resumo Executivo
-Os datasets avaliados demonstram uma estrutura rica para a previsão de atraso de voos, consistindo de mais de {df_flights.shape[0]} amostragens após a limpeza. A nossa pipeline validou os foreign keys, extraiu anomalias do `ARRIVAL_DELAY` via IQR (preservando consistência estatística) e detectou colinearidades cruciais que devem guiar a modelagem a seguir (evitando vazamento de dados).
+Os datasets avaliados demonstram uma estrutura rica para a previsão de atraso de voos, consistindo de mais de {rows_after} amostragens após a limpeza. A nossa pipeline validou os foreign keys, extraiu anomalias do `ARRIVAL_DELAY` via IQR (preservando consistência estatística) e detectou colinearidades cruciais que devem guiar a modelagem a seguir (evitando vazamento de dados).
 
 ---
 
 ## 1️⃣ Introdução e Metodologia
-Utilizando os datasets `airlines.csv`, `airports.csv` e `flights.csv`, implantou-se uma pipeline de carregamento com sampling de 10% do voos totais usando sementes fixas (`SEED=42`). 
+Utilizando os datasets `airlines.csv`, `airports.csv` e `flights.csv`, implantou-se uma pipeline de carregamento com sampling de {SAMPLE_FRACTION:.0%} dos voos totais, determinístico por hash da chave do voo (data, companhia, número do voo). 
 
 **Tratamentos efetuados:**
 * **Missing values:** Colunas estruturalmente imcompletas referentes a razões macro de cancelamento foram deletadas (>80% missing).
@@ -438,9 +251,9 @@ Utilizando os datasets `airlines.csv`, `airports.csv` e `flights.csv`, implantou
 
 ## 2️⃣ Análise Descritiva
 
-* **Voos processados:** {df_flights.shape[0]} registros válidos.
-* **Companhia Aérea Predominante:** {df_flights['AIRLINE'].mode()[0]}.
-* **Aeroporto de Origem Predominante:** {df_flights['ORIGIN_AIRPORT'].mode()[0]}.
+* **Voos processados:** {rows_after} registros válidos.
+* **Companhia Aérea Predominante:** {next(iter(stats.heavy_hitters['AIRLINE'].top(1)))}.
+* **Aeroporto de Origem Predominante:** {next(iter(stats.heavy_hitters['ORIGIN_AIRPORT'].top(1)))}.
 
 ---
 
@@ -470,7 +283,7 @@ Surpreendentemente, a distãncia da rota (`DISTANCE`) possui correlação quase
 - pandas, numpy, matplotlib, seaborn
 
 ## Execução
-Use o comando `python src/01_eda.py`. Todos os 20+ plots univariados/bivariados surgirão automaticamente no dir `docs/eda_plots`, os CSV limpos no `data/processed` e o JSON Sumarizado também.
+Use o comando `python src/01_eda.py`. Todos os 20+ plots univariados/bivariados surgirão automaticamente no dir `docs/eda_plots`, o dataset limpo (Parquet particionado) no `data/processed` e o JSON Sumarizado também.
 
 - Tempo médio provável de carga e inferência de chunks no HDD: ~10 minutos.
 """
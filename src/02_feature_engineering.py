@@ -2,32 +2,44 @@
 Feature Engineering — Flight Delay Prediction
 Task 03: Encoding, splitting e escalonamento sem data leakage
 
-Input : data/processed/flights_sample_processed.csv
-Output: data/processed/{X,y}_{train,val,test}.parquet
+Input : data/processed/flights_sample_processed.parquet/  (cache Parquet do CSV processado)
+Output: data/processed/{X,y}_{train,val,test}.parquet  (float32 / int8 — feature_store)
+        data/processed/codes_{train,val,test}.parquet  (códigos das categorias)
+        data/processed/split_assignment.parquet  (chave do voo → split, linha)
         models/scaler.pkl
         models/encoders.json
+        models/feature_transformer.npz  (sidecar binário do FeatureTransformer)
 
 Critérios de Sucesso (task03.md):
   ✓ Sem data leakage (features pré-voo apenas)
   ✓ IS_DELAYED = ARRIVAL_DELAY > 15 min
-  ✓ Split estratificado 70/15/15
+  ✓ Split 70/15/15 por hash da chave do voo (estratificado com --stratify-split)
   ✓ Target Encoding calculado apenas no treino
   ✓ StandardScaler fit apenas no treino
   ✓ encoders.json com mapeamentos completos para inferência
+
+Uso:
+    python src/02_feature_engineering.py                # dataset inteiro em memória
+    python src/02_feature_engineering.py --streaming    # duas passadas por lotes
+        [--source <dataset Parquet>] [--batch-rows N]   (ver streaming_features.py)
+    python src/02_feature_engineering.py --stratify-split   # cortes exatos por classe
 """
 
 # ── Imports ────────────────────────────────────────────────────────────────────
-import json
+import argparse
+import sys
 import time
 import warnings
-from datetime import datetime, timezone
 from pathlib import Path
 
-import joblib
 import numpy as np
 import pandas as pd
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler
+
+from derived_features import departure_period, is_delayed
+from feature_store import write_split
+from feature_transformer import FeatureTransformer
+from flights_io import (SPLIT_FILE, SPLIT_FRACTIONS, SPLIT_KEY, SPLIT_NAMES,
+                        STREAM_BATCH_ROWS, assign_split, load_stage)
 
 warnings.filterwarnings("ignore")
 np.random.seed(42)
@@ -35,7 +47,6 @@ np.random.seed(42)
 SCRIPT_START = time.time()
 
 # ── Paths ──────────────────────────────────────────────────────────────────────
-DATA_RAW  = Path("./data/processed/flights_sample_processed.csv")
 OUT_DIR   = Path("./data/processed")
 MODEL_DIR = Path("./models")
 OUT_DIR.mkdir(parents=True, exist_ok=True)
@@ -67,6 +78,33 @@ def _elapsed(start: float) -> str:
     return f"{time.time() - start:.1f}s"
 
 
+parser = argparse.ArgumentParser(description="Feature engineering (TC3)")
+parser.add_argument("--streaming", action="store_true",
+                    help="duas passadas por lotes, memória constante (dataset completo)")
+parser.add_argument("--source", type=Path, default=None,
+                    help="dataset Parquet particionado (default: cache do CSV processado)")
+parser.add_argument("--batch-rows", type=int, default=STREAM_BATCH_ROWS,
+                    help="linhas por lote no modo --streaming")
+parser.add_argument("--stratify-split", action="store_true",
+                    help="split estratificado pelo target (cortes exatos 70/15/15 por classe); "
+                         "NÃO estável: o split de um voo passa a depender de todos os outros")
+args = parser.parse_args()
+
+if args.streaming and args.stratify_split:
+    parser.error("--stratify-split exige a classe inteira em memória; incompatível com --streaming")
+
+if args.streaming:
+    from streaming_features import run_streaming
+
+    run_streaming(LEAKAGE_COLS, source=args.source, out_dir=OUT_DIR, model_dir=MODEL_DIR,
+                  batch_rows=args.batch_rows)
+    print("\n" + "=" * 80)
+    print(f"FEATURE ENGINEERING (STREAMING) CONCLUÍDO!  ({_elapsed(SCRIPT_START)} total)")
+    print("=" * 80)
+    print(f"\n▶  Próximo passo: python src/03_supervised_classification.py")
+    sys.exit(0)
+
+
 # ==============================================================================
 # 1. CARREGAMENTO E SELEÇÃO
 # ==============================================================================
@@ -75,7 +113,8 @@ print("=" * 80)
 print("1. CARREGAMENTO E SELEÇÃO DE FEATURES")
 print("=" * 80)
 
-df = pd.read_csv(DATA_RAW)
+# Projeção tipada da etapa (features + filtros + target) — ver flights_io.STAGE_COLUMNS
+df = load_stage("feature_engineering")
 print(f"✓ Dataset carregado: {df.shape}  [{_elapsed(_t)}]")
 
 # Remover voos cancelados (não decolaram — não é atraso)
@@ -86,7 +125,7 @@ print(f"✓ Removidos {n_before - len(df):,} voos cancelados → {len(df):,} res
 # Recalcular IS_DELAYED com threshold correto: > 15 min  (task03.md §1)
 # (01_eda.py usa > 0 — corrigimos aqui para seguir a definição de negócio)
 if "ARRIVAL_DELAY" in df.columns:
-    df[TARGET] = (df["ARRIVAL_DELAY"] > 15).astype("Int8")
+    df[TARGET] = is_delayed(df["ARRIVAL_DELAY"])   # nulo → 0 (derived_features)
     print("✓ IS_DELAYED recalculado: ARRIVAL_DELAY > 15 min  (threshold correto)")
 
 # Remover linhas sem target
@@ -107,15 +146,7 @@ print(f"✓ Leakage guard OK — colunas proibidas ({len(leakage_present)}) não
 
 # Garantir que DEPARTURE_PERIOD exista (derivado de SCHEDULED_DEPARTURE)
 if "DEPARTURE_PERIOD" not in df.columns:
-    def _period(h):
-        if pd.isna(h):
-            return "Unknown"
-        h = int(h) // 100
-        if   5 <= h < 12: return "Morning"
-        elif 12 <= h < 17: return "Afternoon"
-        elif 17 <= h < 21: return "Evening"
-        return "Night"
-    df["DEPARTURE_PERIOD"] = df["SCHEDULED_DEPARTURE"].apply(_period)
+    df["DEPARTURE_PERIOD"] = departure_period(df["SCHEDULED_DEPARTURE"])
     print("✓ DEPARTURE_PERIOD derivado de SCHEDULED_DEPARTURE")
 
 X = df[all_feats].copy()
@@ -136,32 +167,33 @@ print("=" * 80)
 for col in FEATURES_CAT_TARGET_ENC + FEATURES_CAT_OHE:
     n_miss = X[col].isna().sum()
     if n_miss > 0:
+        if isinstance(X[col].dtype, pd.CategoricalDtype):
+            X[col] = X[col].cat.add_categories("UNKNOWN")
         X[col] = X[col].fillna("UNKNOWN")
         print(f"  {col}: {n_miss:,} nulos → 'UNKNOWN'")
 
 print("✓ Nulos categóricos tratados")
 
 # ==============================================================================
-# 3. SPLIT ESTRATIFICADO  (70 / 15 / 15)
+# 3. SPLIT  (70 / 15 / 15)
 # ==============================================================================
 print("\n" + "=" * 80)
-print("3. SPLIT ESTRATIFICADO  70% / 15% / 15%")
+print(f"3. SPLIT{' ESTRATIFICADO' if args.stratify_split else ''}  70% / 15% / 15%  (hash da chave do voo)")
 print("=" * 80)
 
-X_train, X_temp, y_train, y_temp = train_test_split(
-    X, y, test_size=0.30, stratify=y, random_state=42
-)
-X_val, X_test, y_val, y_test = train_test_split(
-    X_temp, y_temp, test_size=0.50, stratify=y_temp, random_state=42
-)
+# Cada voo vai para treino/val/teste pelo hash de SPLIT_KEY (data, companhia,
+# número do voo, origem): a atribuição não depende da ordem das linhas nem do
+# que foi filtrado antes, e é persistida em split_assignment.parquet para as
+# etapas seguintes voltarem aos atributos originais por join. É o mesmo limiar
+# do modo --streaming: os dois geram o mesmo split_assignment.parquet.
+# --stratify-split corta cada classe nas frações exatas, mas aí o split de um
+# voo depende de todos os outros e muda se a filtragem anterior mudar.
+split_codes = assign_split(df, SPLIT_FRACTIONS, stratify=y if args.stratify_split else None)
+split_masks = [split_codes == i for i in range(len(SPLIT_NAMES))]
 
 # Reset de índices para evitar problemas de alinhamento nas etapas seguintes
-X_train = X_train.reset_index(drop=True)
-X_val   = X_val.reset_index(drop=True)
-X_test  = X_test.reset_index(drop=True)
-y_train = y_train.reset_index(drop=True)
-y_val   = y_val.reset_index(drop=True)
-y_test  = y_test.reset_index(drop=True)
+X_train, X_val, X_test = (X[m].reset_index(drop=True) for m in split_masks)
+y_train, y_val, y_test = (y[m].reset_index(drop=True) for m in split_masks)
 
 print(f"  {'Split':<12} {'Amostras':>10}  {'IS_DELAYED=1':>14}")
 print(f"  {'-'*40}")
@@ -186,20 +218,23 @@ print("\n" + "=" * 80)
 print("4. IMPUTAÇÃO DE NULOS NUMÉRICOS  (mediana do treino)")
 print("=" * 80)
 
-medians: dict = {}
-for col in FEATURES_NUM:
-    n_miss_train = X_train[col].isna().sum()
-    if n_miss_train > 0 or X_val[col].isna().sum() > 0 or X_test[col].isna().sum() > 0:
-        med = float(X_train[col].median())
-        medians[col] = med
-        X_train[col] = X_train[col].fillna(med)
-        X_val[col]   = X_val[col].fillna(med)
-        X_test[col]  = X_test[col].fillna(med)
-        print(f"  {col}: mediana = {med:.4f}  (nulos no treino: {n_miss_train:,})")
-
-if not medians:
+# Imputação, encoding, OHE e escalonamento ficam no FeatureTransformer
+# (src/feature_transformer.py): ajustado só no treino, aplicado em uma passada
+# vetorizada e reutilizável por qualquer caminho de scoring.
+transformer = FeatureTransformer(FEATURES_NUM, FEATURES_CAT_TARGET_ENC, FEATURES_CAT_OHE[0])
+X_train_scaled = pd.DataFrame(transformer.fit_transform(X_train, y_train),
+                              columns=transformer.feature_columns)
+medians = transformer.medians
+
+n_missing = {col: (X_train[col].isna().sum(), X_val[col].isna().sum() + X_test[col].isna().sum())
+             for col in FEATURES_NUM}
+for col, (n_miss_train, n_miss_other) in n_missing.items():
+    if n_miss_train > 0 or n_miss_other > 0:
+        print(f"  {col}: mediana = {medians[col]:.4f}  (nulos no treino: {n_miss_train:,})")
+
+if not any(a or b for a, b in n_missing.values()):
     print("  ✓ Sem nulos numéricos — imputação não necessária")
-print("✓ Imputação de nulos numéricos concluída")
+print("✓ Medianas do treino registradas para todas as features numéricas")
 
 # ==============================================================================
 # 5. ENCODING  (usando somente dados de TREINO)
@@ -208,61 +243,18 @@ print("\n" + "=" * 80)
 print("5. ENCODING")
 print("=" * 80)
 
-encoders: dict = {
-    "__version__": "1.0",
-    "__created_at__": datetime.now(timezone.utc).isoformat(),
-    "target_encoding": {},
-    "ohe_columns": [],
-    "medians": medians,
-    "feature_columns": [],    # preenchido após OHE
-    "leakage_guard": LEAKAGE_COLS,
-}
-
 # 5.1 Target Encoding — AIRLINE, ORIGIN_AIRPORT, DESTINATION_AIRPORT
+# Médias suavizadas rumo à global_mean; no treino, out-of-fold (K folds) para a
+# linha não ver o próprio rótulo; val/teste usam as médias do treino inteiro
+# (não vistas → global_mean).
+print(f"  Suavização = {transformer.smoothing:g}  |  out-of-fold no treino: {transformer.n_folds} folds")
 for col in FEATURES_CAT_TARGET_ENC:
-    # Calcular mapeamento somente no treino
-    train_tmp = pd.concat([X_train[[col]], y_train.rename(TARGET)], axis=1)
-    mapping = train_tmp.groupby(col)[TARGET].mean().to_dict()
-    global_mean = float(y_train.mean())
-
-    # Aplicar via map (unseen → global_mean via fillna)
-    X_train[col] = X_train[col].map(mapping).fillna(global_mean)
-    X_val[col]   = X_val[col].map(mapping).fillna(global_mean)
-    X_test[col]  = X_test[col].map(mapping).fillna(global_mean)
-
-    encoders["target_encoding"][col] = {
-        str(k): float(v) for k, v in mapping.items()
-    }
-    encoders["target_encoding"][col]["__global_mean__"] = global_mean
-
-    print(f"  ✓ Target Encoding: {col} → {len(mapping):,} categorias  "
-          f"(global_mean = {global_mean:.4f})")
-
-# 5.2 One-Hot Encoding para DEPARTURE_PERIOD
-ohe_train = pd.get_dummies(X_train["DEPARTURE_PERIOD"], prefix="PERIOD")
-ohe_val   = pd.get_dummies(X_val["DEPARTURE_PERIOD"],   prefix="PERIOD")
-ohe_test  = pd.get_dummies(X_test["DEPARTURE_PERIOD"],  prefix="PERIOD")
-
-# Garantir colunas consistentes em todos os splits  &  cast para int
-ohe_cols = sorted(ohe_train.columns.tolist())
-for split_ohe in [ohe_train, ohe_val, ohe_test]:
-    for c in ohe_cols:
-        if c not in split_ohe.columns:
-            split_ohe[c] = 0
-ohe_train = ohe_train[ohe_cols].astype(int)
-ohe_val   = ohe_val[ohe_cols].astype(int)
-ohe_test  = ohe_test[ohe_cols].astype(int)
-
-encoders["ohe_columns"] = ohe_cols
-
-# Substituir coluna original pelas dummies
-X_train = pd.concat([X_train.drop(columns=["DEPARTURE_PERIOD"]), ohe_train], axis=1)
-X_val   = pd.concat([X_val.drop(columns=["DEPARTURE_PERIOD"]),   ohe_val],   axis=1)
-X_test  = pd.concat([X_test.drop(columns=["DEPARTURE_PERIOD"]),  ohe_test],  axis=1)
+    print(f"  ✓ Target Encoding: {col} → {len(transformer.te_keys[col]):,} categorias  "
+          f"(global_mean = {transformer.global_mean:.4f})")
 
+# 5.2 One-Hot Encoding para DEPARTURE_PERIOD (colunas fixadas no treino)
+ohe_cols = transformer.ohe_columns
 print(f"  ✓ OHE: DEPARTURE_PERIOD → {ohe_cols}")
-print(f"\n✓ Shapes após encoding:")
-print(f"    X_train: {X_train.shape}  |  X_val: {X_val.shape}  |  X_test: {X_test.shape}")
 
 # ==============================================================================
 # 6. ESCALONAMENTO  (StandardScaler — fit apenas no treino)
@@ -271,20 +263,13 @@ print("\n" + "=" * 80)
 print("6. ESCALONAMENTO  (StandardScaler)")
 print("=" * 80)
 
-scaler = StandardScaler()
-X_train_scaled = pd.DataFrame(
-    scaler.fit_transform(X_train), columns=X_train.columns
-)
-X_val_scaled = pd.DataFrame(
-    scaler.transform(X_val), columns=X_val.columns
-)
-X_test_scaled = pd.DataFrame(
-    scaler.transform(X_test), columns=X_test.columns
-)
+# (X_train_scaled já saiu do fit_transform, com o target encoding out-of-fold)
+X_val_scaled   = transformer.transform_frame(X_val)
+X_test_scaled  = transformer.transform_frame(X_test)
 
-joblib.dump(scaler, MODEL_DIR / "scaler.pkl")
-print(f"✓ StandardScaler salvo: {MODEL_DIR / 'scaler.pkl'}")
-print(f"  Média (primeiras 4 features): {scaler.mean_[:4].round(4).tolist()}")
+print(f"✓ Shapes após encoding + escalonamento:")
+print(f"    X_train: {X_train_scaled.shape}  |  X_val: {X_val_scaled.shape}  |  X_test: {X_test_scaled.shape}")
+print(f"  Média (primeiras 4 features): {transformer.mean_[:4].round(4).tolist()}")
 
 # ==============================================================================
 # 7. SALVANDO OUTPUTS  (parquets + artefatos)
@@ -293,35 +278,37 @@ print("\n" + "=" * 80)
 print("7. SALVANDO OUTPUTS")
 print("=" * 80)
 
-# Parquets de features
-splits = {
-    "X_train": X_train_scaled,
-    "X_val":   X_val_scaled,
-    "X_test":  X_test_scaled,
+# Feature store: X em float32 (indicadores PERIOD_* em int8), y em int8 e os
+# códigos inteiros das categorias antes do encoding, em row groups
+feature_splits = {
+    "train": (X_train, X_train_scaled, y_train),
+    "val":   (X_val,   X_val_scaled,   y_val),
+    "test":  (X_test,  X_test_scaled,  y_test),
 }
-for name, df_out in splits.items():
-    path = OUT_DIR / f"{name}.parquet"
-    df_out.to_parquet(path, index=False)
-
-# Parquets de target
-targets = {
-    "y_train": y_train,
-    "y_val":   y_val,
-    "y_test":  y_test,
-}
-for name, s_out in targets.items():
-    path = OUT_DIR / f"{name}.parquet"
-    s_out.to_frame().to_parquet(path, index=False)
+store_files = []
+for name, (X_raw, X_out, y_out) in feature_splits.items():
+    store_files += write_split(name, X_out, y_out, codes=transformer.category_codes(X_raw),
+                               out_dir=OUT_DIR)
+
+# Atribuição do split: chave do voo + split + posição da linha em X_<split>
+# + posição no dataset processado (SOURCE_ROW — a chave do voo não é única)
+split_rows = np.empty(len(split_codes), dtype=np.int32)
+for m in split_masks:
+    split_rows[m] = np.arange(m.sum(), dtype=np.int32)
+split_assignment = df[SPLIT_KEY].reset_index(drop=True).assign(
+    SPLIT=pd.Categorical.from_codes(split_codes, categories=list(SPLIT_NAMES)),
+    ROW=split_rows,
+    SOURCE_ROW=df.index.to_numpy(dtype=np.int64),
+)
+split_assignment.to_parquet(SPLIT_FILE, index=False)
 
-# encoders.json — salvo UMA única vez com todos os campos
-encoders["feature_columns"] = X_train_scaled.columns.tolist()
-with open(MODEL_DIR / "encoders.json", "w") as f:
-    json.dump(encoders, f, indent=2, ensure_ascii=False)
+# encoders.json + scaler.pkl + sidecar binário — salvos UMA única vez
+transformer.save(MODEL_DIR, extra={"leakage_guard": LEAKAGE_COLS})
 
 print("✓ Arquivos gerados:")
 all_outputs = (
-    [OUT_DIR / f"{n}.parquet" for n in list(splits) + list(targets)]
-    + [MODEL_DIR / "scaler.pkl", MODEL_DIR / "encoders.json"]
+    store_files + [SPLIT_FILE]
+    + [MODEL_DIR / "scaler.pkl", MODEL_DIR / "encoders.json", MODEL_DIR / "feature_transformer.npz"]
 )
 for p in all_outputs:
     size_kb = p.stat().st_size / 1024
@@ -340,10 +327,11 @@ print("=" * 80)
 print("\n📋 Critérios de Sucesso (task03.md):")
 print(f"  ✅ Sem data leakage     — {len(all_feats)} features pré-voo apenas")
 print(f"  ✅ IS_DELAYED correto   — threshold > 15 min")
-print(f"  ✅ Split estratificado  — 70% / 15% / 15%  (random_state=42)")
-print(f"  ✅ Target Encoding      — calculado no treino, aplicado a val/teste")
+split_mode = "estratificado" if args.stratify_split else "por hash"
+print(f"  ✅ Split {split_mode:<13}  — 70% / 15% / 15%  (hash de {'/'.join(SPLIT_KEY)})")
+print(f"  ✅ Target Encoding      — suavizado, out-of-fold no treino, aplicado a val/teste")
 print(f"  ✅ OHE consistente      — {len(ohe_cols)} colunas inteiras em todos splits")
 print(f"  ✅ Scaler               — fit no treino, transform em val/teste")
-print(f"  ✅ encoders.json        — {len(encoders['feature_columns'])} feature_columns + mapeamentos")
+print(f"  ✅ encoders.json        — {len(transformer.feature_columns)} feature_columns + mapeamentos")
 print(f"  ✅ scaler.pkl           — salvo em {MODEL_DIR / 'scaler.pkl'}")
 print(f"\n▶  Próximo passo: python src/03_supervised_classification.py")
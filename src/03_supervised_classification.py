@@ -3,13 +3,34 @@ Modelagem Supervisionada — Flight Delay Classification
 Task 02, Script 2: Treino, avaliação e geração de JSONs para dashboard
 
 Input : data/processed/{X,y}_{train,val,test}.parquet
+        data/processed/codes_{train,val,test}.parquet  (motor "hist" do Gradient Boosting)
+        data/processed/split_assignment.parquet
         models/encoders.json
 Output: models/{logistic_regression,random_forest,gradient_boosting}.pkl
+        models/models_manifest.json  (fingerprint do transformer do treino)
+        models/compiled/<modelo>/  (arrays para inferência só com NumPy)
+        data/processed/predictions.parquet  (prediction store: P(atraso) por modelo e split)
         data/processed/dashboard/ml_*.json  (7 arquivos)
+
+Tamanho do sample de ml_test_predictions.json: TEST_PREDICTIONS_SAMPLE
+(default 5000; 0 = teste inteiro).
+
+Motor do Gradient Boosting pela variável de ambiente GB_ENGINE:
+    hist   (default) HistGradientBoosting multithread com early stopping e
+           categorias nativas (códigos inteiros) — ver native_boosting.py
+    exact  GradientBoostingClassifier exato sobre as features com target encoding
+
+Treino da Logistic Regression pela variável de ambiente LR_TRAINING:
+    memory     (default) LogisticRegression sobre X_train inteiro em memória
+    streaming  SGD logístico com partial_fit por row group, épocas embaralhadas,
+               checkpoint e validação por época — ver incremental_linear.py
+               (épocas: LR_EPOCHS, default 5)
 """
 
 # %% Imports
 import json
+import os
+import time
 import warnings
 from pathlib import Path
 
@@ -21,7 +42,6 @@ from sklearn.ensemble import (
     RandomForestClassifier,
 )
 from sklearn.linear_model import LogisticRegression
-from sklearn.model_selection import train_test_split
 from sklearn.metrics import (
     accuracy_score,
     average_precision_score,
@@ -35,6 +55,16 @@ from sklearn.metrics import (
     roc_curve,
 )
 
+from feature_store import read_codes, read_split
+from feature_transformer import FeatureTransformer, write_models_manifest
+from incremental_linear import train_incremental
+from flights_io import SPLIT_FILE, SPLIT_KEY, load_stage
+from native_boosting import NativeCategoryBoosting, native_frame
+from numpy_inference import COMPILED_DIR, CompiledModel, export_model
+from prediction_store import PREDICTIONS_FILE, PredictionStore
+from threshold_engine import ThresholdCurve, curves_by_segment
+from training_scheduler import core_budget, train_concurrently
+
 warnings.filterwarnings("ignore")
 
 # %% Paths
@@ -43,6 +73,18 @@ DASH = Path("./data/processed/dashboard")
 MODEL_DIR = Path("./models")
 DASH.mkdir(parents=True, exist_ok=True)
 
+# Linhas do teste exportadas em ml_test_predictions.json (0 = teste inteiro)
+TEST_PREDICTIONS_SAMPLE = int(os.environ.get("TEST_PREDICTIONS_SAMPLE", "5000"))
+
+GB_ENGINE = os.environ.get("GB_ENGINE", "hist")
+if GB_ENGINE not in ("hist", "exact"):
+    raise ValueError(f"GB_ENGINE deve ser 'hist' ou 'exact', recebido: {GB_ENGINE!r}")
+
+LR_TRAINING = os.environ.get("LR_TRAINING", "memory")
+if LR_TRAINING not in ("memory", "streaming"):
+    raise ValueError(f"LR_TRAINING deve ser 'memory' ou 'streaming', recebido: {LR_TRAINING!r}")
+LR_EPOCHS = int(os.environ.get("LR_EPOCHS", "5"))
+
 # %% ============================================================================
 # 1. CARREGAMENTO DOS SPLITS
 # =============================================================================
@@ -51,14 +93,16 @@ print("=" * 80)
 print("1. CARREGAMENTO DOS SPLITS")
 print("=" * 80)
 
-X_train = pd.read_parquet(PROC / "X_train.parquet")
-X_val = pd.read_parquet(PROC / "X_val.parquet")
-X_test = pd.read_parquet(PROC / "X_test.parquet")
-y_train = pd.read_parquet(PROC / "y_train.parquet").squeeze()
-y_val = pd.read_parquet(PROC / "y_val.parquet").squeeze()
-y_test = pd.read_parquet(PROC / "y_test.parquet").squeeze()
+# Feature store: X float32 (uma única matriz por split) e y int8 como vistas em
+# memory-map sobre cópias .npy descomprimidas (feature_store.materialize_split)
+X_train, y_train = read_split("train", PROC)
+X_val, y_val = read_split("val", PROC)
+X_test, y_test = read_split("test", PROC)
 
 print(f"✓ Train: {X_train.shape}, Val: {X_val.shape}, Test: {X_test.shape}")
+mem_mb = sum(X.memory_usage().sum() + y.memory_usage()
+             for X, y in [(X_train, y_train), (X_val, y_val), (X_test, y_test)]) / 1024**2
+print(f"✓ Memória (X + y): {mem_mb:.1f} MB")
 print(f"✓ Class balance (train): IS_DELAYED=1 → {y_train.mean()*100:.2f}%")
 
 # Carregar encoders para decodificar previsões
@@ -85,7 +129,8 @@ models = {
         random_state=42,
         n_jobs=-1,
     ),
-    "Gradient Boosting": GradientBoostingClassifier(
+    "Gradient Boosting": NativeCategoryBoosting(random_state=42) if GB_ENGINE == "hist"
+    else GradientBoostingClassifier(
         n_estimators=200,
         max_depth=6,
         learning_rate=0.05,
@@ -93,19 +138,50 @@ models = {
     ),
 }
 
+# Entradas de cada modelo por split; o motor "hist" recebe as numéricas e os
+# códigos inteiros das categorias no lugar do target encoding
+inputs = {name: {"train": X_train, "val": X_val, "test": X_test} for name in models}
+if GB_ENGINE == "hist":
+    inputs["Gradient Boosting"] = {
+        split: native_frame(X, read_codes(split, PROC))
+        for split, X in [("train", X_train), ("val", X_val), ("test", X_test)]
+    }
+print(f"  Motor do Gradient Boosting: {GB_ENGINE}")
+
 pkl_names = {
     "Logistic Regression": "logistic_regression.pkl",
     "Random Forest": "random_forest.pkl",
     "Gradient Boosting": "gradient_boosting.pkl",
 }
 
+# Treino concorrente: X_train/y_train em memory-map compartilhado, um processo
+# por modelo e núcleos divididos entre os estimadores (ver training_scheduler.py)
+budget = core_budget(models)
+print(f"  Núcleos por modelo: {budget}")
+t0 = time.time()
+# LR_TRAINING=streaming: a Logistic Regression sai do pool e treina por row group
+streamed = {"Logistic Regression"} if LR_TRAINING == "streaming" else set()
+pooled = {name: model for name, model in models.items() if name not in streamed}
+fitted = train_concurrently(pooled, {name: inputs[name]["train"] for name in pooled}, y_train)
+if streamed:
+    print(f"  Logistic Regression out-of-core ({LR_EPOCHS} épocas, partial_fit por row group):")
+    t_lr = time.time()
+    model, _ = train_incremental(PROC, epochs=LR_EPOCHS)
+    fitted["Logistic Regression"] = (model, time.time() - t_lr)
+fitted = {name: fitted[name] for name in models}
+
 trained = {}
-for name, model in models.items():
-    print(f"\n  ▸ Treinando {name}...")
-    model.fit(X_train, y_train)
+for name, (model, seconds) in fitted.items():
     trained[name] = model
     joblib.dump(model, MODEL_DIR / pkl_names[name])
-    print(f"    ✓ Salvo: {MODEL_DIR / pkl_names[name]}")
+    n_iter = (f", {model.n_iter_} iterações (early stopping)"
+              if isinstance(model, NativeCategoryBoosting) else "")
+    print(f"  ✓ {name}: {seconds:.1f}s{n_iter} → {MODEL_DIR / pkl_names[name]}")
+print(f"✓ Treino concluído em {time.time() - t0:.1f}s  (soma dos modelos: "
+      f"{sum(sec for _, sec in fitted.values()):.1f}s)")
+# Transformer com que os modelos foram treinados: scoring recusa outro (ver feature_transformer.py)
+manifest = write_models_manifest(MODEL_DIR, FeatureTransformer.load(MODEL_DIR), pkl_names.values())
+print(f"✓ Manifesto modelos ↔ transformer → {manifest}")
 
 # %% ============================================================================
 # 3. AVALIAÇÃO
@@ -116,9 +192,18 @@ print("3. AVALIAÇÃO DOS MODELOS")
 print("=" * 80)
 
 
-def evaluate(model, X, y, label=""):
-    y_pred = model.predict(X)
-    y_prob = model.predict_proba(X)[:, 1]
+# Cada modelo pontua cada split uma única vez; todas as métricas e JSONs
+# seguintes derivam do prediction store (gravado em predictions.parquet)
+store = PredictionStore({"train": y_train, "val": y_val, "test": y_test})
+for name, model in trained.items():
+    for split in ("train", "val", "test"):
+        store.score(name, model, inputs[name][split], split)
+
+
+def evaluate(name, split):
+    y = store.y(split)
+    y_pred = store.predict(name, split)
+    y_prob = store.proba(name, split)
     acc = accuracy_score(y, y_pred)
     f1w = f1_score(y, y_pred, average="weighted")
     prec = precision_score(y, y_pred, pos_label=1)
@@ -137,10 +222,10 @@ def evaluate(model, X, y, label=""):
 
 # Métricas em train / val / test
 results = {}
-for name, model in trained.items():
-    r_train = evaluate(model, X_train, y_train)
-    r_val = evaluate(model, X_val, y_val)
-    r_test = evaluate(model, X_test, y_test)
+for name in trained:
+    r_train = evaluate(name, "train")
+    r_val = evaluate(name, "val")
+    r_test = evaluate(name, "test")
     results[name] = {"train": r_train, "val": r_val, "test": r_test}
     print(f"\n  {name}:")
     print(f"    Train  — acc={r_train['accuracy']:.4f}  f1={r_train['f1_weighted']:.4f}  auc={r_train['roc_auc']:.4f}")
@@ -151,6 +236,18 @@ for name, model in trained.items():
 best_name = max(results, key=lambda n: results[n]["test"]["roc_auc"])
 print(f"\n  ★ Melhor modelo: {best_name} (AUC-ROC teste = {results[best_name]['test']['roc_auc']:.4f})")
 
+store.save(PREDICTIONS_FILE)
+print(f"  ✓ Previsões ({len(store.probas)} modelo×split) salvas em {PREDICTIONS_FILE}")
+
+# Export para inferência só com NumPy (numpy_inference.py), com lote de prova
+# do teste e conferido contra as probabilidades do sklearn no teste inteiro
+for name, model in trained.items():
+    path = export_model(model, COMPILED_DIR / Path(pkl_names[name]).stem, probe=inputs[name]["test"])
+    compiled = CompiledModel.load(path)
+    diff = np.abs(compiled.predict_proba(inputs[name]["test"])[:, 1] - store.proba(name, "test")).max()
+    size_kb = sum(f.stat().st_size for f in path.iterdir()) / 1024
+    print(f"  ✓ {name} compilado → {path} ({size_kb:,.0f} KB, máx |ΔP| vs sklearn = {diff:.1e})")
+
 # %% ============================================================================
 # 4. JSON — ml_model_comparison.json
 # =============================================================================
@@ -188,8 +285,8 @@ print("  ✓ ml_model_comparison.json")
 # =============================================================================
 
 roc_data = {}
-for name, model in trained.items():
-    y_prob = model.predict_proba(X_test)[:, 1]
+for name in trained:
+    y_prob = store.proba(name, "test")
     fpr, tpr, _ = roc_curve(y_test, y_prob)
     auc_val = roc_auc_score(y_test, y_prob)
     # Down-sample points for JSON (max 200 points)
@@ -209,8 +306,8 @@ print("  ✓ ml_roc_curves.json")
 # =============================================================================
 
 pr_data = {}
-for name, model in trained.items():
-    y_prob = model.predict_proba(X_test)[:, 1]
+for name in trained:
+    y_prob = store.proba(name, "test")
     prec_arr, rec_arr, _ = precision_recall_curve(y_test, y_prob)
     ap_val = average_precision_score(y_test, y_prob)
     step = max(1, len(prec_arr) // 200)
@@ -229,8 +326,8 @@ print("  ✓ ml_pr_curves.json")
 # =============================================================================
 
 cm_data = {}
-for name, model in trained.items():
-    y_pred = model.predict(X_test)
+for name in trained:
+    y_pred = store.predict(name, "test")
     cm = confusion_matrix(y_test, y_pred)
     cm_data[name] = {
         "matrix": cm.tolist(),
@@ -288,80 +385,110 @@ print("  ✓ ml_feature_importance.json")
 # 9. JSON — ml_threshold_analysis.json
 # =============================================================================
 
-best_model = trained[best_name]
-y_prob_best = best_model.predict_proba(X_test)[:, 1]
+# Threshold engine: uma ordenação por modelo dá TP/FP em todos os limiares;
+# a grade de 0.05 (contrato do JSON) e a grade fina saem da mesma curva
+curves = {name: ThresholdCurve.from_scores(y_test, store.proba(name, "test")) for name in trained}
+curve = curves[best_name]
 
 thresholds = np.arange(0.1, 0.95, 0.05)
+grid = curve.at(thresholds)
 th_analysis = {"model": best_name, "thresholds": [], "f1": [], "precision": [], "recall": []}
 
-for th in thresholds:
-    y_pred_th = (y_prob_best >= th).astype(int)
-    if y_pred_th.sum() == 0 or (1 - y_pred_th).sum() == 0:
+for i, th in enumerate(thresholds):
+    if grid["predicted_positive"][i] == 0 or grid["predicted_positive"][i] == curve.n:
         continue
     th_analysis["thresholds"].append(round(float(th), 2))
-    th_analysis["f1"].append(round(float(f1_score(y_test, y_pred_th)), 4))
-    th_analysis["precision"].append(round(float(precision_score(y_test, y_pred_th)), 4))
-    th_analysis["recall"].append(round(float(recall_score(y_test, y_pred_th)), 4))
+    th_analysis["f1"].append(round(float(grid["f1"][i]), 4))
+    th_analysis["precision"].append(round(float(grid["precision"][i]), 4))
+    th_analysis["recall"].append(round(float(grid["recall"][i]), 4))
 
 # Threshold ótimo (max F1)
 opt_idx = int(np.argmax(th_analysis["f1"]))
 th_analysis["optimal_threshold"] = th_analysis["thresholds"][opt_idx]
 th_analysis["optimal_f1"] = th_analysis["f1"][opt_idx]
 
+# Grade fina (0.01) para todos os modelos e, no melhor, por período do dia
+fine = np.round(np.arange(0.01, 1.0, 0.01), 2)
+
+
+def _best_fine(c):
+    th, f1 = c.best("f1", fine, exclude_trivial=True)
+    return {"optimal_threshold": th, "optimal_f1": round(f1, 4)}
+
+
+th_analysis["fine_step"] = 0.01
+th_analysis["by_model"] = {name: _best_fine(c) for name, c in curves.items()}
+period_names = [c.split("_", 1)[1] for c in encoders["ohe_columns"]]
+by_period = curves_by_segment(y_test, store.proba(best_name, "test"),
+                              read_codes("test", PROC)["DEPARTURE_PERIOD"])
+th_analysis["by_period"] = {period_names[code]: _best_fine(c)
+                            for code, c in by_period.items() if 0 <= code < len(period_names)}
+
 with open(DASH / "ml_threshold_analysis.json", "w") as f:
     json.dump(th_analysis, f, indent=2)
 print("  ✓ ml_threshold_analysis.json")
 print(f"    Threshold ótimo: {th_analysis['optimal_threshold']} → F1 = {th_analysis['optimal_f1']:.4f}")
+print(f"    Grade 0.01: {th_analysis['by_model'][best_name]['optimal_threshold']} → "
+      f"F1 = {th_analysis['by_model'][best_name]['optimal_f1']:.4f}")
 
 # %% ============================================================================
 # 10. JSON — ml_test_predictions.json
 # =============================================================================
 
-# Carregar dados originais para decodificar features
-df_orig = pd.read_csv("data/processed/flights_sample_processed.csv")
-# Remover cancelados e sem IS_DELAYED como fizemos no feature engineering
-df_orig = df_orig[df_orig["CANCELLED"] != 1].dropna(subset=["IS_DELAYED"]).reset_index(drop=True)
-
-# Recuperar os índices do split de teste
-# Replay do split com mesmo random_state para obter os índices corretos
-n_total = len(df_orig)
-n_train_val = int(n_total * 0.70)
-_, temp_idx = train_test_split(range(n_total), test_size=0.30, 
-                                stratify=df_orig["IS_DELAYED"].astype(int), 
-                                random_state=42)
-_, test_idx = train_test_split(temp_idx, test_size=0.50,
-                                stratify=df_orig.iloc[temp_idx]["IS_DELAYED"].astype(int),
-                                random_state=42)
-
-df_test_orig = df_orig.iloc[test_idx].reset_index(drop=True)
+# Atributos originais do teste: split_assignment (gravado pelo 02) leva cada
+# linha de X_test à sua posição no dataset processado (SOURCE_ROW) — a chave do
+# voo não é única, então o join é pela posição e a chave só confere o resultado
+test_ids = (pd.read_parquet(SPLIT_FILE, filters=[("SPLIT", "==", "test")])
+            .sort_values("ROW").reset_index(drop=True))
+if "SOURCE_ROW" not in test_ids.columns:
+    raise ValueError(f"{SPLIT_FILE} sem SOURCE_ROW — execute novamente o 02_feature_engineering.py")
+df_test_orig = load_stage("supervised").take(test_ids["SOURCE_ROW"].to_numpy()).reset_index(drop=True)
+key_mismatch = np.zeros(len(test_ids), dtype=bool)
+for c in SPLIT_KEY:
+    key_mismatch |= df_test_orig[c].astype(str).to_numpy() != test_ids[c].astype(str).to_numpy()
+if key_mismatch.any():
+    raise ValueError(f"{int(key_mismatch.sum()):,} linhas de teste com chave divergente do dataset "
+                     f"processado — o 02 foi gerado de outra fonte; execute-o novamente")
 
 # Previsões do melhor modelo
-y_prob_all = best_model.predict_proba(X_test)[:, 1]
-y_pred_all = best_model.predict(X_test)
+y_prob_all = store.proba(best_name, "test")
+y_pred_all = store.predict(best_name, "test")
 
-# Montar sample (até 5000)
-sample_size = min(5000, len(df_test_orig))
+# Montar sample (até TEST_PREDICTIONS_SAMPLE): uma única seleção das linhas
+# sorteadas e nomes decodificados pelas categorias, coluna a coluna
+sample_size = min(TEST_PREDICTIONS_SAMPLE or len(df_test_orig), len(df_test_orig))
 sample_idx = np.random.RandomState(42).choice(len(df_test_orig), sample_size, replace=False)
+sample = df_test_orig.take(sample_idx)
+
+
+def _labels(col: pd.Series) -> list:
+    """Rótulos como str via categorias (nulo → 'nan', como str(NaN))."""
+    cat = col.astype("category")
+    labels = np.append(cat.cat.categories.astype(str).to_numpy(dtype=object), "nan")
+    return labels[cat.cat.codes.to_numpy()].tolist()
+
+
+def _named(code_col: str) -> list:
+    name_col = f"{code_col}_NAME"
+    return _labels(sample[name_col] if name_col in sample.columns else sample[code_col])
+
 
 columns = ["AIRLINE", "ORIGIN_AIRPORT", "DESTINATION_AIRPORT", "MONTH",
            "DAY_OF_WEEK", "SCHEDULED_DEPARTURE", "DISTANCE",
            "y_true", "y_pred", "y_prob"]
 
-data_rows = []
-for i in sample_idx:
-    row = [
-        str(df_test_orig.iloc[i].get("AIRLINE_NAME", df_test_orig.iloc[i].get("AIRLINE", ""))),
-        str(df_test_orig.iloc[i].get("ORIGIN_AIRPORT_NAME", df_test_orig.iloc[i].get("ORIGIN_AIRPORT", ""))),
-        str(df_test_orig.iloc[i].get("DESTINATION_AIRPORT_NAME", df_test_orig.iloc[i].get("DESTINATION_AIRPORT", ""))),
-        int(df_test_orig.iloc[i].get("MONTH", 0)),
-        int(df_test_orig.iloc[i].get("DAY_OF_WEEK", 0)),
-        int(df_test_orig.iloc[i].get("SCHEDULED_DEPARTURE", 0)),
-        float(df_test_orig.iloc[i].get("DISTANCE", 0)),
-        int(y_test.iloc[i]),
-        int(y_pred_all[i]),
-        round(float(y_prob_all[i]), 4),
-    ]
-    data_rows.append(row)
+values = [
+    _named("AIRLINE"),
+    _named("ORIGIN_AIRPORT"),
+    _named("DESTINATION_AIRPORT"),
+    *(sample[c].fillna(0).to_numpy(dtype=np.int64).tolist()
+      for c in ["MONTH", "DAY_OF_WEEK", "SCHEDULED_DEPARTURE"]),
+    sample["DISTANCE"].fillna(0).to_numpy(dtype=np.float64).tolist(),
+    store.y("test")[sample_idx].astype(np.int64).tolist(),
+    y_pred_all[sample_idx].astype(np.int64).tolist(),
+    [round(p, 4) for p in y_prob_all[sample_idx].tolist()],
+]
+data_rows = [list(row) for row in zip(*values)]
 
 pred_json = {
     "sample_size": sample_size,
@@ -370,8 +497,9 @@ pred_json = {
     "data": data_rows,
 }
 
+# JSON compacto: sem indentação (o arquivo cresce com o sample)
 with open(DASH / "ml_test_predictions.json", "w") as f:
-    json.dump(pred_json, f, indent=2)
+    json.dump(pred_json, f, separators=(",", ":"))
 print(f"  ✓ ml_test_predictions.json ({sample_size} amostras)")
 
 print("\n" + "=" * 80)
@@ -2,7 +2,7 @@
 Modelagem Não Supervisionada — Clustering de Rotas Aéreas
 Task 02, Script 3: PCA + K-Means por rota
 
-Input : data/processed/flights_sample_processed.csv
+Input : data/processed/flights_sample_processed.parquet/  (cache Parquet do CSV processado)
 Output: data/processed/dashboard/ml_pca_*.json, ml_kmeans_*.json, ml_cluster_*.json
 """
 
@@ -18,11 +18,12 @@ from sklearn.decomposition import PCA
 from sklearn.metrics import silhouette_score
 from sklearn.preprocessing import StandardScaler
 
+from flights_io import load_stage
+
 warnings.filterwarnings("ignore")
 np.random.seed(42)
 
 # %% Paths
-DATA_RAW = Path("./data/processed/flights_sample_processed.csv")
 DASH = Path("./data/processed/dashboard")
 DASH.mkdir(parents=True, exist_ok=True)
 
@@ -34,7 +35,7 @@ print("=" * 80)
 print("1. CARREGAMENTO E AGREGAÇÃO POR ROTA")
 print("=" * 80)
 
-df = pd.read_csv(DATA_RAW)
+df = load_stage("unsupervised")
 
 # Remover cancelados
 df = df[df["CANCELLED"] != 1].copy()
@@ -42,7 +43,7 @@ df = df.dropna(subset=["IS_DELAYED"])
 print(f"✓ Dataset: {df.shape}")
 
 # Agregar por rota (ORIGIN_AIRPORT, DESTINATION_AIRPORT)
-route_agg = df.groupby(["ORIGIN_AIRPORT", "DESTINATION_AIRPORT"]).agg(
+route_agg = df.groupby(["ORIGIN_AIRPORT", "DESTINATION_AIRPORT"], observed=True).agg(
     avg_distance=("DISTANCE", "mean"),
     avg_scheduled_time=("SCHEDULED_TIME", "mean"),
     avg_month=("MONTH", "mean"),
@@ -195,11 +196,14 @@ print("=" * 80)
 
 # Para obter top airlines por cluster, precisamos do df original com cluster labels
 # Mapear cluster_id de volta para as rotas no df original
-route_cluster_map = route_agg.set_index(["ORIGIN_AIRPORT", "DESTINATION_AIRPORT"])["cluster_id"].to_dict()
-df["cluster_id"] = df.apply(
-    lambda r: route_cluster_map.get((r["ORIGIN_AIRPORT"], r["DESTINATION_AIRPORT"]), -1),
-    axis=1,
+# (lookup vetorizado da rota — evita df.apply linha a linha no dataset completo)
+route_index = pd.MultiIndex.from_frame(route_agg[["ORIGIN_AIRPORT", "DESTINATION_AIRPORT"]])
+route_pos = route_index.get_indexer(
+    pd.MultiIndex.from_frame(df[["ORIGIN_AIRPORT", "DESTINATION_AIRPORT"]])
 )
+df["cluster_id"] = np.where(
+    route_pos >= 0, route_agg["cluster_id"].to_numpy()[route_pos], -1
+).astype("int8")
 
 cluster_profiles = []
 for cid in sorted(route_agg["cluster_id"].unique()):
@@ -3,6 +3,7 @@ Relatório Crítico — Geração automática de docs/model_report.md
 Task 02, Script 4: Consolida todos os JSONs em um relatório markdown
 
 Input : data/processed/dashboard/ml_*.json
+        data/processed/predictions.parquet  (prediction store do 03 — calibração)
 Output: docs/model_report.md
 """
 
@@ -10,6 +11,10 @@ Output: docs/model_report.md
 import json
 from pathlib import Path
 
+import numpy as np
+
+from prediction_store import PREDICTIONS_FILE, PredictionStore
+
 DASH = Path("./data/processed/dashboard")
 DOCS = Path("./docs")
 DOCS.mkdir(parents=True, exist_ok=True)
@@ -40,6 +45,13 @@ pca = load("ml_pca_variance.json")
 elbow = load("ml_kmeans_elbow.json")
 profiles = load("ml_cluster_profiles.json")
 
+# Previsões de teste do 03 (sem recarregar os .pkl)
+store = None
+if PREDICTIONS_FILE.exists():
+    store = PredictionStore.load(PREDICTIONS_FILE, splits=["test"])
+else:
+    print(f"  ⚠ {PREDICTIONS_FILE} não encontrado — calibração será omitida")
+
 # %% Gerar relatório
 lines = []
 L = lines.append  # shorthand
@@ -106,12 +118,43 @@ if th:
     L(f"Modelo: **{th['model']}**\n")
     L(f"- Threshold padrão: 0.50")
     L(f"- Threshold ótimo (max F1): **{th['optimal_threshold']}** → F1 = {th['optimal_f1']:.4f}\n")
+    if "by_model" in th:
+        L(f"Threshold ótimo na grade fina ({th['fine_step']}):\n")
+        L("| Segmento | Threshold | F1 |")
+        L("| --- | --- | --- |")
+        for name, opt in th["by_model"].items():
+            L(f"| {name} | {opt['optimal_threshold']:.2f} | {opt['optimal_f1']:.4f} |")
+        for period, opt in th.get("by_period", {}).items():
+            L(f"| {th['model']} — {period} | {opt['optimal_threshold']:.2f} | {opt['optimal_f1']:.4f} |")
+        L("")
     L("| Threshold | F1 | Precision | Recall |")
     L("| --- | --- | --- | --- |")
     for i in range(len(th["thresholds"])):
         L(f"| {th['thresholds'][i]:.2f} | {th['f1'][i]:.4f} | {th['precision'][i]:.4f} | {th['recall'][i]:.4f} |")
     L("")
 
+if store:
+    L("### 4.1 Calibração no Teste\n")
+    L("Brier score = média de (P − y)²; menor é melhor.\n")
+    L("| Modelo | Brier | P média | Taxa real |")
+    L("| --- | --- | --- | --- |")
+    y_true = store.y("test")
+    for name in store.models:
+        p = store.proba(name, "test")
+        L(f"| {name} | {np.mean((p - y_true) ** 2):.4f} | {p.mean():.4f} | {y_true.mean():.4f} |")
+    L("")
+    best = comp["best_model"] if comp and comp["best_model"] in store.models else store.models[0]
+    p = store.proba(best, "test")
+    decile = np.minimum((np.argsort(np.argsort(p, kind="stable")) * 10) // len(p), 9)
+    L(f"Decis de P(atraso) — **{best}**:\n")
+    L("| Decil | P média | Taxa real | Voos |")
+    L("| --- | --- | --- | --- |")
+    for d in range(10):
+        m = decile == d
+        if m.any():
+            L(f"| {d + 1} | {p[m].mean():.4f} | {y_true[m].mean():.4f} | {int(m.sum()):,} |")
+    L("")
+
 # ---------- Seção 5: PCA ----------
 L("## 5. Análise PCA (Não Supervisionada)\n")
 if pca:
@@ -0,0 +1,218 @@
+"""
+Melhor Horário para Voar — P(IS_DELAYED) contrafactual em uma grade mês × dia × hora
+
+Para uma rota (origem, destino) e companhia, monta a grade inteira de voos
+hipotéticos — por default 12 meses × 7 dias da semana × 24 horas de partida —
+como uma única matriz e pontua tudo em uma chamada de `predict_proba`, pelo
+mesmo FeatureTransformer (encoders + scaler) do treino. Distância, duração
+programada e fuso (chegada − partida − duração) vêm do perfil da rota: as
+medianas dos voos processados (models/route_profiles.parquet).
+
+Input : data/processed/flights_sample_processed (perfis de rota)
+        models/ (encoders, scaler e o modelo escolhido)
+Output: models/route_profiles.parquet
+        data/processed/dashboard/ml_best_time.json  (grades das rotas mais voadas)
+
+Uso:
+    python src/best_time.py                           # melhor modelo do 03, 20 rotas
+    python src/best_time.py --model random_forest --routes 50 --engine numpy
+
+    from best_time import BestTimeScorer
+    scorer = BestTimeScorer.load()
+    result = scorer.grid("AA", "ATL", "LAX")          # result["proba"][mês, dia, hora]
+"""
+import argparse
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from score_batch import MODEL_DIR, load_model, load_transformer, model_input
+
+ROUTES_FILE = Path("./models/route_profiles.parquet")
+DASH        = Path("./data/processed/dashboard")
+GRID_MONTHS = tuple(range(1, 13))
+GRID_DAYS   = tuple(range(1, 8))
+GRID_HOURS  = tuple(range(24))
+ROUTE_KEY   = ["ORIGIN_AIRPORT", "DESTINATION_AIRPORT"]
+
+
+def _minutes(hhmm) -> np.ndarray:
+    hhmm = np.asarray(hhmm, dtype=np.int64)
+    return (hhmm // 100) * 60 + hhmm % 100
+
+
+def _hhmm(minutes) -> np.ndarray:
+    minutes = np.asarray(minutes, dtype=np.int64) % 1440
+    return (minutes // 60) * 100 + minutes % 60
+
+
+# ==============================================================================
+# Perfis de rota e grade
+# ==============================================================================
+def route_profiles(flights: pd.DataFrame) -> pd.DataFrame:
+    """Medianas de distância, duração e fuso por rota, nº de voos e companhia principal."""
+    df = pd.DataFrame({
+        "ORIGIN_AIRPORT": flights["ORIGIN_AIRPORT"].astype(str).to_numpy(),
+        "DESTINATION_AIRPORT": flights["DESTINATION_AIRPORT"].astype(str).to_numpy(),
+        "AIRLINE": flights["AIRLINE"].astype(str).to_numpy(),
+        "DISTANCE": flights["DISTANCE"].to_numpy(dtype=np.float64),
+        "SCHEDULED_TIME": flights["SCHEDULED_TIME"].to_numpy(dtype=np.float64),
+    })
+    # Fuso da rota: chegada − partida − duração, em minutos no intervalo [−720, 720)
+    elapsed = _minutes(flights["SCHEDULED_ARRIVAL"]) - _minutes(flights["SCHEDULED_DEPARTURE"])
+    df["TZ_OFFSET"] = (elapsed - df["SCHEDULED_TIME"] + 720) % 1440 - 720
+
+    grouped = df.groupby(ROUTE_KEY, sort=True)
+    profiles = grouped[["DISTANCE", "SCHEDULED_TIME", "TZ_OFFSET"]].median()
+    profiles["FLIGHTS"] = grouped.size()
+    by_airline = df.groupby(ROUTE_KEY + ["AIRLINE"], sort=True).size()
+    top = by_airline.sort_values(ascending=False, kind="stable").reset_index()
+    profiles["TOP_AIRLINE"] = top.drop_duplicates(ROUTE_KEY).set_index(ROUTE_KEY)["AIRLINE"]
+    return profiles
+
+
+def flight_grid(airline: str, origin: str, destination: str, distance: float,
+                scheduled_time: float, tz_offset: float = 0.0, months=GRID_MONTHS,
+                days=GRID_DAYS, hours=GRID_HOURS) -> pd.DataFrame:
+    """Voos hipotéticos da rota em todas as células mês × dia × hora (ordem C)."""
+    month, day, hour = (g.ravel() for g in np.meshgrid(months, days, hours, indexing="ij"))
+    departure = hour * 100
+    arrival = _hhmm(hour * 60 + round(scheduled_time + tz_offset))
+    n = len(month)
+    return pd.DataFrame({
+        "AIRLINE": np.full(n, airline, dtype=object),
+        "ORIGIN_AIRPORT": np.full(n, origin, dtype=object),
+        "DESTINATION_AIRPORT": np.full(n, destination, dtype=object),
+        "MONTH": month,
+        "DAY_OF_WEEK": day,
+        "SCHEDULED_DEPARTURE": departure,
+        "SCHEDULED_ARRIVAL": arrival,
+        "DISTANCE": np.full(n, distance, dtype=np.float64),
+        "SCHEDULED_TIME": np.full(n, scheduled_time, dtype=np.float64),
+    })
+
+
+def route_grid(profiles: pd.DataFrame, airline: str, origin: str, destination: str,
+               distance: float = None, scheduled_time: float = None, **axes) -> pd.DataFrame:
+    """`flight_grid` com distância / duração / fuso do perfil da rota (se não informados)."""
+    tz_offset = 0.0
+    if profiles is not None and (origin, destination) in profiles.index:
+        profile = profiles.loc[(origin, destination)]
+        distance = profile["DISTANCE"] if distance is None else distance
+        scheduled_time = profile["SCHEDULED_TIME"] if scheduled_time is None else scheduled_time
+        tz_offset = profile["TZ_OFFSET"]
+    if distance is None or scheduled_time is None:
+        raise KeyError(f"Rota {origin}→{destination} sem perfil: informe DISTANCE e SCHEDULED_TIME")
+    return flight_grid(airline, origin, destination, float(distance), float(scheduled_time),
+                       float(tz_offset), **axes)
+
+
+def summarize(proba: np.ndarray, months=GRID_MONTHS, days=GRID_DAYS, hours=GRID_HOURS) -> dict:
+    """Cubo mês × dia × hora → JSON: grade, melhor / pior célula e médias marginais."""
+    def cell(i):
+        m, d, h = np.unravel_index(i, proba.shape)
+        return {"month": int(months[m]), "day_of_week": int(days[d]), "hour": int(hours[h]),
+                "proba": round(float(proba[m, d, h]), 4)}
+
+    return {
+        "proba": np.round(proba, 4).tolist(),
+        "best": cell(int(np.argmin(proba))),
+        "worst": cell(int(np.argmax(proba))),
+        "by_month": np.round(proba.mean(axis=(1, 2)), 4).tolist(),
+        "by_day": np.round(proba.mean(axis=(0, 2)), 4).tolist(),
+        "by_hour": np.round(proba.mean(axis=(0, 1)), 4).tolist(),
+    }
+
+
+# ==============================================================================
+# Scorer
+# ==============================================================================
+class BestTimeScorer:
+    """Modelo + transformer + perfis de rota; uma chamada de predict_proba por grade."""
+
+    def __init__(self, model, transformer, profiles: pd.DataFrame = None):
+        self.model = model
+        self.transformer = transformer
+        self.profiles = profiles
+
+    @classmethod
+    def load(cls, model_dir: Path = MODEL_DIR, model_name: str = None, engine: str = "sklearn",
+             profiles_path: Path = ROUTES_FILE) -> "BestTimeScorer":
+        from risk_table import best_model_name
+
+        profiles = pd.read_parquet(profiles_path) if profiles_path.exists() else None
+        return cls(load_model(model_dir, model_name or best_model_name(), engine),
+                   load_transformer(model_dir), profiles)
+
+    def score(self, grid: pd.DataFrame) -> np.ndarray:
+        return self.model.predict_proba(model_input(self.model, self.transformer, grid))[:, 1]
+
+    def grid(self, airline: str, origin: str, destination: str, months=GRID_MONTHS,
+             days=GRID_DAYS, hours=GRID_HOURS, distance: float = None,
+             scheduled_time: float = None) -> dict:
+        """P(atraso) da rota em todas as células: result["proba"][mês, dia, hora]."""
+        grid = route_grid(self.profiles, airline, origin, destination, distance, scheduled_time,
+                          months=months, days=days, hours=hours)
+        proba = self.score(grid).reshape(len(months), len(days), len(hours))
+        return {"airline": airline, "origin": origin, "destination": destination,
+                "months": list(months), "days": list(days), "hours": list(hours), "proba": proba}
+
+
+def main():
+    from flights_io import load_processed_flights
+    from risk_table import best_model_name
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--model", default=None,
+                        help="nome do .pkl em --model-dir (default: melhor modelo do 03)")
+    parser.add_argument("--model-dir", type=Path, default=MODEL_DIR)
+    parser.add_argument("--engine", choices=["sklearn", "numpy"], default="sklearn")
+    parser.add_argument("--routes", type=int, default=20,
+                        help="rotas mais voadas exportadas para o dashboard")
+    args = parser.parse_args()
+
+    model_name = args.model or best_model_name()
+    print("=" * 80)
+    print(f"MELHOR HORÁRIO PARA VOAR — {model_name} ({args.engine})")
+    print("=" * 80)
+
+    flights = load_processed_flights(columns=["AIRLINE", *ROUTE_KEY, "DISTANCE", "SCHEDULED_TIME",
+                                              "SCHEDULED_DEPARTURE", "SCHEDULED_ARRIVAL"])
+    profiles = route_profiles(flights)
+    ROUTES_FILE.parent.mkdir(parents=True, exist_ok=True)
+    profiles.to_parquet(ROUTES_FILE)
+    print(f"✓ {len(profiles):,} perfis de rota → {ROUTES_FILE}")
+
+    scorer = BestTimeScorer(load_model(args.model_dir, model_name, args.engine),
+                            load_transformer(args.model_dir), profiles)
+    top = profiles.sort_values("FLIGHTS", ascending=False, kind="stable").head(args.routes)
+    grids, timings = [], []
+    for (origin, destination), profile in top.iterrows():
+        t0 = time.perf_counter()
+        result = scorer.grid(profile["TOP_AIRLINE"], origin, destination)
+        timings.append(time.perf_counter() - t0)
+        grids.append({
+            "airline": result["airline"], "origin": origin, "destination": destination,
+            "flights": int(profile["FLIGHTS"]),
+            "distance": round(float(profile["DISTANCE"]), 1),
+            "scheduled_time": round(float(profile["SCHEDULED_TIME"]), 1),
+            **summarize(result["proba"]),
+        })
+
+    output = {"model": model_name, "months": list(GRID_MONTHS), "days": list(GRID_DAYS),
+              "hours": list(GRID_HOURS), "grids": grids}
+    DASH.mkdir(parents=True, exist_ok=True)
+    with open(DASH / "ml_best_time.json", "w") as f:
+        json.dump(output, f, separators=(",", ":"))
+    cells = len(GRID_MONTHS) * len(GRID_DAYS) * len(GRID_HOURS)
+    print(f"✓ ml_best_time.json ({len(grids)} rotas × {cells} células)")
+    if timings:
+        print(f"  Grade por rota: mediana {np.median(timings) * 1000:.1f} ms, "
+              f"máx {max(timings) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Variáveis Derivadas — implementação única e vetorizada
+
+DelayCategory, Season, Hour e DEPARTURE_PERIOD eram recalculados com
+`Series.apply` linha a linha em cada script (com rótulos divergentes). Aqui
+cada derivação é um corte por bins (`np.searchsorted`) ou uma tabela de lookup
+indexada por inteiro, devolvendo `category` com rótulos canônicos — os mesmos
+consumidos pelo dashboard (`CATEGORY_COLORS` / `periodColors` em app.js).
+
+Uso:
+    from derived_features import delay_category, departure_period, is_delayed, season
+    df["IS_DELAYED"]       = is_delayed(df["ARRIVAL_DELAY"])
+    df["DelayCategory"]    = delay_category(df["ARRIVAL_DELAY"])
+    df["DEPARTURE_PERIOD"] = departure_period(df["SCHEDULED_DEPARTURE"])
+"""
+import numpy as np
+import pandas as pd
+
+UNKNOWN = "Unknown"
+
+# ── IS_DELAYED: atraso de chegada acima do limiar de negócio ───────────────────
+DELAY_THRESHOLD = 15   # minutos
+
+# ── DelayCategory: (-inf, 0] | (0, 15] | (15, 60] | (60, inf) ──────────────────
+DELAY_BINS   = np.array([0, 15, 60], dtype=np.float64)
+DELAY_LABELS = ["On Time", "Minor Delay", "Moderate Delay", "Major Delay"]
+
+# ── Season: lookup indexado pelo mês (posição 0 não é usada) ───────────────────
+SEASON_LABELS   = ["Winter", "Spring", "Summer", "Fall"]
+_SEASON_BY_MONTH = np.array([-1, 0, 0, 1, 1, 1, 2, 2, 2, 3, 3, 3, 0], dtype=np.int8)
+
+# ── DEPARTURE_PERIOD: lookup indexado pela hora (0–24; 2400 = meia-noite) ──────
+PERIOD_LABELS    = ["Morning", "Afternoon", "Evening", "Night"]
+_PERIOD_BY_HOUR = np.array(
+    [3] * 5          # 00–04  Night
+    + [0] * 7        # 05–11  Morning
+    + [1] * 5        # 12–16  Afternoon
+    + [2] * 4        # 17–20  Evening
+    + [3] * 4,       # 21–24  Night
+    dtype=np.int8,
+)
+
+
+def _categorical(codes: np.ndarray, labels: list, index) -> pd.Series:
+    """Monta a Series category; 'Unknown' só vira categoria se houver código -1."""
+    if (codes < 0).any():
+        codes = np.where(codes < 0, len(labels), codes).astype(np.int8)
+        labels = labels + [UNKNOWN]
+    return pd.Series(pd.Categorical.from_codes(codes, categories=labels), index=index)
+
+
+def departure_hour(scheduled: pd.Series) -> pd.Series:
+    """Hora cheia (0–24) de um horário HHMM; int8, ou float32 se houver nulos."""
+    values = scheduled.to_numpy(dtype=np.float64, na_value=np.nan)
+    hour = np.floor_divide(values, 100)
+    if np.isnan(hour).any():
+        return pd.Series(hour.astype(np.float32), index=scheduled.index)
+    return pd.Series(hour.astype(np.int8), index=scheduled.index)
+
+
+def is_delayed(arrival_delay: pd.Series) -> pd.Series:
+    """Target IS_DELAYED = ARRIVAL_DELAY > 15 min, em int8; nulos → 0.
+
+    Regra única do 02 (em memória e --streaming) e do update_encoders: o voo
+    não cancelado sem ARRIVAL_DELAY conta como não atrasado, não é descartado.
+    """
+    values = arrival_delay.to_numpy(dtype=np.float64, na_value=np.nan)
+    return pd.Series((values > DELAY_THRESHOLD).astype(np.int8), index=arrival_delay.index)
+
+
+def delay_category(arrival_delay: pd.Series) -> pd.Series:
+    """Categoriza o atraso de chegada em minutos; nulos → 'Unknown'."""
+    values = arrival_delay.to_numpy(dtype=np.float64, na_value=np.nan)
+    codes = np.searchsorted(DELAY_BINS, values, side="left").astype(np.int8)
+    codes[np.isnan(values)] = -1
+    return _categorical(codes, DELAY_LABELS, arrival_delay.index)
+
+
+def season(month: pd.Series) -> pd.Series:
+    """Estação (hemisfério norte) a partir do mês 1–12; fora da faixa → 'Unknown'."""
+    values = month.to_numpy(dtype=np.float64, na_value=np.nan)
+    valid = (values >= 1) & (values <= 12)
+    codes = np.full(len(values), -1, dtype=np.int8)
+    codes[valid] = _SEASON_BY_MONTH[values[valid].astype(np.intp)]
+    return _categorical(codes, SEASON_LABELS, month.index)
+
+
+def departure_period(scheduled: pd.Series) -> pd.Series:
+    """Período do dia de um horário HHMM (Morning 5–11h, Afternoon 12–16h,
+    Evening 17–20h, Night demais); nulos → 'Unknown'."""
+    hours = np.floor_divide(scheduled.to_numpy(dtype=np.float64, na_value=np.nan), 100)
+    valid = (hours >= 0) & (hours <= 24)
+    codes = np.full(len(hours), -1, dtype=np.int8)
+    codes[valid] = _PERIOD_BY_HOUR[hours[valid].astype(np.intp)]
+    return _categorical(codes, PERIOD_LABELS, scheduled.index)
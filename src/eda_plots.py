@@ -0,0 +1,342 @@
+"""
+Renderização dos Plots da EDA — jobs registrados, paralelos e incrementais
+
+Cada figura de `docs/eda_plots/` é um job registrado com `@plot_job`, que
+declara só as colunas de que precisa. `render_eda_plots` calcula o fingerprint
+de cada job (hash dos dados projetados + parâmetros + código da função) e
+renderiza em um pool de processos apenas os jobs cujo fingerprint mudou,
+registrando o resultado em `.plot_manifest.json`.
+
+Jobs com `prepare` (os scatters 12, 13 e 18) agregam os dados no processo pai
+em contagens 2D por bins (NumPy) e o worker desenha só a matriz agregada como
+heatmap: o custo de render fica constante com o número de linhas, e os bins
+são salvos em `.npz` para reuso.
+
+Uso:
+    from eda_plots import render_eda_plots
+    render_eda_plots(df_flights, Path("./docs/eda_plots"))              # dpi=300
+    render_eda_plots(df_flights, Path("./docs/eda_plots"), preview=True)  # dpi baixo
+"""
+import hashlib
+import inspect
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+from matplotlib.colors import LogNorm
+import seaborn as sns
+
+SEED = 42
+FINAL_DPI = 300
+PREVIEW_DPI = 72
+MANIFEST_NAME = '.plot_manifest.json'
+
+# Grade dos heatmaps de densidade (bins em x, bins em y) e corte de caudas (%)
+DENSITY_BINS = (120, 80)
+DENSITY_PERCENTILES = (0.5, 99.5)
+
+# Registro: nome do arquivo → {columns, render, title, figsize, prepare}
+PLOT_JOBS = {}
+
+
+def plot_job(filename: str, columns: list, title: str, figsize: tuple = (10, 5),
+             prepare=None):
+    """Decorator que registra uma função `render(data, ax)` como job de plot.
+
+    Com `prepare`, o worker recebe `prepare(data)` (ex.: bins agregados) no
+    lugar das colunas brutas, e o fingerprint é calculado sobre esse payload.
+    """
+    def decorator(render):
+        PLOT_JOBS[filename] = {
+            'columns': list(columns), 'render': render,
+            'title': title, 'figsize': tuple(figsize), 'prepare': prepare,
+        }
+        return render
+    return decorator
+
+
+def density_bins(x, y, bins: tuple = DENSITY_BINS,
+                 percentiles: tuple = DENSITY_PERCENTILES) -> dict:
+    """Contagens 2D + média de y por bin de x, em uma passada de `np.bincount`.
+
+    Os limites vêm dos percentis de cada eixo (caudas extremas ficam nas bordas),
+    então o resultado tem tamanho fixo qualquer que seja o número de linhas.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    ok = ~(np.isnan(x) | np.isnan(y))
+    x, y = x[ok], y[ok]
+    nx, ny = bins
+    x_lo, x_hi = np.percentile(x, percentiles)
+    y_lo, y_hi = np.percentile(y, percentiles)
+    x_hi, y_hi = max(x_hi, x_lo + 1e-9), max(y_hi, y_lo + 1e-9)
+    ix = np.clip(((x - x_lo) / (x_hi - x_lo) * nx).astype(np.intp), 0, nx - 1)
+    iy = np.clip(((y - y_lo) / (y_hi - y_lo) * ny).astype(np.intp), 0, ny - 1)
+    counts = np.bincount(ix * ny + iy, minlength=nx * ny).reshape(nx, ny)
+    x_count = counts.sum(axis=1)
+    y_sum = np.bincount(ix, weights=y, minlength=nx)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        y_mean = np.where(x_count > 0, y_sum / x_count, np.nan)
+    return {
+        'counts': counts,
+        'x_edges': np.linspace(x_lo, x_hi, nx + 1),
+        'y_edges': np.linspace(y_lo, y_hi, ny + 1),
+        'y_mean_by_x': y_mean,
+        'n': np.array([len(x)]),
+    }
+
+
+def _density_heatmap(payload: dict, ax, xlabel: str, ylabel: str, cmap: str):
+    """Desenha as contagens agregadas (escala log) + linha da média de y por bin."""
+    counts = np.ma.masked_equal(payload['counts'], 0)
+    mesh = ax.pcolormesh(payload['x_edges'], payload['y_edges'], counts.T,
+                         cmap=cmap, norm=LogNorm(), shading='flat')
+    centers = (payload['x_edges'][:-1] + payload['x_edges'][1:]) / 2
+    ax.plot(centers, payload['y_mean_by_x'], color='black', linewidth=1.5, label='Média por bin')
+    ax.figure.colorbar(mesh, ax=ax, label='Voos por bin')
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.legend(loc='upper right')
+
+
+# ==============================================================================
+# UNIVARIADAS
+# ==============================================================================
+@plot_job('01_arr_delay_distribution.png', ['ARRIVAL_DELAY'],
+          '01. Distribution of Arrival Delays (Cleaned)')
+def _arr_delay_hist(data, ax):
+    sns.histplot(data['ARRIVAL_DELAY'], bins=50, kde=True, ax=ax, color='steelblue')
+
+
+@plot_job('02_dep_delay_distribution.png', ['DEPARTURE_DELAY'],
+          '02. Distribution of Departure Delays')
+def _dep_delay_hist(data, ax):
+    sns.histplot(data['DEPARTURE_DELAY'], bins=50, kde=True, ax=ax, color='coral')
+
+
+@plot_job('03_distance_distribution.png', ['DISTANCE'], '03. Distribution of Flight Distances')
+def _distance_hist(data, ax):
+    sns.histplot(data['DISTANCE'], bins=50, ax=ax, color='green')
+
+
+@plot_job('04_airtime_distribution.png', ['AIR_TIME'], '04. Distribution of Air Time')
+def _airtime_hist(data, ax):
+    sns.histplot(data['AIR_TIME'], bins=50, ax=ax, color='purple')
+
+
+@plot_job('05_top_airlines.png', ['AIRLINE'], '05. Top 10 Airlines by Flight Count')
+def _top_airlines(data, ax):
+    top = data['AIRLINE'].value_counts().head(10)
+    sns.barplot(x=top.values, y=top.index.astype(str), palette='viridis', ax=ax)
+
+
+@plot_job('06_top_origins.png', ['ORIGIN_AIRPORT'], '06. Top 10 Origin Airports')
+def _top_origins(data, ax):
+    top = data['ORIGIN_AIRPORT'].value_counts().head(10)
+    sns.barplot(x=top.values, y=top.index.astype(str), palette='magma', ax=ax)
+
+
+@plot_job('07_top_dests.png', ['DESTINATION_AIRPORT'], '07. Top 10 Destination Airports')
+def _top_dests(data, ax):
+    top = data['DESTINATION_AIRPORT'].value_counts().head(10)
+    sns.barplot(x=top.values, y=top.index.astype(str), palette='magma', ax=ax)
+
+
+@plot_job('08_arrdelay_boxplot.png', ['ARRIVAL_DELAY'],
+          '08. Boxplot of Arrival Delays (Outliers Managed)')
+def _arr_delay_box(data, ax):
+    sns.boxplot(x=data['ARRIVAL_DELAY'], color='lightblue', ax=ax)
+
+
+@plot_job('09_delay_category_pie.png', ['DelayCategory'], '09. Delay Categories Proportion',
+          figsize=(8, 8))
+def _delay_category_pie(data, ax):
+    cats = data['DelayCategory'].value_counts()
+    cats = cats[cats > 0]
+    ax.pie(cats, labels=cats.index.astype(str), autopct='%1.1f%%', startangle=90)
+
+
+@plot_job('10_season_distribution.png', ['Season'], '10. Flights by Season')
+def _season_bar(data, ax):
+    counts = data['Season'].value_counts()
+    sns.barplot(x=counts.index.astype(str), y=counts.values, palette='coolwarm', ax=ax)
+
+
+# ==============================================================================
+# BIVARIADAS
+# ==============================================================================
+CORR_COLS = ['ARRIVAL_DELAY', 'DEPARTURE_DELAY', 'DISTANCE', 'AIR_TIME', 'TAXI_OUT', 'TAXI_IN']
+
+
+@plot_job('11_correlation_matrix.png', CORR_COLS, '11. Correlation Matrix', figsize=(10, 8))
+def _correlation_heatmap(data, ax):
+    sns.heatmap(data[CORR_COLS].corr(), annot=True, cmap='coolwarm', fmt=".2f", ax=ax, square=True)
+
+
+def _bins_xy(x_col: str, y_col: str):
+    """`prepare` dos heatmaps: agrega (x_col, y_col) em density_bins."""
+    def prepare(data):
+        return density_bins(data[x_col], data[y_col])
+    return prepare
+
+
+@plot_job('12_distance_vs_arrdelay.png', ['DISTANCE', 'ARRIVAL_DELAY'],
+          '12. Distance vs Arrival Delay', prepare=_bins_xy('DISTANCE', 'ARRIVAL_DELAY'))
+def _distance_density(payload, ax):
+    _density_heatmap(payload, ax, 'DISTANCE', 'ARRIVAL_DELAY', cmap='Blues')
+
+
+@plot_job('13_depdelay_vs_arrdelay.png', ['DEPARTURE_DELAY', 'ARRIVAL_DELAY'],
+          '13. Departure Delay vs Arrival Delay (High Corr)',
+          prepare=_bins_xy('DEPARTURE_DELAY', 'ARRIVAL_DELAY'))
+def _depdelay_density(payload, ax):
+    _density_heatmap(payload, ax, 'DEPARTURE_DELAY', 'ARRIVAL_DELAY', cmap='Reds')
+
+
+@plot_job('14_arrdelay_by_airline_boxplot.png', ['AIRLINE', 'ARRIVAL_DELAY'],
+          '14. Arrival Delay Distribution by Airline', figsize=(14, 6))
+def _airline_box(data, ax):
+    sns.boxplot(x='AIRLINE', y='ARRIVAL_DELAY', data=data, ax=ax)
+
+
+@plot_job('15_avg_delay_by_dayofweek.png', ['DAY_OF_WEEK', 'ARRIVAL_DELAY'],
+          '15. Average Arrival Delay by Day of Week')
+def _dow_bar(data, ax):
+    dow = data.groupby('DAY_OF_WEEK')['ARRIVAL_DELAY'].mean()
+    sns.barplot(x=dow.index, y=dow.values, palette='husl', ax=ax)
+
+
+@plot_job('16_avg_delay_by_month.png', ['MONTH', 'ARRIVAL_DELAY'],
+          '16. Average Arrival Delay by Month')
+def _month_bar(data, ax):
+    month = data.groupby('MONTH')['ARRIVAL_DELAY'].mean()
+    sns.barplot(x=month.index, y=month.values, palette='coolwarm', ax=ax)
+
+
+@plot_job('17_avg_delay_by_airline.png', ['AIRLINE', 'ARRIVAL_DELAY'],
+          '17. Average Arrival Delay by Airline', figsize=(12, 6))
+def _airline_bar(data, ax):
+    avg = data.groupby('AIRLINE', observed=True)['ARRIVAL_DELAY'].mean().sort_values(ascending=False)
+    sns.barplot(x=avg.index.astype(str), y=avg.values, palette='rocket', ax=ax)
+
+
+@plot_job('18_airtime_vs_arrdelay.png', ['AIR_TIME', 'ARRIVAL_DELAY'], '18. AirTime vs Arrival Delay',
+          prepare=_bins_xy('AIR_TIME', 'ARRIVAL_DELAY'))
+def _airtime_density(payload, ax):
+    _density_heatmap(payload, ax, 'AIR_TIME', 'ARRIVAL_DELAY', cmap='Greens')
+
+
+@plot_job('19_delay_by_hour.png', ['Hour', 'ARRIVAL_DELAY'],
+          '19. Average Arrival Delay by Hour of Day', figsize=(12, 5))
+def _hour_line(data, ax):
+    hour = data.groupby('Hour')['ARRIVAL_DELAY'].mean()
+    sns.lineplot(x=hour.index, y=hour.values, ax=ax, linewidth=3, color='orange')
+    ax.set_xticks(range(0, 24))
+
+
+@plot_job('20_temporal_trend.png', ['MONTH'], '20. Flight Volume Trend Over Months', figsize=(14, 5))
+def _temporal_line(data, ax):
+    trend = data.groupby('MONTH').size()
+    sns.lineplot(x=trend.index, y=trend.values, marker='o', color='purple', ax=ax)
+
+
+# ==============================================================================
+# Execução
+# ==============================================================================
+def job_fingerprint(filename: str, data, dpi: int) -> str:
+    """sha256 dos dados do job (colunas ou payload agregado) + parâmetros + código."""
+    job = PLOT_JOBS[filename]
+    h = hashlib.sha256()
+    if isinstance(data, pd.DataFrame):
+        h.update(pd.util.hash_pandas_object(data, index=False).to_numpy().tobytes())
+        dtypes = [str(t) for t in data.dtypes]
+    else:
+        for key in sorted(data):
+            h.update(key.encode())
+            h.update(np.ascontiguousarray(data[key]).tobytes())
+        dtypes = [str(data[k].dtype) for k in sorted(data)]
+    h.update(json.dumps({
+        'columns': job['columns'], 'dtypes': dtypes,
+        'title': job['title'], 'figsize': job['figsize'], 'dpi': dpi,
+    }, sort_keys=True).encode())
+    h.update(inspect.getsource(job['render']).encode())
+    return h.hexdigest()
+
+
+def _render_one(filename: str, data, out_path: str, dpi: int) -> float:
+    """Worker: renderiza um job e devolve o tempo gasto (roda no processo filho)."""
+    t = time.time()
+    job = PLOT_JOBS[filename]
+    sns.set_style('whitegrid')
+    fig, ax = plt.subplots(figsize=job['figsize'])
+    job['render'](data, ax)
+    ax.set_title(job['title'])
+    fig.savefig(out_path, bbox_inches='tight', dpi=dpi)
+    plt.close(fig)
+    return time.time() - t
+
+
+def render_eda_plots(
+    df: pd.DataFrame,
+    out_dir: Path,
+    preview: bool = False,
+    force: bool = False,
+    workers: int = None,
+    bins_dir: Path = None,
+) -> dict:
+    """Renderiza os jobs registrados cujo fingerprint mudou desde a última execução.
+
+    `preview=True` usa PREVIEW_DPI e grava em `out_dir/preview/` sem tocar nas
+    figuras finais. Os payloads agregados (jobs com `prepare`) são salvos em
+    `bins_dir/<figura>.npz` quando informado. Retorna {'rendered': [...], 'skipped': [...]}.
+    """
+    dpi = PREVIEW_DPI if preview else FINAL_DPI
+    out_dir = out_dir / 'preview' if preview else out_dir
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    manifest_path = out_dir / MANIFEST_NAME
+    manifest = {}
+    if manifest_path.exists() and not force:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+
+    pending, skipped = {}, []
+    for filename, job in PLOT_JOBS.items():
+        data = df[job['columns']]
+        if job['prepare'] is not None:
+            data = job['prepare'](data)
+            if bins_dir is not None:
+                bins_dir.mkdir(parents=True, exist_ok=True)
+                np.savez_compressed(bins_dir / f"{Path(filename).stem}.npz", **data)
+        fp = job_fingerprint(filename, data, dpi)
+        if manifest.get(filename) == fp and (out_dir / filename).exists():
+            skipped.append(filename)
+        else:
+            pending[filename] = (data, fp)
+
+    rendered = []
+    if pending:
+        workers = workers or min(len(pending), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                filename: pool.submit(_render_one, filename, data, str(out_dir / filename), dpi)
+                for filename, (data, _) in pending.items()
+            }
+            for filename, fut in futures.items():
+                elapsed = fut.result()
+                manifest[filename] = pending[filename][1]
+                rendered.append(filename)
+                print(f"  ✓ {filename}  ({elapsed:.1f}s)")
+
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    print(f"  Plots: {len(rendered)} renderizados, {len(skipped)} sem mudança (dpi={dpi})")
+    return {'rendered': rendered, 'skipped': skipped}
@@ -0,0 +1,232 @@
+"""
+Feature Store — splits X_/y_ compactos em Parquet (float32 / int8, row groups)
+
+Os splits gerados pelo `02_feature_engineering.py` saem no menor tipo que
+preserva o conteúdo:
+
+    X_{split}.parquet      features contínuas em float32, indicadores OHE
+                           (PERIOD_*) em int8 — row groups de ROW_GROUP_SIZE
+                           linhas, para leitura em streaming
+    y_{split}.parquet      IS_DELAYED em int8
+    codes_{split}.parquet  códigos inteiros (int16) das categorias antes do
+                           encoding (AIRLINE, ORIGIN/DESTINATION_AIRPORT,
+                           DEPARTURE_PERIOD) contra as chaves do
+                           FeatureTransformer — re-encoding sem voltar ao CSV
+
+Os Parquet são comprimidos (zstd): lê-los sempre descomprime e copia. Para
+o memory-map de fato, `read_split` materializa na primeira leitura uma cópia
+descomprimida de X_/y_ em .npy (data/processed/mmap/, X float32 em ordem
+Fortran, refeita quando o Parquet muda) e abre com `np.load(mmap_mode="r")`:
+o DataFrame é uma vista sobre as páginas do arquivo, sem cópia, e os
+processos do treino concorrente mapeiam o mesmo arquivo. Com `mmap=False` (ou
+um subconjunto de colunas) a matriz float32 é montada coluna a coluna do
+Parquet, uma única cópia sem DataFrame intermediário em float64. A escrita
+também pode ser feita bloco a bloco (`SplitWriter`), com memória limitada a
+um row group por arquivo.
+
+Uso:
+    from feature_store import read_split, write_split
+    write_split("train", X_train_scaled, y_train, codes=codes_train)
+    X_train, y_train = read_split("train")       # DataFrame float32 (memory-map), Series int8
+"""
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+FEATURE_DIR        = Path("./data/processed")
+ROW_GROUP_SIZE     = 128 * 1024
+COMPRESSION        = "zstd"
+MMAP_DIR           = "mmap"
+INDICATOR_PREFIXES = ("PERIOD_",)
+TARGET             = "IS_DELAYED"
+
+
+def is_indicator(col: str) -> bool:
+    return col.startswith(INDICATOR_PREFIXES)
+
+
+class RowGroupWriter:
+    """Grava um Parquet em blocos: acumula tabelas Arrow e escreve row groups
+    completos de ROW_GROUP_SIZE linhas (o resto vai no `close`). Colunas
+    dictionary são gravadas decodificadas (cada bloco traz o seu dicionário)."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.rows = 0
+        self._buffer = []
+        self._buffered = 0
+        self._writer = None
+
+    def write(self, table) -> None:
+        import pyarrow as pa
+
+        fields = [pa.field(f.name, f.type.value_type) if pa.types.is_dictionary(f.type) else f
+                  for f in table.schema]
+        self._buffer.append(table.cast(pa.schema(fields)))
+        self._buffered += table.num_rows
+        self.rows += table.num_rows
+        if self._buffered >= ROW_GROUP_SIZE:
+            self._flush(final=False)
+
+    def _flush(self, final: bool) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if not self._buffer:
+            return
+        table = pa.concat_tables(self._buffer)
+        n_full = len(table) if final else len(table) // ROW_GROUP_SIZE * ROW_GROUP_SIZE
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self.path, table.schema, compression=COMPRESSION)
+        if n_full:
+            self._writer.write_table(table.slice(0, n_full), row_group_size=ROW_GROUP_SIZE)
+        rest = table.slice(n_full)
+        self._buffer, self._buffered = ([rest], len(rest)) if len(rest) else ([], 0)
+
+    def close(self) -> Path:
+        self._flush(final=True)
+        if self._writer is not None:
+            self._writer.close()
+        return self.path
+
+
+class SplitWriter:
+    """X_/y_/codes_ de um split gravados bloco a bloco (ex.: `--streaming` do 02)."""
+
+    def __init__(self, name: str, out_dir: Path = FEATURE_DIR):
+        out_dir.mkdir(parents=True, exist_ok=True)
+        self.x = RowGroupWriter(out_dir / f"X_{name}.parquet")
+        self.y = RowGroupWriter(out_dir / f"y_{name}.parquet")
+        self.codes = RowGroupWriter(out_dir / f"codes_{name}.parquet")
+
+    @property
+    def rows(self) -> int:
+        return self.x.rows
+
+    def write(self, X: pd.DataFrame, y, codes: pd.DataFrame = None) -> None:
+        import pyarrow as pa
+
+        arrays = [
+            pa.array(X[col].to_numpy(dtype=np.int8 if is_indicator(col) else np.float32))
+            for col in X.columns
+        ]
+        self.x.write(pa.Table.from_arrays(arrays, names=list(X.columns)))
+        self.y.write(pa.table({TARGET: pa.array(np.asarray(y, dtype=np.int8))}))
+        if codes is not None:
+            self.codes.write(pa.table({c: pa.array(codes[c].to_numpy(dtype=np.int16))
+                                       for c in codes.columns}))
+
+    def close(self) -> list:
+        writers = [self.x, self.y] + ([self.codes] if self.codes.rows else [])
+        return [w.close() for w in writers]
+
+
+def write_split(name: str, X: pd.DataFrame, y, codes: pd.DataFrame = None,
+                out_dir: Path = FEATURE_DIR) -> list:
+    """Grava X_/y_/codes_ de um split nos tipos compactos; retorna os caminhos."""
+    writer = SplitWriter(name, out_dir)
+    writer.write(X, y, codes)
+    return writer.close()
+
+
+def _open(path: Path, columns: list = None):
+    import pyarrow.parquet as pq
+
+    return pq.read_table(path, columns=columns)
+
+
+def _matrix(table, dtype) -> np.ndarray:
+    """Tabela Arrow → matriz (n, k) em ordem Fortran: cada coluna é copiada uma
+    única vez, já convertida, para uma fatia contígua."""
+    out = np.empty((table.num_rows, table.num_columns), dtype=dtype, order="F")
+    for j, column in enumerate(table.columns):
+        out[:, j] = column.to_numpy()
+    return out
+
+
+def _is_fresh(target: Path, source: Path) -> bool:
+    return target.exists() and target.stat().st_mtime_ns >= source.stat().st_mtime_ns
+
+
+def materialize_split(name: str, out_dir: Path = FEATURE_DIR) -> tuple:
+    """Cópias .npy descomprimidas de X_/y_ (X float32 em ordem Fortran, y int8)
+    em `out_dir`/mmap/, gravadas row group a row group; refeitas só se o Parquet
+    for mais novo. Retorna os caminhos (X, y)."""
+    import pyarrow.parquet as pq
+
+    paths = []
+    for prefix, dtype in (("X", np.float32), ("y", np.int8)):
+        src = out_dir / f"{prefix}_{name}.parquet"
+        dst = out_dir / MMAP_DIR / f"{prefix}_{name}.npy"
+        paths.append(dst)
+        if _is_fresh(dst, src):
+            continue
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        pf = pq.ParquetFile(src)
+        n_rows, n_cols = pf.metadata.num_rows, len(pf.schema_arrow.names)
+        tmp = dst.with_suffix(".tmp.npy")
+        out = np.lib.format.open_memmap(tmp, mode="w+", dtype=dtype, fortran_order=True,
+                                        shape=(n_rows, n_cols) if prefix == "X" else (n_rows,))
+        row = 0
+        for i in range(pf.num_row_groups):
+            table = pf.read_row_group(i)
+            block = _matrix(table, dtype) if prefix == "X" else table.column(0).to_numpy()
+            out[row:row + len(block)] = block
+            row += len(block)
+        out.flush()
+        del out
+        tmp.replace(dst)
+    return tuple(paths)
+
+
+def read_split(name: str, out_dir: Path = FEATURE_DIR, columns: list = None,
+               dtype=np.float32, mmap: bool = True) -> tuple:
+    """(X, y) de um split: X DataFrame `dtype` (float32) sobre uma única matriz, y int8.
+
+    Com `mmap` (default, X inteiro em float32) X e y são vistas somente-leitura
+    sobre os .npy de `materialize_split`; senão, uma cópia lida do Parquet.
+    """
+    if mmap and columns is None and np.dtype(dtype) == np.float32:
+        x_path, y_path = materialize_split(name, out_dir)
+        X = pd.DataFrame(np.load(x_path, mmap_mode="r"), columns=split_layout(name, out_dir)[0],
+                         copy=False)
+        y = pd.Series(np.load(y_path, mmap_mode="r"), name=TARGET, copy=False)
+        return X, y
+    table = _open(out_dir / f"X_{name}.parquet", columns)
+    X = pd.DataFrame(_matrix(table, dtype), columns=table.column_names, copy=False)
+    y = read_target(name, out_dir)
+    return X, y
+
+
+def read_target(name: str, out_dir: Path = FEATURE_DIR) -> pd.Series:
+    table = _open(out_dir / f"y_{name}.parquet")
+    return pd.Series(table.column(0).to_numpy(), name=table.column_names[0])
+
+
+def read_codes(name: str, out_dir: Path = FEATURE_DIR) -> pd.DataFrame:
+    """Códigos int16 das categorias (−1 = fora das chaves do treino)."""
+    return _open(out_dir / f"codes_{name}.parquet").to_pandas()
+
+
+def split_layout(name: str, out_dir: Path = FEATURE_DIR) -> tuple:
+    """(colunas de X, nº de row groups) de um split, só pelos metadados do Parquet."""
+    import pyarrow.parquet as pq
+
+    fx = pq.ParquetFile(out_dir / f"X_{name}.parquet")
+    return fx.schema_arrow.names, fx.num_row_groups
+
+
+def iter_split(name: str, out_dir: Path = FEATURE_DIR, dtype=np.float32, row_groups=None):
+    """Gera (X, y) por row group — para treino/scoring em streaming.
+
+    `row_groups` escolhe a ordem (ex.: uma permutação por época); default: todos, em ordem.
+    """
+    import pyarrow.parquet as pq
+
+    fx = pq.ParquetFile(out_dir / f"X_{name}.parquet")
+    fy = pq.ParquetFile(out_dir / f"y_{name}.parquet")
+    for i in range(fx.num_row_groups) if row_groups is None else row_groups:
+        X = _matrix(fx.read_row_group(i), dtype)
+        y = fy.read_row_group(i).column(0).to_numpy()
+        yield X, y
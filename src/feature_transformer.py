@@ -0,0 +1,656 @@
+"""
+FeatureTransformer — encoders.json + scaler.pkl como um objeto ajustado e reutilizável
+
+Reúne as etapas 4–6 do `02_feature_engineering.py` (imputação pela mediana,
+target encoding, one-hot de DEPARTURE_PERIOD e StandardScaler) em um único
+objeto com fit / transform / save / load, para que treino e qualquer caminho
+de scoring apliquem exatamente a mesma transformação.
+
+No transform, os dicionários string → média do encoders.json viram arrays
+NumPy: as categorias de cada coluna são resolvidas uma vez por `searchsorted`
+contra as chaves ordenadas e cada linha vira um índice inteiro no array de
+valores (não vistas → média global). Imputação, encoding, OHE e padronização
+preenchem uma única matriz float64 em uma passada vetorizada. O StandardScaler
+(scaler.pkl) padroniza só as colunas contínuas — numéricas e target encoding,
+`scaled_columns` no encoders.json; os indicadores OHE ficam fora dele e
+continuam 0/1 (contrato do encoders.json 2.0; até a 1.x o scaler.pkl
+padronizava também os PERIOD_*).
+
+Os artefatos guardam também as estatísticas suficientes do ajuste (voos e
+atrasados por categoria, Σx e Σx² das features para o scaler): `update`
+absorve um novo lote rotulado somando a elas, sem reprocessar o histórico
+(ver src/update_encoders.py).
+
+`fingerprint()` identifica a transformação (medianas, tabelas de encoding,
+OHE e momentos do scaler). O 03 grava em models/models_manifest.json o
+fingerprint do transformer com que os modelos foram treinados, e os caminhos
+de scoring recusam um par modelo/transformer divergente
+(`check_models_manifest`) — um transformer atualizado exige retreino.
+
+Artefatos em `models/`:
+    encoders.json              formato legível (contrato existente)
+    scaler.pkl                 StandardScaler do sklearn sobre as `scaled_columns`
+    feature_transformer.npz    sidecar binário com os mesmos arrays — é o que
+                               `load` lê, sem parsear JSON nem unpickle
+
+Uso:
+    from feature_transformer import FeatureTransformer
+    ft = FeatureTransformer.load(Path("./models"))
+    X = ft.transform_frame(df_voos)      # DataFrame com ft.feature_columns
+"""
+import hashlib
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from derived_features import departure_period
+
+FEATURES_NUM = [
+    "MONTH",
+    "DAY_OF_WEEK",
+    "SCHEDULED_DEPARTURE",
+    "SCHEDULED_ARRIVAL",
+    "DISTANCE",
+    "SCHEDULED_TIME",
+]
+FEATURES_CAT_TARGET_ENC = ["AIRLINE", "ORIGIN_AIRPORT", "DESTINATION_AIRPORT"]
+OHE_COL    = "DEPARTURE_PERIOD"
+OHE_PREFIX = "PERIOD"
+UNKNOWN    = "UNKNOWN"
+
+ENCODERS_FILE = "encoders.json"
+SCALER_FILE   = "scaler.pkl"
+SIDECAR_FILE  = "feature_transformer.npz"
+MANIFEST_FILE = "models_manifest.json"
+ENCODERS_VERSION = "2.0"   # 2.0: scaler.pkl só sobre `scaled_columns` (sem os PERIOD_*)
+
+# Target encoding: suavização aditiva rumo à média global (pseudo-contagem) e
+# nº de folds do encoding out-of-fold do treino
+TE_SMOOTHING = 20.0
+TE_FOLDS     = 5
+
+
+def factorize_sorted(column: pd.Series) -> tuple:
+    """(chaves ordenadas como str, código inteiro de cada linha) — via categorias, sem
+    ordenar as linhas. Nulos viram 'UNKNOWN'."""
+    cat = column if isinstance(column.dtype, pd.CategoricalDtype) else column.astype("category")
+    if cat.isna().any():
+        cat = cat.cat.add_categories([UNKNOWN]) if UNKNOWN not in cat.cat.categories else cat
+        cat = cat.fillna(UNKNOWN)
+    labels = cat.cat.categories.astype(str).to_numpy(dtype=object).astype(str)
+    order = np.argsort(labels, kind="stable")
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order))
+    return labels[order], rank[cat.cat.codes.to_numpy()]
+
+
+def category_codes(column: pd.Series, keys: np.ndarray) -> np.ndarray:
+    """Posição de cada valor de `column` em `keys` (ordenado); -1 se não estiver.
+
+    A busca roda sobre as categorias distintas, não sobre as linhas: a coluna é
+    tratada como category e cada linha só indexa a tabela das categorias.
+    Nulos são procurados como 'UNKNOWN' (o valor de preenchimento do treino).
+    """
+    cat = column if isinstance(column.dtype, pd.CategoricalDtype) else column.astype("category")
+    labels = np.append(cat.cat.categories.astype(str).to_numpy(dtype=object), UNKNOWN).astype(str)
+    if len(keys):
+        pos = np.minimum(np.searchsorted(keys, labels), len(keys) - 1)
+        lookup = np.where(keys[pos] == labels, pos, -1)
+    else:
+        lookup = np.full(len(labels), -1)
+    codes = cat.cat.codes.to_numpy()
+    return lookup[np.where(codes < 0, len(labels) - 1, codes)]
+
+
+def merge_keyed(keys_a: np.ndarray, a: np.ndarray, keys_b: np.ndarray, b: np.ndarray) -> tuple:
+    """União de duas tabelas indexadas por chaves ordenadas (no último eixo),
+    somando os valores das chaves em comum."""
+    keys = np.union1d(keys_a, keys_b)
+    out = np.zeros(a.shape[:-1] + (len(keys),), dtype=np.result_type(a, b))
+    out[..., np.searchsorted(keys, keys_a)] += a
+    out[..., np.searchsorted(keys, keys_b)] += b
+    return keys, out
+
+
+class FeatureTransformer:
+    """Imputação + target encoding + OHE + StandardScaler ajustados no treino."""
+
+    def __init__(self, num_cols: list = FEATURES_NUM, te_cols: list = FEATURES_CAT_TARGET_ENC,
+                 ohe_col: str = OHE_COL, smoothing: float = TE_SMOOTHING, n_folds: int = TE_FOLDS):
+        self.num_cols = list(num_cols)
+        self.te_cols = list(te_cols)
+        self.ohe_col = ohe_col
+        self.medians = {}          # col → mediana do treino
+        self.te_keys = {}          # col → np.ndarray[str] ordenado
+        self.te_values = {}        # col → np.ndarray[float64] alinhado às chaves
+        self.te_counts = {}        # col → nº de voos por categoria no treino
+        self.te_sums = {}          # col → nº de atrasados por categoria no treino
+        self.smoothing = smoothing
+        self.n_folds = n_folds
+        self.global_mean = float("nan")
+        self.ohe_keys = np.empty(0, dtype=str)
+        self.mean_ = None
+        self.scale_ = None
+        self.scaler = None         # StandardScaler (só após fit ou load_json)
+        # Estatísticas suficientes (mescláveis) para `update` sem refit
+        self.n_samples_ = 0
+        self.n_positive_ = 0
+        self.feature_sum_ = None   # Σx  da matriz codificada, por feature
+        self.feature_sumsq_ = None # Σx² da matriz codificada, por feature
+        self._partial = None       # acumuladores do ajuste em streaming (partial_fit)
+        self._oof_tables = {}      # col → (n_folds, categorias): encoding out-of-fold
+
+    # ── Colunas de saída ───────────────────────────────────────────────────────
+    @property
+    def ohe_columns(self) -> list:
+        return [f"{OHE_PREFIX}_{k}" for k in self.ohe_keys]
+
+    @property
+    def feature_columns(self) -> list:
+        return self.num_cols + self.te_cols + self.ohe_columns
+
+    @property
+    def scaled_columns(self) -> list:
+        """Colunas padronizadas pelo scaler; os indicadores OHE ficam de fora."""
+        return self.num_cols + self.te_cols
+
+    # ── Fit ────────────────────────────────────────────────────────────────────
+    def fit(self, X: pd.DataFrame, y: pd.Series) -> "FeatureTransformer":
+        """Ajusta medianas, target encoding, colunas OHE e o scaler no treino."""
+        self.fit_transform(X, y)
+        return self
+
+    def fit_transform(self, X: pd.DataFrame, y: pd.Series) -> np.ndarray:
+        """Ajusta no treino e devolve a matriz padronizada do próprio treino.
+
+        No treino o target encoding é out-of-fold: cada linha recebe a média
+        suavizada calculada sem o seu fold, para não ver o próprio rótulo. O
+        scaler é ajustado sobre essa matriz (a que o modelo de fato recebe).
+        """
+        from sklearn.preprocessing import StandardScaler
+
+        y = np.asarray(y, dtype=np.float64)
+        self.global_mean = float(y.mean())
+        self.medians = {c: float(X[c].median()) for c in self.num_cols}
+
+        # Como pd.get_dummies: category → todas as categorias; demais → valores vistos
+        ohe = X[self.ohe_col]
+        values = (ohe.cat.categories if isinstance(ohe.dtype, pd.CategoricalDtype)
+                  else ohe.dropna().unique())
+        self.ohe_keys = np.array(sorted(str(v) for v in values))
+
+        oof = self._fit_target_encoding(X, y)
+        out = self.encode(X)
+        n_num = len(self.num_cols)
+        out[:, n_num:n_num + len(self.te_cols)] = oof
+
+        n_scaled = len(self.scaled_columns)
+        self.scaler = StandardScaler().fit(pd.DataFrame(out[:, :n_scaled], columns=self.scaled_columns))
+        self.mean_, self.scale_ = self._with_indicators(self.scaler.mean_, self.scaler.scale_)
+        self.n_samples_ = len(y)
+        self.n_positive_ = int(round(y.sum()))
+        self.feature_sum_ = out.sum(axis=0)
+        self.feature_sumsq_ = np.einsum("ij,ij->j", out, out)
+        out -= self.mean_
+        out /= self.scale_
+        return out
+
+    def _smoothed(self, sums, counts, prior: float):
+        return (sums + self.smoothing * prior) / (counts + self.smoothing)
+
+    def _fit_target_encoding(self, X: pd.DataFrame, y: np.ndarray) -> np.ndarray:
+        """Estatísticas por categoria e encoding out-of-fold do treino.
+
+        As três colunas são codificadas em inteiros com offsets em um espaço
+        único; um único `np.bincount` sobre (fold, código) gera somas e
+        contagens de todos os folds e colunas. O total é a soma dos folds e o
+        out-of-fold de cada fold é total − fold; os folds são montados em threads.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        n, k = len(y), self.n_folds
+        keys, codes, offsets = [], [], [0]
+        for col in self.te_cols:
+            col_keys, col_codes = factorize_sorted(X[col])
+            keys.append(col_keys)
+            codes.append(col_codes + offsets[-1])
+            offsets.append(offsets[-1] + len(col_keys))
+        codes = np.stack(codes)                                   # (n_cols, n)
+        width = offsets[-1]
+
+        folds = np.random.RandomState(42).permutation(n) % k
+        flat = (folds * width + codes).ravel()
+        y_rep = np.tile(y, len(self.te_cols))
+        sums = np.bincount(flat, weights=y_rep, minlength=k * width).reshape(k, width)
+        counts = np.bincount(flat, minlength=k * width).reshape(k, width)
+        total_sums, total_counts = sums.sum(axis=0), counts.sum(axis=0)
+
+        for j, col in enumerate(self.te_cols):
+            span = slice(offsets[j], offsets[j + 1])
+            seen = total_counts[span] > 0                         # observed=True
+            self.te_keys[col] = keys[j][seen]
+            self.te_counts[col] = total_counts[span][seen].astype(np.int64)
+            self.te_sums[col] = np.rint(total_sums[span][seen]).astype(np.int64)
+            self.te_values[col] = self._smoothed(self.te_sums[col], self.te_counts[col],
+                                                 self.global_mean)
+
+        oof = np.empty((n, len(self.te_cols)), dtype=np.float64)
+        y_by_fold = np.bincount(folds, weights=y, minlength=k)
+        n_by_fold = np.bincount(folds, minlength=k)
+
+        def encode_fold(f: int):
+            rows = np.flatnonzero(folds == f)
+            prior = (y.sum() - y_by_fold[f]) / (n - n_by_fold[f])
+            table = self._smoothed(total_sums - sums[f], total_counts - counts[f], prior)
+            oof[rows] = table[codes[:, rows]].T
+
+        with ThreadPoolExecutor(max_workers=k) as pool:
+            list(pool.map(encode_fold, range(k)))
+        return oof
+
+    # ── Atualização incremental ────────────────────────────────────────────────
+    def update(self, X: pd.DataFrame, y: pd.Series) -> "FeatureTransformer":
+        """Absorve um novo lote de voos rotulados sem reprocessar o histórico.
+
+        Soma contagens e atrasados por categoria (categorias novas entram nas
+        chaves), recalcula as médias suavizadas e a média global, e acrescenta
+        Σx / Σx² do lote já codificado às estatísticas do scaler. O custo é
+        O(linhas do lote + categorias). Medianas e colunas OHE ficam fixas.
+
+        Nas colunas de target encoding, Σx / Σx² de todo o histórico são
+        recalculados das contagens por categoria com as médias atualizadas: o
+        histórico foi somado com o encoding antigo (out-of-fold, no ajuste em
+        memória) e misturá-lo com o do lote daria momentos de dois encodings.
+        O transformer resultante muda o `fingerprint` — modelos treinados com
+        o anterior precisam de retreino.
+        """
+        if not self.te_counts or self.feature_sum_ is None:
+            raise ValueError("Transformer sem estatísticas suficientes — reajuste com o "
+                             "02_feature_engineering.py antes de atualizar")
+        y = np.asarray(y, dtype=np.float64)
+
+        for col in self.te_cols:
+            new_keys, codes = factorize_sorted(X[col])
+            counts = np.bincount(codes, minlength=len(new_keys))
+            positives = np.rint(np.bincount(codes, weights=y, minlength=len(new_keys))).astype(np.int64)
+            seen = counts > 0
+            keys, merged = merge_keyed(self.te_keys[col], np.stack([self.te_counts[col], self.te_sums[col]]),
+                                       new_keys[seen], np.stack([counts[seen], positives[seen]]))
+            self.te_keys[col], self.te_counts[col], self.te_sums[col] = keys, merged[0], merged[1]
+
+        self.n_samples_ += len(y)
+        self.n_positive_ += int(round(y.sum()))
+        self.global_mean = self.n_positive_ / self.n_samples_
+        for col in self.te_cols:
+            self.te_values[col] = self._smoothed(self.te_sums[col], self.te_counts[col],
+                                                 self.global_mean)
+
+        encoded = self.encode(X)
+        self.feature_sum_ = self.feature_sum_ + encoded.sum(axis=0)
+        self.feature_sumsq_ = self.feature_sumsq_ + np.einsum("ij,ij->j", encoded, encoded)
+        for j, col in enumerate(self.te_cols, start=len(self.num_cols)):
+            counts, values = self.te_counts[col], self.te_values[col]
+            self.feature_sum_[j] = counts @ values
+            self.feature_sumsq_[j] = counts @ values ** 2
+        self._scaler_from_sums()
+        return self
+
+    # ── Ajuste em streaming ────────────────────────────────────────────────────
+    def partial_fit(self, X: pd.DataFrame, y: pd.Series, folds: np.ndarray) -> "FeatureTransformer":
+        """Acumula as estatísticas de um bloco do treino; `finish_partial_fit` fecha o ajuste.
+
+        `folds` é o fold de cada linha (no streaming vem do hash do voo, ver
+        flights_io.split_folds — não há permutação global). Guarda sketches de
+        quantis e momentos das numéricas, voos/atrasados por (fold, categoria)
+        e contagens do OHE: memória proporcional às categorias, não às linhas.
+        """
+        from streaming_stats import Moments, QuantileSketch
+
+        k = self.n_folds
+        if self._partial is None:
+            empty = np.empty(0, dtype=str)
+            self._partial = {
+                "sketches": {c: QuantileSketch() for c in self.num_cols},
+                "moments": {c: Moments() for c in self.num_cols},
+                "nulls": dict.fromkeys(self.num_cols, 0),
+                "te": {c: (empty, np.zeros((2, k, 0))) for c in self.te_cols},
+                "ohe": (empty, np.zeros(0, dtype=np.int64)),
+                "n_by_fold": np.zeros(k, dtype=np.int64),
+                "y_by_fold": np.zeros(k),
+            }
+        state = self._partial
+        y = np.asarray(y, dtype=np.float64)
+        folds = np.asarray(folds, dtype=np.int64)
+
+        for col in self.num_cols:
+            state["sketches"][col].update(X[col])
+            state["moments"][col].update(X[col])
+            state["nulls"][col] += int(X[col].isna().sum())
+
+        for col in self.te_cols:
+            keys, codes = factorize_sorted(X[col])
+            flat = folds * len(keys) + codes
+            stats = np.stack([np.bincount(flat, minlength=k * len(keys)),
+                              np.bincount(flat, weights=y, minlength=k * len(keys))])
+            state["te"][col] = merge_keyed(*state["te"][col], keys, stats.reshape(2, k, len(keys)))
+
+        keys, codes = factorize_sorted(self._period(X))
+        state["ohe"] = merge_keyed(*state["ohe"], keys, np.bincount(codes, minlength=len(keys)))
+        state["n_by_fold"] += np.bincount(folds, minlength=k)
+        state["y_by_fold"] += np.bincount(folds, weights=y, minlength=k)
+        return self
+
+    def finish_partial_fit(self) -> "FeatureTransformer":
+        """Medianas, target encoding (total e out-of-fold), OHE e scaler a partir
+        dos acumuladores, com os momentos do scaler obtidos das contagens, sem
+        revisitar as linhas.
+
+        Aproxima o `fit_transform` em memória, não o reproduz: a mediana vem do
+        QuantileSketch (exata só até `max_bins` valores distintos) e os folds
+        do out-of-fold vêm do hash do voo (`split_folds`), não da permutação
+        RandomState(42) — o TE total e as categorias do OHE coincidem, o TE
+        out-of-fold do treino e, com a mediana, o scaler podem diferir.
+        """
+        state, self._partial = self._partial, None
+        if state is None:
+            raise ValueError("Nenhum bloco de treino recebido em partial_fit")
+        n, y_total = int(state["n_by_fold"].sum()), float(state["y_by_fold"].sum())
+        self.global_mean = y_total / n
+        self.n_samples_, self.n_positive_ = n, int(round(y_total))
+
+        sums, sumsqs = [], []
+        for col in self.num_cols:
+            median = state["sketches"][col].quantile(0.5)
+            self.medians[col] = median
+            m, nulls = state["moments"][col], state["nulls"][col]
+            sums.append(m.n * m.mean + nulls * median)
+            sumsqs.append(m.m2 + m.n * m.mean ** 2 + nulls * median ** 2)
+
+        priors = (y_total - state["y_by_fold"]) / (n - state["n_by_fold"])
+        for col in self.te_cols:
+            keys, (counts, positives) = state["te"][col]
+            total_counts, total_pos = counts.sum(axis=0), positives.sum(axis=0)
+            seen = total_counts > 0                               # observed=True
+            counts, positives = counts[:, seen], positives[:, seen]
+            total_counts, total_pos = total_counts[seen], total_pos[seen]
+            self.te_keys[col] = keys[seen]
+            self.te_counts[col] = np.rint(total_counts).astype(np.int64)
+            self.te_sums[col] = np.rint(total_pos).astype(np.int64)
+            self.te_values[col] = self._smoothed(self.te_sums[col], self.te_counts[col],
+                                                 self.global_mean)
+            oof = self._smoothed(total_pos - positives, total_counts - counts, priors[:, None])
+            self._oof_tables[col] = oof
+            sums.append(float((counts * oof).sum()))
+            sumsqs.append(float((counts * oof ** 2).sum()))
+
+        self.ohe_keys, ohe_counts = state["ohe"]
+        sums += ohe_counts.tolist()
+        sumsqs += ohe_counts.tolist()
+        self.feature_sum_ = np.array(sums, dtype=np.float64)
+        self.feature_sumsq_ = np.array(sumsqs, dtype=np.float64)
+        self._scaler_from_sums()
+        return self
+
+    def transform_out_of_fold(self, X: pd.DataFrame, folds: np.ndarray) -> np.ndarray:
+        """Como `transform`, mas com o target encoding out-of-fold de cada linha
+        do treino (tabelas de `finish_partial_fit`)."""
+        out = self.encode(X)
+        folds = np.asarray(folds, dtype=np.int64)
+        for j, col in enumerate(self.te_cols, start=len(self.num_cols)):
+            tables = self._oof_tables[col]
+            tables = np.column_stack([tables, np.full(len(tables), self.global_mean)])
+            out[:, j] = tables[folds, category_codes(X[col], self.te_keys[col])]
+        out -= self.mean_
+        out /= self.scale_
+        return out
+
+    def _scaler_from_sums(self):
+        """mean_/scale_ e o StandardScaler das `scaled_columns` a partir de n, Σx e Σx²."""
+        from sklearn.preprocessing import StandardScaler
+
+        n, n_scaled = self.n_samples_, len(self.scaled_columns)
+        mean = self.feature_sum_[:n_scaled] / n
+        var = np.maximum(self.feature_sumsq_[:n_scaled] / n - mean ** 2, 0.0)
+        scale = np.sqrt(var)
+        scale[scale < 10 * np.finfo(np.float64).eps] = 1.0       # como o sklearn
+        self.mean_, self.scale_ = self._with_indicators(mean, scale)
+        # Recriado sempre: um scaler.pkl 1.x cobria também os indicadores
+        self.scaler = StandardScaler()
+        self.scaler.n_features_in_ = n_scaled
+        self.scaler.feature_names_in_ = np.array(self.scaled_columns, dtype=object)
+        self.scaler.mean_, self.scaler.var_, self.scaler.scale_ = mean, var, scale
+        self.scaler.n_samples_seen_ = n
+
+    def _with_indicators(self, mean: np.ndarray, scale: np.ndarray) -> tuple:
+        """Média/escala por feature do transform: as do scaler nas colunas que ele
+        cobre, 0/1 no resto (indicadores OHE passam sem alteração e cabem em int8
+        no feature store)."""
+        n = len(self.feature_columns)
+        full_mean, full_scale = np.zeros(n), np.ones(n)
+        full_mean[:len(mean)], full_scale[:len(scale)] = mean, scale
+        return full_mean, full_scale
+
+    # ── Transform ──────────────────────────────────────────────────────────────
+    def _period(self, X: pd.DataFrame) -> pd.Series:
+        if self.ohe_col in X.columns:
+            return X[self.ohe_col]
+        return departure_period(X["SCHEDULED_DEPARTURE"])   # voos brutos: derivado do horário
+
+    def encode(self, X: pd.DataFrame) -> np.ndarray:
+        """Matriz float64 imputada e codificada (ainda sem padronização)."""
+        n_num, n_te = len(self.num_cols), len(self.te_cols)
+        out = np.empty((len(X), len(self.feature_columns)), dtype=np.float64)
+
+        for i, col in enumerate(self.num_cols):
+            values = X[col].to_numpy(dtype=np.float64, na_value=np.nan)
+            out[:, i] = np.where(np.isnan(values), self.medians.get(col, np.nan), values)
+
+        for j, col in enumerate(self.te_cols, start=n_num):
+            table = np.append(self.te_values[col], self.global_mean)   # -1 → média global
+            out[:, j] = table[category_codes(X[col], self.te_keys[col])]
+
+        start = n_num + n_te
+        out[:, start:] = 0.0
+        codes = category_codes(self._period(X), self.ohe_keys)
+        rows = np.flatnonzero(codes >= 0)
+        out[rows, start + codes[rows]] = 1.0
+        return out
+
+    def transform(self, X: pd.DataFrame) -> np.ndarray:
+        """Imputa, codifica e padroniza `X` em uma matriz float64."""
+        out = self.encode(X)
+        out -= self.mean_
+        out /= self.scale_
+        return out
+
+    def transform_frame(self, X: pd.DataFrame) -> pd.DataFrame:
+        return pd.DataFrame(self.transform(X), columns=self.feature_columns, index=X.index)
+
+    def category_codes(self, X: pd.DataFrame) -> pd.DataFrame:
+        """Códigos int16 das categorias antes do encoding (posição em te_keys /
+        ohe_keys; −1 = não vista) — guardados no feature store para re-encoding."""
+        codes = {col: category_codes(X[col], self.te_keys[col]) for col in self.te_cols}
+        codes[self.ohe_col] = category_codes(self._period(X), self.ohe_keys)
+        return pd.DataFrame({c: v.astype(np.int16) for c, v in codes.items()}, index=X.index)
+
+    # ── Identidade ─────────────────────────────────────────────────────────────
+    def fingerprint(self) -> str:
+        """Hash (16 hex) de tudo que define o `transform`: medianas, chaves e
+        valores do target encoding, colunas OHE e média/escala do scaler."""
+        h = hashlib.sha256()
+        for names in (self.num_cols, self.te_cols, self.ohe_keys.tolist()):
+            h.update("\0".join(map(str, names)).encode() + b"\1")
+        arrays = [np.array([self.medians.get(c, np.nan) for c in self.num_cols]),
+                  np.array([self.global_mean]), self.mean_, self.scale_]
+        for col in self.te_cols:
+            h.update("\0".join(self.te_keys[col].tolist()).encode() + b"\1")
+            arrays.append(self.te_values[col])
+        for values in arrays:
+            h.update(np.ascontiguousarray(values, dtype="<f8").tobytes())
+        return h.hexdigest()[:16]
+
+    # ── Persistência ───────────────────────────────────────────────────────────
+    def to_encoders_json(self) -> dict:
+        """Conteúdo do encoders.json (mesmo formato consumido pelas etapas seguintes)."""
+        target_encoding = {}
+        for col in self.te_cols:
+            mapping = dict(zip(self.te_keys[col].tolist(), self.te_values[col].tolist()))
+            mapping["__global_mean__"] = self.global_mean
+            target_encoding[col] = mapping
+        return {
+            "__version__": ENCODERS_VERSION,
+            "__created_at__": datetime.now(timezone.utc).isoformat(),
+            "target_encoding": target_encoding,
+            "target_encoding_params": {"smoothing": self.smoothing, "folds": self.n_folds,
+                                       "train_encoding": "out_of_fold"},
+            "ohe_columns": self.ohe_columns,
+            "scaled_columns": self.scaled_columns,
+            "medians": self.medians,
+            "feature_columns": self.feature_columns,
+            "fingerprint": self.fingerprint(),
+            "sufficient_stats": self._sufficient_stats_json(),
+        }
+
+    def _sufficient_stats_json(self) -> dict:
+        if not self.te_counts or self.feature_sum_ is None:
+            return {}
+        return {
+            "n_samples": int(self.n_samples_),
+            "n_positive": int(self.n_positive_),
+            "target_encoding": {
+                col: {
+                    "counts": dict(zip(self.te_keys[col].tolist(), self.te_counts[col].tolist())),
+                    "positives": dict(zip(self.te_keys[col].tolist(), self.te_sums[col].tolist())),
+                }
+                for col in self.te_cols
+            },
+            "scaler": {"sum": self.feature_sum_.tolist(), "sumsq": self.feature_sumsq_.tolist()},
+        }
+
+    def save(self, model_dir: Path, extra: dict = None) -> None:
+        """Grava encoders.json, scaler.pkl e o sidecar feature_transformer.npz."""
+        import joblib
+
+        model_dir.mkdir(parents=True, exist_ok=True)
+        encoders = self.to_encoders_json()
+        encoders.update(extra or {})
+        with open(model_dir / ENCODERS_FILE, "w") as f:
+            json.dump(encoders, f, indent=2, ensure_ascii=False)
+        if self.scaler is not None:
+            joblib.dump(self.scaler, model_dir / SCALER_FILE)
+
+        arrays = {
+            "num_cols": np.array(self.num_cols), "te_cols": np.array(self.te_cols),
+            "ohe_col": np.array(self.ohe_col), "ohe_keys": self.ohe_keys,
+            "medians": np.array([self.medians.get(c, np.nan) for c in self.num_cols]),
+            "global_mean": np.array(self.global_mean),
+            "te_params": np.array([self.smoothing, self.n_folds], dtype=np.float64),
+            "mean": self.mean_, "scale": self.scale_,
+        }
+        if self.feature_sum_ is not None:
+            arrays["n_stats"] = np.array([self.n_samples_, self.n_positive_], dtype=np.int64)
+            arrays["feature_sum"] = self.feature_sum_
+            arrays["feature_sumsq"] = self.feature_sumsq_
+        for i, col in enumerate(self.te_cols):
+            arrays[f"te_keys_{i}"] = self.te_keys[col]
+            arrays[f"te_values_{i}"] = self.te_values[col]
+            if col in self.te_counts:
+                arrays[f"te_counts_{i}"] = self.te_counts[col]
+                arrays[f"te_sums_{i}"] = self.te_sums[col]
+        np.savez(model_dir / SIDECAR_FILE, **arrays)
+
+    @classmethod
+    def load(cls, model_dir: Path) -> "FeatureTransformer":
+        """Carrega do sidecar binário; sem ele (artefatos antigos), do JSON + pickle."""
+        sidecar = model_dir / SIDECAR_FILE
+        if not sidecar.exists():
+            return cls.load_json(model_dir)
+
+        with np.load(sidecar, allow_pickle=False) as z:
+            smoothing, n_folds = z["te_params"] if "te_params" in z else (TE_SMOOTHING, TE_FOLDS)
+            ft = cls(z["num_cols"].tolist(), z["te_cols"].tolist(), str(z["ohe_col"]),
+                     float(smoothing), int(n_folds))
+            ft.medians = {c: float(m) for c, m in zip(ft.num_cols, z["medians"]) if not np.isnan(m)}
+            ft.global_mean = float(z["global_mean"])
+            ft.ohe_keys = z["ohe_keys"]
+            ft.mean_, ft.scale_ = z["mean"], z["scale"]
+            if "n_stats" in z:
+                ft.n_samples_, ft.n_positive_ = (int(v) for v in z["n_stats"])
+                ft.feature_sum_, ft.feature_sumsq_ = z["feature_sum"], z["feature_sumsq"]
+            for i, col in enumerate(ft.te_cols):
+                ft.te_keys[col] = z[f"te_keys_{i}"]
+                ft.te_values[col] = z[f"te_values_{i}"]
+                if f"te_counts_{i}" in z:
+                    ft.te_counts[col] = z[f"te_counts_{i}"]
+                    ft.te_sums[col] = z[f"te_sums_{i}"]
+        return ft
+
+    @classmethod
+    def load_json(cls, model_dir: Path) -> "FeatureTransformer":
+        """Reconstrói a partir de encoders.json + scaler.pkl."""
+        import joblib
+
+        with open(model_dir / ENCODERS_FILE) as f:
+            encoders = json.load(f)
+        te = encoders["target_encoding"]
+        prefix = f"{OHE_PREFIX}_"
+        ohe_cols = encoders["ohe_columns"]
+        num_cols = [c for c in encoders["feature_columns"] if c not in te and c not in ohe_cols]
+
+        params = encoders.get("target_encoding_params", {})
+        ft = cls(num_cols, list(te), OHE_COL, params.get("smoothing", TE_SMOOTHING),
+                 params.get("folds", TE_FOLDS))
+        ft.medians = {c: float(v) for c, v in encoders.get("medians", {}).items()}
+        ft.ohe_keys = np.array([c[len(prefix):] for c in ohe_cols])
+        for col, mapping in te.items():
+            mapping = dict(mapping)
+            ft.global_mean = float(mapping.pop("__global_mean__"))
+            keys = np.array(sorted(mapping), dtype=str)
+            ft.te_keys[col] = keys
+            ft.te_values[col] = np.array([mapping[k] for k in keys], dtype=np.float64)
+
+        stats = encoders.get("sufficient_stats") or {}
+        if stats:
+            ft.n_samples_, ft.n_positive_ = stats["n_samples"], stats["n_positive"]
+            for col, col_stats in stats["target_encoding"].items():
+                ft.te_counts[col] = np.array([col_stats["counts"][k] for k in ft.te_keys[col]], dtype=np.int64)
+                ft.te_sums[col] = np.array([col_stats["positives"][k] for k in ft.te_keys[col]], dtype=np.int64)
+            ft.feature_sum_ = np.array(stats["scaler"]["sum"])
+            ft.feature_sumsq_ = np.array(stats["scaler"]["sumsq"])
+
+        # 2.0: o scaler cobre só as scaled_columns; 1.x: todas as feature_columns
+        ft.scaler = joblib.load(model_dir / SCALER_FILE)
+        ft.mean_, ft.scale_ = ft._with_indicators(ft.scaler.mean_, ft.scaler.scale_)
+        return ft
+
+
+# ==============================================================================
+# Manifesto modelos ↔ transformer
+# ==============================================================================
+def write_models_manifest(model_dir: Path, transformer: FeatureTransformer, models: list) -> Path:
+    """Registra o fingerprint do transformer com que os `models` (.pkl) foram treinados."""
+    path = model_dir / MANIFEST_FILE
+    with open(path, "w") as f:
+        json.dump({"transformer_fingerprint": transformer.fingerprint(),
+                   "trained_at": datetime.now(timezone.utc).isoformat(),
+                   "models": list(models)}, f, indent=2, ensure_ascii=False)
+    return path
+
+
+def check_models_manifest(model_dir: Path, transformer: FeatureTransformer) -> None:
+    """Levanta ValueError se os modelos de `model_dir` foram treinados com outro transformer."""
+    path = model_dir / MANIFEST_FILE
+    if not path.exists():
+        print(f"  ⚠️  {path} ausente — compatibilidade modelo/transformer não verificada")
+        return
+    with open(path) as f:
+        expected = json.load(f)["transformer_fingerprint"]
+    actual = transformer.fingerprint()
+    if actual != expected:
+        raise ValueError(
+            f"Transformer em {model_dir} ({actual}) difere do usado no treino dos modelos "
+            f"({expected}) — encoders atualizados exigem retreino (03_supervised_classification.py)"
+        )
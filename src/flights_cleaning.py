@@ -0,0 +1,219 @@
+"""
+Limpeza de Voos — FASE 2 do EDA em memória ou out-of-core em duas passadas
+
+Os mesmos seis passos (colunas esparsas, imputação pela média, nulos
+residuais, outliers 3×IQR em ARRIVAL_DELAY, variáveis derivadas e
+duplicatas) em dois modos com as mesmas contagens no transformation_log.json:
+
+    clean_flights(df)               DataFrame inteiro em memória
+    clean_flights_out_of_core(...)  flights.csv em blocos, memória limitada
+                                    pelo tamanho do bloco:
+        passada 1  médias (Welford) das colunas imputadas, contagem de nulos
+                   residuais e sketch de quantis de ARRIVAL_DELAY → limites IQR
+        passada 2  imputa, filtra, deriva, descarta duplicatas pelo hash da
+                   chave e grava cada bloco no Parquet particionado YEAR/MONTH
+
+Para as duplicatas guarda-se só o hash uint64 de cada chave já vista (8 bytes
+por voo mantido), em um array ordenado.
+
+Uso:
+    from flights_cleaning import clean_flights_out_of_core
+    log = clean_flights_out_of_core(Path("./data/flights.csv"),
+                                    Path("./data/processed/flights_cleaned.parquet"))
+"""
+import shutil
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from derived_features import delay_category, departure_hour, season
+from flights_io import (DEFAULT_BLOCK_SIZE, append_flights_dataset, batch_to_frame,
+                        flight_hash, iter_flights_batches)
+from streaming_stats import Moments, QuantileSketch
+
+SPARSE_COLS = ['CANCELLATION_REASON', 'AIR_SYSTEM_DELAY', 'SECURITY_DELAY',
+               'AIRLINE_DELAY', 'LATE_AIRCRAFT_DELAY', 'WEATHER_DELAY']
+IMPUTE_COLS = ['DEPARTURE_DELAY', 'ARRIVAL_DELAY', 'AIR_TIME', 'ELAPSED_TIME', 'TAXI_OUT', 'TAXI_IN']
+REQUIRED_COLS = ['TAIL_NUMBER', 'DEPARTURE_TIME', 'ARRIVAL_TIME']
+# (FlightDate, FLIGHT_NUMBER, AIRLINE, ORIGIN, DEST) — FlightDate ≡ YEAR/MONTH/DAY
+DEDUP_KEY = ['YEAR', 'MONTH', 'DAY', 'FLIGHT_NUMBER', 'AIRLINE', 'ORIGIN_AIRPORT', 'DESTINATION_AIRPORT']
+IQR_FACTOR = 3
+
+
+def _transformations(nulls_removed: int, outliers_removed: int, bounds: tuple,
+                     dups_removed: int) -> list:
+    """Entradas do transformation_log.json (idênticas nos dois modos)."""
+    return [
+        {'step': 1, 'name': 'Remoção de colunas com >80% missing',
+         'action': f"Removido {len(SPARSE_COLS)} colunas de atraso detalhado"},
+        {'step': 2, 'name': 'Imputação de valores nulos (Média)',
+         'action': 'DEPARTURE_DELAY, ARRIVAL_DELAY, AIR_TIME, ELAPSED_TIME preenchidos com media'},
+        {'step': 3, 'name': 'Remoção de nulos residuais',
+         'rows_removed': int(nulls_removed)},
+        {'step': 4, 'name': 'Remoção de Outliers (IQR) em ARRIVAL_DELAY',
+         'rows_removed': int(outliers_removed),
+         'bounds': [float(bounds[0]), float(bounds[1])]},
+        {'step': 5, 'name': 'Criação de Variáveis Derivadas',
+         'action': 'Criado FlightDate, DelayCategory, Hour, Season, IS_DELAYED'},
+        {'step': 6, 'name': 'Remoção de Duplicatas',
+         'rows_removed': int(dups_removed)},
+    ]
+
+
+def iqr_bounds(sketch: QuantileSketch) -> tuple:
+    """Limites [Q1 - 3·IQR, Q3 + 3·IQR] a partir do sketch de ARRIVAL_DELAY."""
+    q1, q3 = sketch.quantile(0.25), sketch.quantile(0.75)
+    iqr = q3 - q1
+    return q1 - IQR_FACTOR * iqr, q3 + IQR_FACTOR * iqr
+
+
+def _impute(df: pd.DataFrame, means: dict) -> pd.DataFrame:
+    for col, mean in means.items():
+        if col in df.columns:
+            df[col] = df[col].fillna(mean)
+    return df
+
+
+def _within(df: pd.DataFrame, bounds: tuple) -> pd.Series:
+    return (df['ARRIVAL_DELAY'] >= bounds[0]) & (df['ARRIVAL_DELAY'] <= bounds[1])
+
+
+def add_derived_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Passo 5: FlightDate, DelayCategory, Hour, IS_DELAYED e Season."""
+    df['FlightDate'] = pd.to_datetime(
+        df[['YEAR', 'MONTH', 'DAY']].rename(columns={'YEAR': 'year', 'MONTH': 'month', 'DAY': 'day'})
+    )
+    df['DelayCategory'] = delay_category(df['ARRIVAL_DELAY'])
+    df['Hour'] = departure_hour(df['SCHEDULED_DEPARTURE'])
+    df['IS_DELAYED'] = (df['ARRIVAL_DELAY'] > 0).astype(int)
+    df['Season'] = season(df['MONTH'])
+    return df
+
+
+# ==============================================================================
+# Em memória
+# ==============================================================================
+def clean_flights(df: pd.DataFrame) -> tuple:
+    """Aplica os seis passos a um DataFrame; retorna (df_limpo, transformations)."""
+    df = df.drop(columns=SPARSE_COLS, errors='ignore')
+    df = _impute(df, {c: df[c].mean() for c in IMPUTE_COLS if c in df.columns})
+
+    rows = len(df)
+    df = df.dropna(subset=REQUIRED_COLS)
+    nulls_removed = rows - len(df)
+
+    bounds = iqr_bounds(QuantileSketch().update(df['ARRIVAL_DELAY']))
+    rows = len(df)
+    df = df[_within(df, bounds)].copy()
+    outliers_removed = rows - len(df)
+
+    df = add_derived_columns(df)
+
+    dup_mask = df.duplicated(subset=DEDUP_KEY)
+    df = df[~dup_mask]
+    return df, _transformations(nulls_removed, outliers_removed, bounds, dup_mask.sum())
+
+
+# ==============================================================================
+# Out-of-core
+# ==============================================================================
+class _SeenKeys:
+    """Conjunto de hashes uint64 já vistos, como array ordenado."""
+
+    def __init__(self):
+        self.keys = np.empty(0, dtype=np.uint64)
+
+    def first_seen(self, hashes: np.ndarray) -> np.ndarray:
+        """True na 1ª ocorrência de cada hash (no bloco e em todos os anteriores)."""
+        mask = np.zeros(len(hashes), dtype=bool)
+        mask[np.unique(hashes, return_index=True)[1]] = True
+        if len(self.keys):
+            pos = np.minimum(np.searchsorted(self.keys, hashes), len(self.keys) - 1)
+            mask &= self.keys[pos] != hashes
+        self.keys = np.union1d(self.keys, hashes[mask])
+        return mask
+
+
+def _mb(df: pd.DataFrame) -> float:
+    return df.memory_usage(deep=True).sum() / 1024**2
+
+
+def clean_flights_out_of_core(
+    src_csv: Path,
+    out_path: Path,
+    fraction: float = 1.0,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+) -> dict:
+    """Limpa flights.csv em duas passadas por blocos e grava `out_path` particionado.
+
+    `fraction` aplica a mesma amostragem por hash de `read_flights_sampled`.
+    Retorna o dicionário do transformation_log.json; as memórias reportadas são
+    a soma dos blocos (o equivalente ao DataFrame inteiro), e `peak_block_mb`
+    é o maior bloco efetivamente mantido em memória.
+    """
+    def blocks():
+        for batch in iter_flights_batches(src_csv, fraction=fraction, block_size=block_size):
+            yield batch_to_frame(batch)
+
+    # ── Passada 1: médias, nulos residuais e quantis de ARRIVAL_DELAY ──────────
+    t0 = time.time()
+    moments = {c: Moments() for c in IMPUTE_COLS}
+    sketch = QuantileSketch()
+    rows_before = kept = arr_missing = 0
+    memory_before = peak = 0.0
+    for df in blocks():
+        rows_before += len(df)
+        memory_before += _mb(df)
+        peak = max(peak, _mb(df))
+        for col, acc in moments.items():
+            acc.update(df[col])
+        arr = df.loc[df[REQUIRED_COLS].notna().all(axis=1), 'ARRIVAL_DELAY']
+        kept += len(arr)
+        arr_missing += int(arr.isna().sum())
+        sketch.update(arr)
+
+    # Nulos de ARRIVAL_DELAY entram no sketch com o valor imputado (no dtype da coluna)
+    means = {c: np.float32(acc.mean) for c, acc in moments.items()}
+    sketch.add(means['ARRIVAL_DELAY'], arr_missing)
+    bounds = iqr_bounds(sketch)
+    print(f"  Passada 1: {rows_before:,} voos em {time.time() - t0:.1f}s "
+          f"(IQR: [{bounds[0]:.1f}, {bounds[1]:.1f}])")
+
+    # ── Passada 2: imputa, filtra, deriva, deduplica e grava ───────────────────
+    t0 = time.time()
+    if out_path.exists():
+        shutil.rmtree(out_path)
+    seen = _SeenKeys()
+    outliers_removed = dups_removed = rows_after = 0
+    memory_after = 0.0
+    for part, df in enumerate(blocks()):
+        df = _impute(df.drop(columns=SPARSE_COLS, errors='ignore'), means)
+        df = df.dropna(subset=REQUIRED_COLS)
+        rows = len(df)
+        df = df[_within(df, bounds)].copy()
+        outliers_removed += rows - len(df)
+
+        df = add_derived_columns(df)
+        first = seen.first_seen(flight_hash(df, key=DEDUP_KEY))
+        dups_removed += int((~first).sum())
+        df = df[first]
+
+        rows_after += len(df)
+        memory_after += _mb(df)
+        if len(df):
+            append_flights_dataset(df, out_path, part=part)
+    print(f"  Passada 2: {rows_after:,} voos gravados em {out_path} em {time.time() - t0:.1f}s "
+          f"(maior bloco: {peak:.1f} MB)")
+
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'total_rows_before': rows_before,
+        'total_rows_after': rows_after,
+        'memory_before_mb': memory_before,
+        'memory_after_mb': memory_after,
+        'peak_block_mb': peak,
+        'transformations': _transformations(rows_before - kept, outliers_removed, bounds, dups_removed),
+    }
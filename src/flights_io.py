@@ -0,0 +1,545 @@
+"""
+I/O de Voos — leitura tipada e amostragem determinística de flights.csv
+
+Amostragem por hash da chave estável do voo (data, companhia, número do voo):
+o mesmo voo entra (ou não) na amostra em toda execução e em toda máquina,
+independente de seed global ou da ordem das linhas no arquivo.
+
+Também mantém o cache Parquet particionado por YEAR/MONTH que substitui os
+CSVs de hand-off entre etapas: o CSV processado é convertido uma única vez
+(categóricas dictionary-encoded) e as etapas seguintes leem só as colunas e
+partições de que precisam.
+
+O schema tipado (DTYPES_FLIGHTS / DTYPES_PROCESSED) e a projeção de colunas de
+cada etapa (STAGE_COLUMNS) ficam centralizados aqui: toda etapa recebe
+AIRLINE/ORIGIN_AIRPORT/DESTINATION_AIRPORT como category e numéricos nos tipos
+estreitos, com relatório da memória economizada frente aos defaults do pandas.
+
+Uso:
+    from flights_io import DTYPES_FLIGHTS, read_flights_sampled
+    df = read_flights_sampled(Path("./data/flights.csv"), fraction=0.1)
+
+    from flights_io import load_processed_flights
+    df = load_processed_flights(columns=["AIRLINE", "ARRIVAL_DELAY"],
+                                filters=[("MONTH", "in", [6, 7, 8])])
+
+    from flights_io import load_stage
+    df = load_stage("unsupervised")    # projeção + tipos + relatório de memória
+"""
+import json
+import shutil
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# ── Schema enxuto de flights.csv ───────────────────────────────────────────────
+DTYPES_FLIGHTS = {
+    'YEAR': 'int16', 'MONTH': 'int8', 'DAY': 'int8', 'DAY_OF_WEEK': 'int8',
+    'AIRLINE': 'category', 'FLIGHT_NUMBER': 'int32', 'TAIL_NUMBER': 'category',
+    'ORIGIN_AIRPORT': 'category', 'DESTINATION_AIRPORT': 'category',
+    'SCHEDULED_DEPARTURE': 'int16', 'DEPARTURE_TIME': 'float32', 'DEPARTURE_DELAY': 'float32',
+    'TAXI_OUT': 'float32', 'WHEELS_OFF': 'float32', 'SCHEDULED_TIME': 'float32',
+    'ELAPSED_TIME': 'float32', 'AIR_TIME': 'float32', 'DISTANCE': 'int16',
+    'WHEELS_ON': 'float32', 'TAXI_IN': 'float32', 'SCHEDULED_ARRIVAL': 'int16',
+    'ARRIVAL_TIME': 'float32', 'ARRIVAL_DELAY': 'float32', 'DIVERTED': 'int8',
+    'CANCELLED': 'int8', 'CANCELLATION_REASON': 'category'
+}
+
+# Colunas extras do CSV processado (derivadas, detalhamento de atraso e nomes)
+DTYPES_PROCESSED = {
+    **DTYPES_FLIGHTS,
+    'IS_DELAYED': 'float32',   # NaN para cancelados/desviados
+    'AIR_SYSTEM_DELAY': 'float32', 'SECURITY_DELAY': 'float32', 'AIRLINE_DELAY': 'float32',
+    'LATE_AIRCRAFT_DELAY': 'float32', 'WEATHER_DELAY': 'float32',
+    'DEPARTURE_PERIOD': 'category', 'DELAY_CATEGORY': 'category',
+    'AIRLINE_NAME': 'category', 'ORIGIN_AIRPORT_NAME': 'category',
+    'DESTINATION_AIRPORT_NAME': 'category',
+}
+
+# Projeção de colunas por etapa — cada script lê só o que usa
+STAGE_COLUMNS = {
+    "feature_engineering": [
+        "MONTH", "DAY_OF_WEEK", "SCHEDULED_DEPARTURE", "SCHEDULED_ARRIVAL", "DISTANCE",
+        "SCHEDULED_TIME", "AIRLINE", "ORIGIN_AIRPORT", "DESTINATION_AIRPORT",
+        "DEPARTURE_PERIOD", "CANCELLED", "ARRIVAL_DELAY", "IS_DELAYED",
+        "YEAR", "DAY", "FLIGHT_NUMBER",                        # chave do split
+    ],
+    "supervised": [
+        "AIRLINE", "AIRLINE_NAME", "ORIGIN_AIRPORT", "ORIGIN_AIRPORT_NAME",
+        "DESTINATION_AIRPORT", "DESTINATION_AIRPORT_NAME", "MONTH", "DAY_OF_WEEK",
+        "SCHEDULED_DEPARTURE", "DISTANCE", "CANCELLED", "IS_DELAYED",
+        "YEAR", "DAY", "FLIGHT_NUMBER",                        # join com split_assignment
+    ],
+    "unsupervised": [
+        "AIRLINE", "ORIGIN_AIRPORT", "DESTINATION_AIRPORT", "DISTANCE", "SCHEDULED_TIME",
+        "MONTH", "DAY_OF_WEEK", "SCHEDULED_DEPARTURE", "ARRIVAL_DELAY", "IS_DELAYED", "CANCELLED",
+    ],
+    "dashboard": [
+        "MONTH", "DAY_OF_WEEK", "AIRLINE", "ORIGIN_AIRPORT", "DESTINATION_AIRPORT",
+        "SCHEDULED_DEPARTURE", "DEPARTURE_DELAY", "ARRIVAL_DELAY", "AIR_TIME", "DISTANCE",
+        "TAXI_OUT", "TAXI_IN", "ELAPSED_TIME", "CANCELLED", "DIVERTED", "CANCELLATION_REASON",
+        "AIR_SYSTEM_DELAY", "SECURITY_DELAY", "AIRLINE_DELAY", "LATE_AIRCRAFT_DELAY",
+        "WEATHER_DELAY", "DELAY_CATEGORY", "DEPARTURE_PERIOD",
+    ],
+}
+
+# Chave estável do voo usada na amostragem (independe da posição no arquivo)
+FLIGHT_KEY = ['YEAR', 'MONTH', 'DAY', 'AIRLINE', 'FLIGHT_NUMBER']
+
+# Split treino/val/teste por hash: chave com a origem (um mesmo número de voo
+# faz várias pernas no dia) e sal próprio, independente do hash da amostragem
+SPLIT_KEY       = FLIGHT_KEY + ['ORIGIN_AIRPORT']
+SPLIT_SALT      = "tc3-split-v1-key"          # hash_key do pandas: 16 bytes
+SPLIT_NAMES     = ("train", "val", "test")
+SPLIT_FRACTIONS = (0.70, 0.15, 0.15)
+SPLIT_FILE      = Path("./data/processed/split_assignment.parquet")
+
+# Cache Parquet particionado (hive: YEAR=2015/MONTH=1/...)
+PROCESSED_CSV     = Path("./data/processed/flights_sample_processed.csv")
+PROCESSED_DATASET = Path("./data/processed/flights_sample_processed.parquet")
+PARTITION_COLS    = ['YEAR', 'MONTH']
+_SOURCE_MARKER    = "_source.json"
+SCHEMA_VERSION    = 2   # muda → cache Parquet é reconvertido
+
+# Tamanho de cada faixa de bytes do CSV parseada por uma thread
+DEFAULT_BLOCK_SIZE = 64 << 20
+# Linhas por lote na leitura em streaming do dataset particionado
+STREAM_BATCH_ROWS  = 256 * 1024
+
+
+def _arrow_type(dtype: str):
+    """Converte um dtype pandas do schema no tipo Arrow equivalente."""
+    import pyarrow as pa
+
+    if dtype == 'category':
+        return pa.dictionary(pa.int32(), pa.string())
+    return pa.from_numpy_dtype(np.dtype(dtype))
+
+
+def compact_categories(df: pd.DataFrame) -> pd.DataFrame:
+    """Reduz os códigos das colunas category ao menor inteiro que comporta o dicionário.
+
+    O Arrow entrega dicionários com índices int32 na ordem de aparição; com ~15
+    companhias ou ~600 aeroportos os códigos cabem em int8/int16. As categorias
+    são ordenadas para que groupby/value_counts sigam a mesma ordem das strings.
+    """
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            if not df[col].cat.categories.is_monotonic_increasing:
+                df[col] = df[col].cat.reorder_categories(df[col].cat.categories.sort_values())
+            cat = df[col].cat
+            n_cat = len(cat.categories)
+            code_dtype = np.int8 if n_cat < 2**7 else np.int16 if n_cat < 2**15 else np.int32
+            if cat.codes.dtype.itemsize > np.dtype(code_dtype).itemsize:
+                df[col] = pd.Categorical.from_codes(
+                    cat.codes.to_numpy().astype(code_dtype), dtype=df[col].dtype
+                )
+    return df
+
+
+def default_memory_bytes(df: pd.DataFrame) -> int:
+    """Estimativa da memória do mesmo frame com os defaults do pandas.
+
+    Numéricos viram int64/float64 (8 bytes/linha) e categorias viram strings
+    object (ponteiro + um objeto str por linha).
+    """
+    total = 0
+    for col in df.columns:
+        s = df[col]
+        total += 8 * len(s)
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            codes = s.cat.codes.to_numpy()
+            counts = np.bincount(codes[codes >= 0], minlength=len(s.cat.categories))
+            sizes = np.fromiter((sys.getsizeof(str(c)) for c in s.cat.categories), dtype=np.int64,
+                                count=len(s.cat.categories))
+            total += int(counts @ sizes)
+    return total
+
+
+def memory_report(df: pd.DataFrame, stage: str) -> dict:
+    """Imprime e retorna a memória tipada vs. a estimativa com defaults do pandas."""
+    typed_mb = df.memory_usage(deep=True).sum() / 1024**2
+    default_mb = default_memory_bytes(df) / 1024**2
+    saving = 1 - typed_mb / default_mb if default_mb else 0.0
+    print(f"  Memória [{stage}]: {typed_mb:,.1f} MB tipado vs ~{default_mb:,.1f} MB "
+          f"com defaults do pandas  (economia de {saving*100:.0f}%)")
+    return {"stage": stage, "typed_mb": round(typed_mb, 2),
+            "default_mb": round(default_mb, 2), "saving": round(saving, 4)}
+
+
+def flight_hash(df: pd.DataFrame, key: list = FLIGHT_KEY, salt: str = None) -> np.ndarray:
+    """Hash uint64 estável da chave `key` (default FLIGHT_KEY; siphash com chave fixa do pandas).
+
+    `salt` (16 caracteres) troca a chave do siphash, gerando um hash independente.
+
+    Inteiros são normalizados para int64 e categorias são hasheadas pelo valor,
+    então o resultado não depende dos dtypes nem do dicionário de cada chunk.
+    """
+    frame = pd.DataFrame({
+        col: (df[col] if isinstance(df[col].dtype, pd.CategoricalDtype)
+              or df[col].dtype == object else df[col].astype('int64'))
+        for col in key
+    })
+    kwargs = {} if salt is None else {"hash_key": salt}
+    return pd.util.hash_pandas_object(frame, index=False, **kwargs).to_numpy()
+
+
+def _unit_interval(hashes: np.ndarray) -> np.ndarray:
+    """53 bits superiores do hash → uniforme em [0, 1)."""
+    return (hashes >> np.uint64(11)).astype(np.float64) * 2.0 ** -53
+
+
+def sample_mask(df: pd.DataFrame, fraction: float) -> np.ndarray:
+    """Máscara booleana: True para os voos cujo hash cai abaixo de `fraction`."""
+    if fraction >= 1.0:
+        return np.ones(len(df), dtype=bool)
+    return _unit_interval(flight_hash(df)) < fraction
+
+
+def split_unit(df: pd.DataFrame) -> np.ndarray:
+    """Posição de cada voo em [0, 1) pelo hash de SPLIT_KEY (com SPLIT_SALT)."""
+    return _unit_interval(flight_hash(df, key=SPLIT_KEY, salt=SPLIT_SALT))
+
+
+def assign_split(df: pd.DataFrame, fractions: tuple = SPLIT_FRACTIONS,
+                 stratify=None, unit: np.ndarray = None) -> np.ndarray:
+    """Código do split de cada voo (0=train, 1=val, 2=test) pelo hash de SPLIT_KEY.
+
+    Sem `stratify` (default), cada voo cai no split pela posição do seu hash em
+    [0, 1): decisão linha a linha, estável e igual bloco a bloco no dataset completo.
+    Com `stratify` (ex.: o target), os voos de cada classe são ordenados pelo
+    hash e cortados nas frações exatas — exige a classe inteira e NÃO é estável:
+    o split de um voo depende de todos os outros e muda com a filtragem anterior.
+    `unit` reaproveita um `split_unit(df)` já calculado.
+    """
+    cuts = np.cumsum(fractions)[:-1] / np.sum(fractions)
+    unit = split_unit(df) if unit is None else unit
+    if stratify is None:
+        return np.searchsorted(cuts, unit, side="right").astype(np.int8)
+
+    strata = pd.factorize(np.asarray(stratify))[0]
+    order = np.lexsort((unit, strata))
+    sizes = np.bincount(strata)
+    starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    sorted_strata = strata[order]
+    quantile = (np.arange(len(order)) - starts[sorted_strata]) / sizes[sorted_strata]
+    codes = np.empty(len(order), dtype=np.int8)
+    codes[order] = np.searchsorted(cuts, quantile, side="right")
+    return codes
+
+
+def split_folds(unit: np.ndarray, n_folds: int, fractions: tuple = SPLIT_FRACTIONS) -> np.ndarray:
+    """Fold (0..n_folds-1) dos voos de treino pela posição do hash dentro do
+    intervalo do treino; -1 nos demais. Decidível linha a linha, como o split
+    sem estratificação."""
+    train_cut = fractions[0] / np.sum(fractions)
+    folds = np.minimum((unit / train_cut * n_folds).astype(np.int64), n_folds - 1)
+    return np.where(unit < train_cut, folds, -1)
+
+
+def csv_block_ranges(path: Path, block_size: int = DEFAULT_BLOCK_SIZE) -> tuple:
+    """Nomes do cabeçalho e faixas de bytes (início, fim) do CSV alinhadas em fim de linha.
+
+    Cada faixa tem ~`block_size` bytes e termina logo após um "\\n", então pode ser
+    parseada isoladamente. Supõe que nenhum campo entre aspas contém quebra de
+    linha (vale para flights.csv).
+    """
+    import csv
+
+    size = Path(path).stat().st_size
+    with open(path, "rb") as f:
+        names = next(csv.reader([f.readline().decode("utf-8-sig").rstrip("\r\n")]))
+        bounds = [f.tell()]
+        while bounds[-1] < size:
+            f.seek(bounds[-1] + max(block_size, 1) - 1)
+            f.readline()
+            bounds.append(min(f.tell(), size))
+    return names, list(zip(bounds[:-1], bounds[1:]))
+
+
+def read_csv_block(path: Path, names: list, start: int, end: int,
+                   dtypes: dict = None, columns: list = None):
+    """Parseia a faixa [start, end) do CSV (sem cabeçalho) como Table Arrow tipada."""
+    import pyarrow as pa
+    import pyarrow.csv as pv
+
+    dtypes = DTYPES_FLIGHTS if dtypes is None else dtypes
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    return pv.read_csv(
+        pa.BufferReader(data),
+        read_options=pv.ReadOptions(column_names=names, use_threads=False),
+        convert_options=pv.ConvertOptions(
+            column_types={c: _arrow_type(t) for c, t in dtypes.items() if c in names},
+            include_columns=columns,
+        ),
+    )
+
+
+def map_csv_blocks(path: Path, fn, dtypes: dict = None, columns: list = None,
+                   block_size: int = DEFAULT_BLOCK_SIZE, threads: int = None):
+    """Aplica `fn(table)` a cada bloco do CSV em um pool de threads, na ordem do arquivo.
+
+    O leitor em streaming do Arrow (`pv.open_csv`) é sempre single-thread; aqui
+    o arquivo é cortado em faixas de bytes alinhadas em fim de linha
+    (`csv_block_ranges`) e cada thread parseia (`pv.read_csv` libera o GIL) e
+    processa a sua faixa. No máximo `2 · threads` blocos ficam em voo, então
+    a memória é limitada a ~esse número de blocos de `block_size` bytes.
+    """
+    import pyarrow as pa
+    from collections import deque
+    from concurrent.futures import ThreadPoolExecutor
+
+    names, ranges = csv_block_ranges(path, block_size)
+    threads = threads or pa.cpu_count()
+
+    def work(bounds):
+        return fn(read_csv_block(path, names, *bounds, dtypes=dtypes, columns=columns))
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        pending = deque()
+        for bounds in ranges:
+            if len(pending) >= 2 * threads:
+                yield pending.popleft().result()
+            pending.append(pool.submit(work, bounds))
+        while pending:
+            yield pending.popleft().result()
+
+
+def iter_flights_batches(
+    path: Path,
+    fraction: float = 1.0,
+    dtypes: dict = None,
+    columns: list = None,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    threads: int = None,
+):
+    """Gera os blocos (RecordBatch Arrow) de flights.csv já tipados e amostrados por hash.
+
+    Os blocos são parseados e filtrados em paralelo (`map_csv_blocks`) e
+    entregues na ordem do arquivo; a memória fica limitada a alguns blocos de
+    `block_size` bytes do CSV por thread.
+    """
+    import pyarrow as pa
+
+    if not 0.0 < fraction <= 1.0:
+        raise ValueError(f"fraction deve estar em (0, 1], recebido: {fraction}")
+
+    dtypes = DTYPES_FLIGHTS if dtypes is None else dtypes
+    if columns is not None and fraction < 1.0:
+        columns = list(dict.fromkeys(list(columns) + FLIGHT_KEY))
+
+    def sample(table):
+        if fraction < 1.0:
+            table = table.filter(pa.array(sample_mask(table.select(FLIGHT_KEY).to_pandas(), fraction)))
+        return table
+
+    for table in map_csv_blocks(path, sample, dtypes, columns, block_size, threads):
+        yield from table.to_batches()
+
+
+def batch_to_frame(batch, dtypes: dict = None) -> pd.DataFrame:
+    """Converte um bloco Arrow para pandas no schema enxuto (`dtypes`)."""
+    dtypes = DTYPES_FLIGHTS if dtypes is None else dtypes
+    df = batch.to_pandas()
+    return df.astype({c: t for c, t in dtypes.items() if c in df.columns}, copy=False)
+
+
+def read_flights_sampled(
+    path: Path,
+    fraction: float = 0.1,
+    dtypes: dict = None,
+    columns: list = None,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    threads: int = None,
+) -> pd.DataFrame:
+    """Lê flights.csv em blocos parseados em paralelo (um por thread) e amostra por hash.
+
+    Cada bloco é convertido já no schema enxuto (`dtypes`, default DTYPES_FLIGHTS),
+    filtrado pela máscara de hash e mantido em Arrow; a conversão para pandas
+    acontece uma única vez ao final. `fraction=1.0` lê o arquivo completo.
+    """
+    import pyarrow as pa
+
+    dtypes = DTYPES_FLIGHTS if dtypes is None else dtypes
+    batches = list(iter_flights_batches(path, fraction, dtypes, columns, block_size, threads))
+    if not batches:
+        raise ValueError(f"Nenhum voo lido de {path}")
+
+    table = pa.Table.from_batches(batches).unify_dictionaries()
+    df = table.to_pandas()
+    present = {c: t for c, t in dtypes.items() if c in df.columns}
+    return compact_categories(df.astype(present, copy=False))
+
+
+# ==============================================================================
+# Cache Parquet particionado
+# ==============================================================================
+def _partitioning(schema):
+    """Particionamento hive tipado — YEAR/MONTH voltam como int16/int8, não category."""
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    fields = [pa.field(c, _arrow_type(DTYPES_PROCESSED[c]))
+              for c in PARTITION_COLS if c in schema.names]
+    if not fields:
+        return None
+    return ds.partitioning(pa.schema(fields), flavor="hive")
+
+
+def _storage_table(data):
+    """DataFrame/Table → Table no formato gravado: strings e categóricas como
+    dictionary<int32, string>, colunas de partição nos tipos de DTYPES_PROCESSED."""
+    import pyarrow as pa
+
+    table = data if isinstance(data, pa.Table) else pa.Table.from_pandas(data, preserve_index=False)
+    # Strings soltas viram dicionário: o Parquet guarda cada valor uma única vez.
+    # Índices sempre int32, para que blocos gravados em separado tenham o mesmo schema.
+    fields = []
+    for field in table.schema:
+        if (pa.types.is_string(field.type) or pa.types.is_large_string(field.type)
+                or pa.types.is_dictionary(field.type)):
+            field = field.with_type(pa.dictionary(pa.int32(), pa.string()))
+        elif field.name in PARTITION_COLS:
+            field = field.with_type(_arrow_type(DTYPES_PROCESSED[field.name]))
+        fields.append(field)
+    return table.cast(pa.schema(fields))
+
+
+def write_flights_dataset(data, path: Path) -> Path:
+    """Grava um DataFrame/Table Arrow como dataset Parquet particionado por YEAR/MONTH.
+
+    Colunas categóricas (e strings) são gravadas dictionary-encoded. O diretório
+    de destino é recriado do zero para não misturar partições antigas.
+    """
+    if path.exists():
+        shutil.rmtree(path)
+    return append_flights_dataset(data, path, part=0)
+
+
+def append_flights_dataset(data, path: Path, part: int) -> Path:
+    """Acrescenta um bloco ao dataset particionado, em arquivos `part-<part>-*.parquet`.
+
+    Usado pela gravação em streaming: cada bloco vira um arquivo por partição
+    YEAR/MONTH, sem reescrever os blocos anteriores.
+    """
+    import pyarrow.dataset as ds
+
+    table = _storage_table(data)
+    ds.write_dataset(
+        table,
+        path,
+        format="parquet",
+        partitioning=_partitioning(table.schema),
+        basename_template=f"part-{part}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+    )
+    return path
+
+
+def csv_to_flights_dataset(src_csv: Path, path: Path) -> Path:
+    """Converte um CSV de voos no dataset particionado (parser multithread do Arrow)."""
+    import pyarrow.csv as pv
+
+    header = pv.open_csv(src_csv).schema.names
+    table = pv.read_csv(
+        src_csv,
+        read_options=pv.ReadOptions(use_threads=True, block_size=DEFAULT_BLOCK_SIZE),
+        convert_options=pv.ConvertOptions(
+            column_types={c: _arrow_type(t) for c, t in DTYPES_PROCESSED.items() if c in header},
+            strings_can_be_null=True,
+        ),
+    )
+    write_flights_dataset(table, path)
+    stat = src_csv.stat()
+    with open(path / _SOURCE_MARKER, "w") as f:
+        json.dump({"source": str(src_csv), "size": stat.st_size,
+                   "mtime_ns": stat.st_mtime_ns, "schema": SCHEMA_VERSION}, f)
+    return path
+
+
+def ensure_flights_dataset(src_csv: Path = PROCESSED_CSV, path: Path = PROCESSED_DATASET) -> Path:
+    """Garante o dataset Parquet do CSV processado, reconvertendo só se o CSV mudou."""
+    marker = path / _SOURCE_MARKER
+    if not src_csv.exists():
+        if path.exists():
+            return path
+        raise FileNotFoundError(f"Nem {src_csv} nem {path} encontrados — rode as etapas anteriores")
+    if marker.exists():
+        with open(marker) as f:
+            src = json.load(f)
+        stat = src_csv.stat()
+        if (src.get("size") == stat.st_size and src.get("mtime_ns") == stat.st_mtime_ns
+                and src.get("schema") == SCHEMA_VERSION):
+            return path
+    print(f"  Convertendo {src_csv} → {path} (Parquet particionado por {'/'.join(PARTITION_COLS)})...")
+    return csv_to_flights_dataset(src_csv, path)
+
+
+def read_flights_dataset(path: Path, columns: list = None, filters: list = None,
+                         fraction: float = 1.0) -> pd.DataFrame:
+    """Lê o dataset particionado com projeção de colunas e pruning de partições.
+
+    `filters` segue a sintaxe de `pd.read_parquet` (ex.: [("MONTH", "in", [1, 2])]);
+    filtros sobre YEAR/MONTH descartam diretórios inteiros sem abri-los.
+    Colunas pedidas que não existem no dataset são ignoradas. Com `fraction < 1`
+    os lotes são amostrados por hash da chave do voo à medida que são lidos.
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+
+    # Arquivos com prefixo "_" (ex.: _source.json) são ignorados pelo pyarrow
+    probe = ds.dataset(path, format="parquet", partitioning="hive")
+    dataset = ds.dataset(path, format="parquet", partitioning=_partitioning(probe.schema))
+    if columns is not None:
+        columns = [c for c in columns if c in dataset.schema.names]
+    expr = pq.filters_to_expression(filters) if filters else None
+    if fraction >= 1.0:
+        return compact_categories(dataset.to_table(columns=columns, filter=expr).to_pandas())
+
+    read_cols = None if columns is None else list(dict.fromkeys(list(columns) + FLIGHT_KEY))
+    batches = []
+    for batch in dataset.to_batches(columns=read_cols, filter=expr):
+        mask = sample_mask(batch.select(FLIGHT_KEY).to_pandas(), fraction)
+        batches.append(batch.filter(pa.array(mask)))
+    table = pa.Table.from_batches(batches, schema=dataset.schema if read_cols is None
+                                  else pa.schema([dataset.schema.field(c) for c in read_cols]))
+    df = table.unify_dictionaries().to_pandas()
+    return compact_categories(df if columns is None else df[columns])
+
+
+def iter_flights_dataset(path: Path, columns: list = None, batch_rows: int = STREAM_BATCH_ROWS):
+    """Gera DataFrames de até `batch_rows` linhas do dataset particionado, na
+    ordem dos arquivos — memória limitada a um lote."""
+    import pyarrow.dataset as ds
+
+    probe = ds.dataset(path, format="parquet", partitioning="hive")
+    dataset = ds.dataset(path, format="parquet", partitioning=_partitioning(probe.schema))
+    if columns is not None:
+        columns = [c for c in columns if c in dataset.schema.names]
+    for batch in dataset.to_batches(columns=columns, batch_size=batch_rows):
+        if batch.num_rows:
+            yield batch.to_pandas()
+
+
+def load_processed_flights(columns: list = None, filters: list = None) -> pd.DataFrame:
+    """Carrega flights_sample_processed via cache Parquet (converte o CSV na 1ª vez)."""
+    return read_flights_dataset(ensure_flights_dataset(), columns=columns, filters=filters)
+
+
+def load_stage(stage: str, filters: list = None, report: bool = True) -> pd.DataFrame:
+    """Carrega o dataset processado com a projeção de colunas da etapa `stage`.
+
+    As colunas chegam nos tipos de DTYPES_PROCESSED (category / int8 / int16 /
+    float32); com `report=True` imprime a economia de memória da etapa.
+    """
+    if stage not in STAGE_COLUMNS:
+        raise KeyError(f"Etapa desconhecida: {stage!r} — opções: {sorted(STAGE_COLUMNS)}")
+    df = load_processed_flights(columns=STAGE_COLUMNS[stage], filters=filters)
+    if report:
+        memory_report(df, stage)
+    return df
@@ -0,0 +1,148 @@
+"""
+Treino Out-of-Core — modelo linear incremental sobre os row groups do feature store
+
+Alternativa ao `LogisticRegression` em memória: um `SGDClassifier` com perda
+logística (mesma família de modelo, `predict_proba` = sigmoide) ajustado por
+`partial_fit`, um row group de X_train / y_train por vez (ver
+`feature_store.iter_split`) — a memória fica limitada a um row group,
+independente do nº de voos.
+
+    class weighting   pesos "balanced" (n / (2·n_classe)) calculados só de
+                      y_train, que é int8 e cabe em memória
+    regularização     alpha = 1 / (C · n_train), o equivalente do C = 1.0 do
+                      LogisticRegression
+    passo e média     passo eta0 / t^0.5 (`invscaling`) com ASGD (`average=True`,
+                      coeficientes = média dos iterados) — com o passo
+                      "optimal" e alpha tão pequeno o SGD oscila longe do ótimo
+                      do LogisticRegression mesmo após várias épocas
+    épocas            a ordem dos row groups é embaralhada a cada época
+                      (seed 42 + época); o SGD embaralha as linhas dentro de
+                      cada chamada
+    checkpoint        ao fim de cada época: modelo atual, melhor modelo e
+                      histórico em models/checkpoints/ — `resume=True` continua
+                      da última época gravada
+    validação         log loss e AUC em X_val (também em streaming) a cada
+                      época; o modelo devolvido é o de menor log loss (a AUC
+                      estabiliza cedo, a calibração continua melhorando), com
+                      parada após `patience` épocas sem melhora
+
+Uso:
+    python src/incremental_linear.py --epochs 5        # treino isolado + métricas de val
+    LR_TRAINING=streaming python src/03_supervised_classification.py
+
+    from incremental_linear import train_incremental
+    model, history = train_incremental(Path("./data/processed"), epochs=5)
+"""
+import argparse
+import copy
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from feature_store import FEATURE_DIR, iter_split, read_target, split_layout
+
+CHECKPOINT_DIR  = Path("./models/checkpoints")
+CHECKPOINT_FILE = "logistic_regression_sgd.pkl"
+EPOCHS   = 5
+ETA0     = 0.01
+PATIENCE = 2
+
+
+def balanced_weights(y) -> dict:
+    """Pesos do class_weight="balanced" do sklearn: n / (n_classes · n_classe)."""
+    counts = np.bincount(np.asarray(y, dtype=np.int64), minlength=2)
+    return {c: float(len(y) / (len(counts) * n)) for c, n in enumerate(counts) if n > 0}
+
+
+def evaluate_streaming(model, split: str, out_dir: Path = FEATURE_DIR) -> dict:
+    """Log loss e AUC de `model` em um split lido row group a row group."""
+    from sklearn.metrics import log_loss, roc_auc_score
+
+    columns, _ = split_layout(split, out_dir)
+    probas, targets = [], []
+    for X, y in iter_split(split, out_dir):
+        probas.append(model.predict_proba(pd.DataFrame(X, columns=columns, copy=False))[:, 1])
+        targets.append(y)
+    proba, y = np.concatenate(probas), np.concatenate(targets)
+    return {"log_loss": round(float(log_loss(y, proba, labels=[0, 1])), 4),
+            "roc_auc": round(float(roc_auc_score(y, proba)), 4)}
+
+
+def train_incremental(out_dir: Path = FEATURE_DIR, epochs: int = EPOCHS, patience: int = PATIENCE,
+                      checkpoint_dir: Path = CHECKPOINT_DIR, resume: bool = False,
+                      C: float = 1.0, random_state: int = 42, verbose: bool = True) -> tuple:
+    """Ajusta o SGD logístico em streaming; retorna (melhor modelo, histórico por época)."""
+    from sklearn.linear_model import SGDClassifier
+
+    y_train = read_target("train", out_dir).to_numpy()
+    columns, n_groups = split_layout("train", out_dir)
+    classes = np.array([0, 1])
+    checkpoint = checkpoint_dir / CHECKPOINT_FILE
+
+    if resume and checkpoint.exists():
+        state = joblib.load(checkpoint)
+        if verbose:
+            print(f"  Retomando de {checkpoint} (época {state['epoch']})")
+    else:
+        state = {
+            "epoch": 0, "history": [], "best": None, "best_loss": np.inf,
+            "model": SGDClassifier(loss="log_loss", alpha=1.0 / (C * len(y_train)),
+                                   class_weight=balanced_weights(y_train),
+                                   learning_rate="invscaling", eta0=ETA0, average=True,
+                                   random_state=random_state),
+        }
+    model = state["model"]
+
+    for epoch in range(state["epoch"] + 1, epochs + 1):
+        t0 = time.time()
+        order = np.random.default_rng(random_state + epoch).permutation(n_groups)
+        for X, y in iter_split("train", out_dir, row_groups=order):
+            model.partial_fit(pd.DataFrame(X, columns=columns, copy=False), y, classes=classes)
+
+        metrics = evaluate_streaming(model, "val", out_dir)
+        state["history"].append({"epoch": epoch, "seconds": round(time.time() - t0, 2), **metrics})
+        if metrics["log_loss"] < state["best_loss"]:
+            state["best"], state["best_loss"] = copy.deepcopy(model), metrics["log_loss"]
+        state["epoch"] = epoch
+        checkpoint_dir.mkdir(parents=True, exist_ok=True)
+        joblib.dump(state, checkpoint)
+        if verbose:
+            print(f"    Época {epoch}/{epochs} — val log loss={metrics['log_loss']:.4f}  "
+                  f"auc={metrics['roc_auc']:.4f}  ({time.time() - t0:.1f}s)")
+
+        losses = [h["log_loss"] for h in state["history"]]
+        if len(losses) - 1 - int(np.argmin(losses)) >= patience:
+            if verbose:
+                print(f"    Sem melhora em {patience} épocas — parada antecipada")
+            break
+
+    return state["best"], state["history"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--data-dir", type=Path, default=FEATURE_DIR)
+    parser.add_argument("--epochs", type=int, default=EPOCHS)
+    parser.add_argument("--patience", type=int, default=PATIENCE)
+    parser.add_argument("--resume", action="store_true", help="continua do último checkpoint")
+    parser.add_argument("--out", type=Path, default=Path("./models/logistic_regression_sgd.pkl"))
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print("TREINO OUT-OF-CORE — SGD logístico por row group")
+    print("=" * 80)
+    t0 = time.time()
+    model, history = train_incremental(args.data_dir, args.epochs, args.patience, resume=args.resume)
+    joblib.dump(model, args.out)
+    best = min(history, key=lambda h: h["log_loss"])
+    print(f"✓ Melhor época {best['epoch']} (val log loss={best['log_loss']:.4f}, "
+          f"auc={best['roc_auc']:.4f}) → {args.out}  "
+          f"[{time.time() - t0:.1f}s]")
+    print(f"  Teste: {evaluate_streaming(model, 'test', args.data_dir)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Boosting por histogramas com categorias nativas — motor "hist" do Gradient Boosting
+
+`HistGradientBoostingClassifier` (multithread, early stopping) sobre as
+numéricas padronizadas do feature store e os códigos inteiros das categorias
+(codes_{split}.parquet) — companhia, aeroportos e período — no lugar das
+médias do target encoding. Cada categoria vira um split nativo da árvore.
+
+O HGB aceita até 255 valores por coluna categórica: as MAX_CATEGORIES mais
+frequentes no treino (com um mínimo de voos — categorias raras são o que faz
+um split categórico sobreajustar) ficam com código próprio e as demais dividem
+um código "outras". O mínimo acompanha o tamanho do treino: MIN_CATEGORY_SHARE
+das linhas, nunca abaixo de `min_samples_leaf` (uma categoria menor que uma
+folha não sustenta um split próprio) — ~400 voos no treino completo, 100 numa
+amostra de 100 mil; `min_category_count` fixa um valor. Categorias não vistas
+no treino (código −1) entram como faltantes. O mapeamento fica dentro do
+estimador, então o .pkl é autossuficiente.
+
+Uso:
+    from native_boosting import NativeCategoryBoosting, native_frame
+    model = NativeCategoryBoosting().fit(native_frame(X_train, codes_train), y_train)
+    model.predict_proba(native_frame(X_test, codes_test))[:, 1]
+"""
+import numpy as np
+import pandas as pd
+from sklearn.base import BaseEstimator, ClassifierMixin
+
+from feature_transformer import FEATURES_CAT_TARGET_ENC, FEATURES_NUM, OHE_COL
+
+NATIVE_CAT_COLS    = FEATURES_CAT_TARGET_ENC + [OHE_COL]
+MAX_CATEGORIES     = 254   # + 1 código "outras" = 255 (limite de bins do HGB)
+MIN_CATEGORY_SHARE = 1e-4  # categorias com menos de 0,01% dos voos de treino vão para "outras"
+
+
+def native_frame(X: pd.DataFrame, codes: pd.DataFrame) -> pd.DataFrame:
+    """Numéricas de `X` (feature store) + códigos inteiros das categorias."""
+    return pd.concat([X[FEATURES_NUM].reset_index(drop=True),
+                      codes[NATIVE_CAT_COLS].reset_index(drop=True)], axis=1)
+
+
+class NativeCategoryBoosting(ClassifierMixin, BaseEstimator):
+    """HistGradientBoostingClassifier com as categorias tratadas de forma nativa."""
+
+    def __init__(self, num_cols=FEATURES_NUM, cat_cols=NATIVE_CAT_COLS,
+                 max_categories=MAX_CATEGORIES, min_category_count=None,
+                 learning_rate=0.05, max_iter=500, max_leaf_nodes=31, min_samples_leaf=100,
+                 early_stopping=True, validation_fraction=0.1, n_iter_no_change=20,
+                 random_state=42):
+        self.num_cols = num_cols
+        self.cat_cols = cat_cols
+        self.max_categories = max_categories
+        self.min_category_count = min_category_count
+        self.learning_rate = learning_rate
+        self.max_iter = max_iter
+        self.max_leaf_nodes = max_leaf_nodes
+        self.min_samples_leaf = min_samples_leaf
+        self.early_stopping = early_stopping
+        self.validation_fraction = validation_fraction
+        self.n_iter_no_change = n_iter_no_change
+        self.random_state = random_state
+
+    def _lookup(self, codes: np.ndarray) -> np.ndarray:
+        """Código do feature store → código compacto (0..max_categories, NaN = faltante)."""
+        counts = np.bincount(codes[codes >= 0])
+        order = np.argsort(-counts, kind="stable")
+        top = order[:self.max_categories]
+        top = top[counts[top] >= max(self.min_category_count_, 1)]
+        lookup = np.where(counts > 0, self.max_categories, np.nan).astype(np.float32)
+        lookup[top] = np.arange(len(top), dtype=np.float32)
+        return lookup
+
+    def _matrix(self, X: pd.DataFrame) -> np.ndarray:
+        out = np.empty((len(X), len(self.num_cols) + len(self.cat_cols)), dtype=np.float32)
+        for i, col in enumerate(self.num_cols):
+            out[:, i] = X[col].to_numpy(dtype=np.float32)
+        for j, col in enumerate(self.cat_cols, start=len(self.num_cols)):
+            codes = X[col].to_numpy(dtype=np.int64)
+            lookup = self.lookup_[col]
+            known = (codes >= 0) & (codes < len(lookup))
+            out[:, j] = np.where(known, lookup[np.where(known, codes, 0)], np.nan)
+        return out
+
+    def fit(self, X: pd.DataFrame, y) -> "NativeCategoryBoosting":
+        from sklearn.ensemble import HistGradientBoostingClassifier
+
+        self.min_category_count_ = (
+            max(self.min_samples_leaf, int(round(len(X) * MIN_CATEGORY_SHARE)))
+            if self.min_category_count is None else self.min_category_count
+        )
+        self.lookup_ = {col: self._lookup(X[col].to_numpy(dtype=np.int64)) for col in self.cat_cols}
+        n_num = len(self.num_cols)
+        self.model_ = HistGradientBoostingClassifier(
+            learning_rate=self.learning_rate,
+            max_iter=self.max_iter,
+            max_leaf_nodes=self.max_leaf_nodes,
+            min_samples_leaf=self.min_samples_leaf,
+            categorical_features=[n_num + j for j in range(len(self.cat_cols))],
+            early_stopping=self.early_stopping,
+            validation_fraction=self.validation_fraction,
+            n_iter_no_change=self.n_iter_no_change,
+            random_state=self.random_state,
+        ).fit(self._matrix(X), np.asarray(y))
+        self.classes_ = self.model_.classes_
+        self.n_iter_ = self.model_.n_iter_
+        return self
+
+    def predict_proba(self, X: pd.DataFrame) -> np.ndarray:
+        return self.model_.predict_proba(self._matrix(X))
+
+    def predict(self, X: pd.DataFrame) -> np.ndarray:
+        return self.model_.predict(self._matrix(X))
@@ -0,0 +1,326 @@
+"""
+Inferência em NumPy — modelos treinados compilados em arrays planos, sem scikit-learn
+
+`compile_model` converte um estimador do 03 em arrays + meta.json:
+
+    Logistic Regression   vetor de coeficientes + intercepto → sigmoide (também o
+                          SGD logístico do treino out-of-core)
+    Random Forest         nós de todas as árvores concatenados; folha = P(atraso)
+                          da árvore → média entre árvores
+    Gradient Boosting     idem, folha = contribuição já multiplicada pelo learning
+                          rate → sigmoide(baseline + soma); no motor "hist" os
+                          splits categóricos viram uma tabela nó × código (256)
+                          com o lado de cada categoria (desconhecidas seguem o
+                          lado dos faltantes, como no sklearn)
+
+Arrays dos nós (um elemento por nó, índices globais; folhas apontam para si
+mesmas): feature, threshold, children (esquerdo e direito intercalados: filho
+de i em 2i + vai_para_direita), missing_left, cat_row, value.
+
+`CompiledModel.load` abre os .npy por memory-map — sem unpickle de objetos,
+sem importar o sklearn — e percorre todas as árvores de uma vez sobre o lote:
+`max_depth` passos vetorizados de (linhas × árvores) índices de nó, com as
+linhas em blocos de até CHUNK_CELLS células.
+
+A compilação lê atributos privados do sklearn (`_predictors`, `_bin_mapper`,
+`_baseline_prediction`, `_raw_predict_init`), que mudam entre versões sem
+aviso. meta.json registra a versão do sklearn da compilação, e `export_model`
+guarda um lote de prova (probe.npy) com as probabilidades do estimador
+(probe_proba.npy), recusando a exportação se o compilado divergir delas.
+`probe_diff` repete a conferência contra o estimador de outra versão.
+
+Uso:
+    from numpy_inference import COMPILED_DIR, CompiledModel, export_model
+    export_model(rf, COMPILED_DIR / "random_forest")            # no 03
+    model = CompiledModel.load(COMPILED_DIR / "random_forest")
+    model.predict_proba(X_test)[:, 1]
+"""
+import json
+from pathlib import Path
+
+import numpy as np
+
+COMPILED_DIR = Path("./models/compiled")
+CHUNK_CELLS  = 1 << 20   # linhas × árvores percorridas por bloco
+PROBE_ROWS   = 512       # lote de prova gravado junto do modelo compilado
+PROBE_TOL    = 1e-6      # máx |ΔP| aceito entre o compilado e o sklearn
+
+
+def sklearn_version():
+    """Versão do scikit-learn instalado, ou None (inferência só com NumPy)."""
+    try:
+        import sklearn
+    except ImportError:
+        return None
+    return sklearn.__version__
+
+
+def _sigmoid(z: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-z))
+
+
+# ==============================================================================
+# Compilação (precisa do estimador sklearn)
+# ==============================================================================
+def _tree_nodes(tree, value: np.ndarray) -> dict:
+    """Nós de uma DecisionTree do sklearn (folha: value)."""
+    t = tree.tree_
+    leaf = t.children_left < 0
+    idx = np.arange(t.node_count)
+    missing = getattr(t, "missing_go_to_left", np.zeros(t.node_count, dtype=np.uint8))
+    return {
+        "feature": np.where(leaf, -1, t.feature),
+        "threshold": t.threshold,
+        "left": np.where(leaf, idx, t.children_left),
+        "right": np.where(leaf, idx, t.children_right),
+        "missing_left": np.asarray(missing, dtype=bool),
+        "cat_row": np.full(t.node_count, -1),
+        "value": value,
+        "cat_left": np.zeros((0, 256), dtype=bool),
+        "depth": tree.get_depth(),
+    }
+
+
+def _bits(bitset: np.ndarray, codes: np.ndarray) -> np.ndarray:
+    """Bits `codes` de um bitset de 8 × uint32 (formato do sklearn)."""
+    return ((bitset[codes >> 5] >> (codes & 31).astype(np.uint32)) & 1).astype(bool)
+
+
+def _hist_nodes(predictor, known_bitsets: np.ndarray, f_idx_map: np.ndarray) -> dict:
+    """Nós de um TreePredictor do HistGradientBoosting."""
+    nodes = predictor.nodes
+    n = len(nodes)
+    leaf = nodes["is_leaf"].astype(bool)
+    idx = np.arange(n)
+    categorical = np.flatnonzero(nodes["is_categorical"].astype(bool) & ~leaf)
+    codes = np.arange(256)
+    cat_left = np.zeros((len(categorical), 256), dtype=bool)
+    for row, i in enumerate(categorical):
+        left = _bits(predictor.raw_left_cat_bitsets[nodes["bitset_idx"][i]], codes)
+        known = _bits(known_bitsets[f_idx_map[nodes["feature_idx"][i]]], codes)
+        cat_left[row] = left | (~known & bool(nodes["missing_go_to_left"][i]))
+    cat_row = np.full(n, -1)
+    cat_row[categorical] = np.arange(len(categorical))
+    return {
+        "feature": np.where(leaf, -1, nodes["feature_idx"]),
+        "threshold": nodes["num_threshold"],
+        "left": np.where(leaf, idx, nodes["left"]),
+        "right": np.where(leaf, idx, nodes["right"]),
+        "missing_left": nodes["missing_go_to_left"].astype(bool),
+        "cat_row": cat_row,
+        "value": np.where(leaf, nodes["value"], 0.0),
+        "cat_left": cat_left,
+        "depth": predictor.get_max_depth(),
+    }
+
+
+def _concat_trees(trees: list) -> tuple:
+    """Concatena as árvores com índices globais de nó e de linha categórica."""
+    sizes = np.array([len(t["feature"]) for t in trees])
+    offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    cat_offsets = np.concatenate([[0], np.cumsum([len(t["cat_left"]) for t in trees])[:-1]])
+    out = {
+        "feature": np.concatenate([t["feature"] for t in trees]).astype(np.int32),
+        "threshold": np.concatenate([t["threshold"] for t in trees]).astype(np.float64),
+        "children": np.concatenate([np.column_stack([t["left"], t["right"]]).ravel() + o
+                                    for t, o in zip(trees, offsets)]).astype(np.int32),
+        "missing_left": np.concatenate([t["missing_left"] for t in trees]),
+        "cat_row": np.concatenate([np.where(t["cat_row"] >= 0, t["cat_row"] + o, -1)
+                                   for t, o in zip(trees, cat_offsets)]).astype(np.int32),
+        "value": np.concatenate([t["value"] for t in trees]).astype(np.float64),
+        "cat_left": np.concatenate([t["cat_left"] for t in trees]),
+        "roots": offsets.astype(np.int32),
+    }
+    return out, int(max(t["depth"] for t in trees))
+
+
+def _native_lookups(model) -> tuple:
+    """Código do feature store → valor que as árvores do HGB comparam, e ordem das colunas.
+
+    Com categorias, o HGB passa X por um OrdinalEncoder (categóricas primeiro,
+    valores → posição entre as categorias vistas no fit, não vistas → NaN);
+    esse passo é composto com o `lookup_` do NativeCategoryBoosting.
+    """
+    lookups = {col: np.asarray(model.lookup_[col], dtype=np.float32) for col in model.cat_cols}
+    preprocessor = getattr(model.model_, "_preprocessor", None)
+    if preprocessor is None:
+        return lookups, list(model.num_cols) + list(model.cat_cols)
+    encoder = preprocessor.named_transformers_["encoder"]
+    for col, categories in zip(model.cat_cols, encoder.categories_):
+        categories = categories[~np.isnan(categories)]
+        lookup = lookups[col]
+        pos = np.minimum(np.searchsorted(categories, lookup), max(len(categories) - 1, 0))
+        hit = (len(categories) > 0) & (categories[pos] == lookup)
+        lookups[col] = np.where(hit, pos, np.nan).astype(np.float32)
+    return lookups, list(model.cat_cols) + list(model.num_cols)
+
+
+def compile_model(model) -> tuple:
+    """(meta, arrays) de um estimador do 03 — LR, Random Forest, GB exato ou hist."""
+    kind = type(model).__name__
+    columns = [str(c) for c in getattr(model, "feature_names_in_", [])]
+    meta = {"model": kind, "classes": np.asarray(model.classes_).tolist(), "columns": columns,
+            "sklearn_version": sklearn_version()}
+
+    if kind in ("LogisticRegression", "SGDClassifier"):
+        meta.update(kind="linear", baseline=float(model.intercept_[0]))
+        return meta, {"coef": np.asarray(model.coef_[0], dtype=np.float64)}
+
+    if kind == "RandomForestClassifier":
+        trees = []
+        for est in model.estimators_:
+            value = est.tree_.value[:, 0, :]
+            trees.append(_tree_nodes(est, value[:, 1] / value.sum(axis=1)))
+        meta.update(combine="mean", baseline=0.0)
+    elif kind == "GradientBoostingClassifier":
+        trees = [_tree_nodes(est, model.learning_rate * est.tree_.value[:, 0, 0])
+                 for est in model.estimators_[:, 0]]
+        init = model._raw_predict_init(np.zeros((1, model.n_features_in_), dtype=np.float32))
+        meta.update(combine="logit", baseline=float(init[0, 0]))
+    elif kind == "NativeCategoryBoosting":
+        hgb = model.model_
+        known, f_idx_map = hgb._bin_mapper.make_known_categories_bitsets()
+        trees = [_hist_nodes(p, known, f_idx_map) for (p,) in hgb._predictors]
+        lookups, columns = _native_lookups(model)
+        meta.update(combine="logit", baseline=float(np.ravel(hgb._baseline_prediction)[0]),
+                    columns=columns, lookups=list(model.cat_cols))
+    else:
+        raise TypeError(f"Modelo não suportado pela inferência NumPy: {kind}")
+
+    arrays, depth = _concat_trees(trees)
+    meta.update(kind="trees", n_trees=len(trees), max_depth=depth)
+    if kind == "NativeCategoryBoosting":
+        arrays.update({f"lookup_{col}": lookup for col, lookup in lookups.items()})
+    return meta, arrays
+
+
+def _probe_input(probe: np.ndarray, columns: list):
+    """Lote de prova no formato de entrada do estimador (DataFrame se tem nomes)."""
+    if not columns:
+        return probe
+    import pandas as pd
+
+    return pd.DataFrame(probe, columns=columns)
+
+
+def export_model(model, path: Path, probe=None) -> Path:
+    """Compila `model` em `path`/ (meta.json + um .npy por array).
+
+    Com `probe` (X no formato de treino), as primeiras PROBE_ROWS linhas e as
+    probabilidades do estimador viram o lote de prova; ValueError se o
+    compilado divergir delas em mais de PROBE_TOL.
+    """
+    meta, arrays = compile_model(model)
+    path.mkdir(parents=True, exist_ok=True)
+    for old in path.glob("*.npy"):
+        old.unlink()
+    for name, values in arrays.items():
+        np.save(path / f"{name}.npy", np.ascontiguousarray(values))
+    meta["arrays"] = sorted(arrays)
+    if probe is not None:
+        rows = probe.iloc[:PROBE_ROWS] if hasattr(probe, "iloc") else probe[:PROBE_ROWS]
+        x = np.asarray(rows[meta["columns"]] if meta["columns"] else rows, dtype=np.float32)
+        expected = model.predict_proba(_probe_input(x, meta["columns"]))[:, 1].astype(np.float64)
+        compiled = CompiledModel(meta, {name: np.asarray(v) for name, v in arrays.items()})
+        diff = float(np.abs(compiled.predict_positive(_probe_input(x, meta["columns"])) - expected).max())
+        if diff > PROBE_TOL:
+            raise ValueError(f"{meta['model']} compilado diverge do sklearn {meta['sklearn_version']} "
+                             f"no lote de prova (máx |ΔP| = {diff:.1e})")
+        np.save(path / "probe.npy", x)
+        np.save(path / "probe_proba.npy", expected)
+        meta["probe_rows"] = len(x)
+    (path / "meta.json").write_text(json.dumps(meta, indent=2))
+    return path
+
+
+# ==============================================================================
+# Predição (somente NumPy)
+# ==============================================================================
+class CompiledModel:
+    """Preditor sobre os arrays de `export_model`, com a interface predict_proba/predict."""
+
+    def __init__(self, meta: dict, arrays: dict):
+        self.meta = meta
+        self.arrays = arrays
+        self.classes_ = np.asarray(meta["classes"])
+        self.columns = meta["columns"]
+        self.native = "lookups" in meta     # entrada = native_frame (motor "hist")
+
+    @classmethod
+    def load(cls, path: Path, mmap: bool = True) -> "CompiledModel":
+        meta = json.loads((path / "meta.json").read_text())
+        arrays = {name: np.load(path / f"{name}.npy", mmap_mode="r" if mmap else None)
+                  for name in meta["arrays"]}
+        return cls(meta, arrays)
+
+    def probe_diff(self, model, path: Path) -> float:
+        """máx |ΔP| entre este compilado e `model` (o .pkl carregado no sklearn
+        atual) no lote de prova de `path`; inf se a exportação não tem lote."""
+        if not (path / "probe.npy").exists():
+            return float("inf")
+        x = _probe_input(np.load(path / "probe.npy"), self.columns)
+        return float(np.abs(self.predict_positive(x) - model.predict_proba(x)[:, 1]).max())
+
+    def _matrix(self, X) -> np.ndarray:
+        """X (DataFrame com as colunas do treino ou array já ordenado) → float32."""
+        if not hasattr(X, "columns"):
+            return np.asarray(X, dtype=np.float32)
+        out = np.empty((len(X), len(self.columns)), dtype=np.float32)
+        lookups = set(self.meta.get("lookups", []))
+        for i, col in enumerate(self.columns):
+            if col in lookups:
+                codes = X[col].to_numpy(dtype=np.int64)
+                lookup = self.arrays[f"lookup_{col}"]
+                known = (codes >= 0) & (codes < len(lookup))
+                out[:, i] = np.where(known, lookup[np.where(known, codes, 0)], np.nan)
+            else:
+                out[:, i] = X[col].to_numpy(dtype=np.float32)
+        return out
+
+    def _trees(self, x: np.ndarray) -> np.ndarray:
+        a = self.arrays
+        feature, threshold, children = a["feature"], a["threshold"], a["children"]
+        missing_left, cat_row, cat_left = a["missing_left"], a["cat_row"], a["cat_left"]
+        has_cat = len(cat_left) > 0
+        has_nan = bool(np.isnan(x).any())
+        roots = np.asarray(a["roots"])
+        flat = x.ravel()
+        base = (np.arange(len(x)) * x.shape[1])[:, None]
+
+        idx = np.broadcast_to(roots, (len(x), len(roots))).copy()
+        for _ in range(self.meta["max_depth"]):
+            values = flat[base + feature[idx]]          # folhas (feature −1) não se movem
+            go_right = ~(values <= threshold[idx])
+            if has_cat:
+                cat = cat_row[idx]
+                is_cat = cat >= 0
+                if is_cat.any():
+                    v = values[is_cat]
+                    in_range = (v >= 0) & (v < 256)
+                    code = np.where(in_range, v, 0).astype(np.intp)
+                    go_right[is_cat] = ~np.where(in_range, cat_left[cat[is_cat], code],
+                                                 missing_left[idx[is_cat]])
+            if has_nan:
+                go_right = np.where(np.isnan(values), ~missing_left[idx], go_right)
+            idx = children[2 * idx + go_right]
+
+        leaves = a["value"][idx]
+        if self.meta["combine"] == "mean":
+            return leaves.mean(axis=1)
+        return _sigmoid(self.meta["baseline"] + leaves.sum(axis=1))
+
+    def predict_positive(self, X) -> np.ndarray:
+        """P(classe 1) para cada linha de X."""
+        x = self._matrix(X)
+        if self.meta["kind"] == "linear":
+            return _sigmoid(x.astype(np.float64) @ self.arrays["coef"] + self.meta["baseline"])
+        step = max(1, CHUNK_CELLS // self.meta["n_trees"])
+        return np.concatenate([self._trees(x[i:i + step]) for i in range(0, len(x), step)]
+                              or [np.empty(0)])
+
+    def predict_proba(self, X) -> np.ndarray:
+        p = self.predict_positive(X)
+        return np.column_stack([1.0 - p, p])
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_[(self.predict_positive(X) > 0.5).astype(np.intp)]
@@ -0,0 +1,99 @@
+"""
+Prediction Store — probabilidades por (modelo, split) calculadas uma única vez
+
+O `03_supervised_classification.py` chama `predict_proba` uma vez por modelo e
+split; métricas, curvas ROC/PR, matrizes de confusão, análise de threshold e
+o export das previsões de teste derivam todos dessas probabilidades (a classe
+prevista é P > 0.5, como o `predict` dos classificadores binários do sklearn).
+
+O store é gravado em `data/processed/predictions.parquet` (formato longo: um
+voo por linha e modelo) para o `05_model_report.py` e análises posteriores
+reaproveitarem as previsões sem recarregar os .pkl:
+
+    MODEL    nome do modelo (category)
+    SPLIT    train / val / test (category)
+    ROW      linha em X_<split> (int32) — junta com split_assignment.parquet
+    Y_TRUE   IS_DELAYED (int8)
+    PROBA    P(atraso) (float64)
+
+Uso:
+    from prediction_store import PREDICTIONS_FILE, PredictionStore
+    store = PredictionStore({"test": y_test})
+    store.score("Random Forest", rf, X_test, "test")
+    store.proba("Random Forest", "test"); store.save(PREDICTIONS_FILE)
+    PredictionStore.load(PREDICTIONS_FILE, splits=["test"])
+"""
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+PREDICTIONS_FILE = Path("./data/processed/predictions.parquet")
+
+
+class PredictionStore:
+    """Cache de P(atraso) por (modelo, split), com os rótulos de cada split."""
+
+    def __init__(self, targets: dict = None):
+        self.targets = {split: np.asarray(y) for split, y in (targets or {}).items()}
+        self.probas = {}           # (modelo, split) → np.ndarray[float64]
+
+    @property
+    def models(self) -> list:
+        return list(dict.fromkeys(name for name, _ in self.probas))
+
+    def score(self, name: str, model, X, split: str) -> np.ndarray:
+        """P(atraso) de `model` em `X`; só chama `predict_proba` na 1ª vez."""
+        key = (name, split)
+        if key not in self.probas:
+            self.probas[key] = np.asarray(model.predict_proba(X)[:, 1], dtype=np.float64)
+        return self.probas[key]
+
+    def proba(self, name: str, split: str) -> np.ndarray:
+        return self.probas[(name, split)]
+
+    def predict(self, name: str, split: str) -> np.ndarray:
+        """Classe prevista: 1 se P > 0.5 (empate fica com a classe 0, como no sklearn)."""
+        return (self.proba(name, split) > 0.5).astype(np.int8)
+
+    def y(self, split: str) -> np.ndarray:
+        return self.targets[split]
+
+    # ── Persistência ───────────────────────────────────────────────────────────
+    def to_frame(self) -> pd.DataFrame:
+        names = self.models
+        splits = list(dict.fromkeys(split for _, split in self.probas))
+        frames = []
+        for (name, split), proba in self.probas.items():
+            n = len(proba)
+            frames.append(pd.DataFrame({
+                "MODEL": pd.Categorical.from_codes(np.full(n, names.index(name), dtype=np.int8), names),
+                "SPLIT": pd.Categorical.from_codes(np.full(n, splits.index(split), dtype=np.int8), splits),
+                "ROW": np.arange(n, dtype=np.int32),
+                "Y_TRUE": self.targets[split].astype(np.int8),
+                "PROBA": proba,
+            }))
+        return pd.concat(frames, ignore_index=True)
+
+    def save(self, path: Path = PREDICTIONS_FILE) -> Path:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.to_frame().to_parquet(path, index=False, compression="zstd")
+        return path
+
+    @classmethod
+    def load(cls, path: Path = PREDICTIONS_FILE, models: list = None,
+             splits: list = None) -> "PredictionStore":
+        """Lê o store gravado (opcionalmente só alguns modelos / splits)."""
+        filters = []
+        if models is not None:
+            filters.append(("MODEL", "in", list(models)))
+        if splits is not None:
+            filters.append(("SPLIT", "in", list(splits)))
+        df = pd.read_parquet(path, filters=filters or None)
+
+        store = cls()
+        for (name, split), group in df.groupby(["MODEL", "SPLIT"], observed=True, sort=False):
+            group = group.sort_values("ROW")
+            store.probas[(str(name), str(split))] = group["PROBA"].to_numpy()
+            store.targets.setdefault(str(split), group["Y_TRUE"].to_numpy())
+        return store
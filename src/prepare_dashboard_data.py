@@ -1,6 +1,6 @@
 """
 Prepara dados agregados em JSON para o dashboard frontend.
-Lê o CSV processado e gera arquivos JSON compactos.
+Lê o cache Parquet do CSV processado e gera arquivos JSON compactos.
 """
 
 import pandas as pd
@@ -8,13 +8,16 @@ import numpy as np
 import json
 from pathlib import Path
 
+from derived_features import delay_category, departure_period
+from flights_io import load_stage
+
 DATA_PATH = Path('./data')
 PROCESSED_PATH = DATA_PATH / 'processed'
 DASHBOARD_PATH = PROCESSED_PATH / 'dashboard'
 DASHBOARD_PATH.mkdir(parents=True, exist_ok=True)
 
-print("Carregando flights_sample_processed.csv...")
-df = pd.read_csv(PROCESSED_PATH / 'flights_sample_processed.csv')
+print("Carregando flights_sample_processed (cache Parquet)...")
+df = load_stage('dashboard')
 print(f"✓ Carregado: {df.shape}")
 
 # Carregar datasets auxiliares
@@ -36,7 +39,8 @@ kpis = {
     "cancellation_rate": round(float(df['CANCELLED'].mean() * 100), 2),
     "diversion_rate": round(float(df['DIVERTED'].mean() * 100), 2),
     "total_airlines": int(df['AIRLINE'].nunique()),
-    "total_airports": int(pd.concat([df['ORIGIN_AIRPORT'], df['DESTINATION_AIRPORT']]).nunique()),
+    "total_airports": int(len(pd.Index(df['ORIGIN_AIRPORT'].dropna().unique())
+                              .union(pd.Index(df['DESTINATION_AIRPORT'].dropna().unique())))),
     "avg_distance": round(float(df['DISTANCE'].mean()), 0),
     "median_delay": round(float(df.loc[df['ARRIVAL_DELAY'] > 0, 'ARRIVAL_DELAY'].median()), 1),
 }
@@ -74,21 +78,15 @@ delay_distribution = {
 
 # Categorias de atraso
 if 'DELAY_CATEGORY' in df.columns:
-    cat_counts = df['DELAY_CATEGORY'].value_counts()
+    cat_counts = df['DELAY_CATEGORY'].astype(str).value_counts()
     delay_distribution["categories"] = {
         "labels": cat_counts.index.tolist(),
         "values": [int(v) for v in cat_counts.values],
     }
 else:
-    def categorize_delay(delay):
-        if pd.isna(delay): return 'Unknown'
-        elif delay <= 0: return 'On Time'
-        elif delay <= 15: return 'Minor Delay'
-        elif delay <= 60: return 'Moderate Delay'
-        else: return 'Major Delay'
-    cats = df['ARRIVAL_DELAY'].apply(categorize_delay).value_counts()
+    cats = delay_category(df['ARRIVAL_DELAY']).value_counts()
     delay_distribution["categories"] = {
-        "labels": cats.index.tolist(),
+        "labels": cats.index.astype(str).tolist(),
         "values": [int(v) for v in cats.values],
     }
 
@@ -108,30 +106,24 @@ month_names = {
 dow_names = {1: 'Seg', 2: 'Ter', 3: 'Qua', 4: 'Qui', 5: 'Sex', 6: 'Sáb', 7: 'Dom'}
 
 monthly_delay = df.groupby('MONTH')['ARRIVAL_DELAY'].mean()
-monthly_rate = (df.groupby('MONTH')['ARRIVAL_DELAY'].apply(lambda x: (x > 0).mean()) * 100)
+is_late = df['ARRIVAL_DELAY'] > 0
+monthly_rate = is_late.groupby(df['MONTH']).mean() * 100
 monthly_count = df.groupby('MONTH').size()
 
 dow_delay = df.groupby('DAY_OF_WEEK')['ARRIVAL_DELAY'].mean()
-dow_rate = (df.groupby('DAY_OF_WEEK')['ARRIVAL_DELAY'].apply(lambda x: (x > 0).mean()) * 100)
+dow_rate = is_late.groupby(df['DAY_OF_WEEK']).mean() * 100
 dow_count = df.groupby('DAY_OF_WEEK').size()
 
 # Período do dia
 if 'DEPARTURE_PERIOD' in df.columns:
     period_col = 'DEPARTURE_PERIOD'
 else:
-    def get_time_period(hour):
-        if pd.isna(hour): return 'Unknown'
-        hour = int(hour / 100)
-        if 5 <= hour < 12: return 'Morning'
-        elif 12 <= hour < 17: return 'Afternoon'
-        elif 17 <= hour < 21: return 'Evening'
-        else: return 'Night'
-    df['DEPARTURE_PERIOD'] = df['SCHEDULED_DEPARTURE'].apply(get_time_period)
+    df['DEPARTURE_PERIOD'] = departure_period(df['SCHEDULED_DEPARTURE'])
     period_col = 'DEPARTURE_PERIOD'
 
-period_delay = df.groupby(period_col)['ARRIVAL_DELAY'].mean()
-period_rate = (df.groupby(period_col)['ARRIVAL_DELAY'].apply(lambda x: (x > 0).mean()) * 100)
-period_count = df.groupby(period_col).size()
+period_delay = df.groupby(period_col, observed=True)['ARRIVAL_DELAY'].mean()
+period_rate = is_late.groupby(df[period_col], observed=True).mean() * 100
+period_count = df.groupby(period_col, observed=True).size()
 
 temporal = {
     "monthly": {
@@ -147,7 +139,7 @@ temporal = {
         "flight_count": [int(dow_count[d]) for d in sorted(dow_count.index)],
     },
     "period": {
-        "labels": period_delay.sort_values().index.tolist(),
+        "labels": period_delay.sort_values().index.astype(str).tolist(),
         "avg_delay": [round(float(period_delay[p]), 2) for p in period_delay.sort_values().index],
         "delay_rate": [round(float(period_rate[p]), 2) for p in period_delay.sort_values().index],
         "flight_count": [int(period_count[p]) for p in period_delay.sort_values().index],
@@ -163,13 +155,15 @@ print("  ✓ dashboard_temporal.json")
 # ============================================================================
 print("Gerando análise de companhias aéreas...")
 
-airline_stats = df.groupby('AIRLINE').agg(
+airline_stats = df.assign(IS_LATE=is_late).groupby('AIRLINE', observed=True).agg(
     avg_delay=('ARRIVAL_DELAY', 'mean'),
-    delay_rate=('ARRIVAL_DELAY', lambda x: (x > 0).mean() * 100),
+    delay_rate=('IS_LATE', 'mean'),
     flight_count=('AIRLINE', 'size'),
     avg_distance=('DISTANCE', 'mean'),
     cancel_rate=('CANCELLED', 'mean'),
 ).reset_index()
+airline_stats['delay_rate'] *= 100
+airline_stats['AIRLINE'] = airline_stats['AIRLINE'].astype(str)
 
 airline_stats['airline_name'] = airline_stats['AIRLINE'].map(airline_names).fillna(airline_stats['AIRLINE'])
 
@@ -205,19 +199,28 @@ print("  ✓ dashboard_airlines.json")
 print("Gerando análise de aeroportos...")
 
 # Filtrar aeroportos IATA (3 letras)
-iata_mask_origin = df['ORIGIN_AIRPORT'].astype(str).str.match(r'^[A-Z]{3}$')
-iata_mask_dest = df['DESTINATION_AIRPORT'].astype(str).str.match(r'^[A-Z]{3}$')
+# (regex avaliado só no dicionário de categorias, não em cada linha)
+def _iata_mask(s):
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        valid = s.cat.categories.astype(str).str.match(r'^[A-Z]{3}$')
+        return s.isin(s.cat.categories[valid])
+    return s.astype(str).str.match(r'^[A-Z]{3}$')
+
+iata_mask_origin = _iata_mask(df['ORIGIN_AIRPORT'])
+iata_mask_dest = _iata_mask(df['DESTINATION_AIRPORT'])
 
-origin_stats = df[iata_mask_origin].groupby('ORIGIN_AIRPORT').agg(
+origin_stats = df[iata_mask_origin].groupby('ORIGIN_AIRPORT', observed=True).agg(
     avg_departure_delay=('DEPARTURE_DELAY', 'mean'),
     flight_count=('ORIGIN_AIRPORT', 'size'),
 ).reset_index()
+origin_stats['ORIGIN_AIRPORT'] = origin_stats['ORIGIN_AIRPORT'].astype(str)
 origin_stats['airport_name'] = origin_stats['ORIGIN_AIRPORT'].map(airport_names).fillna(origin_stats['ORIGIN_AIRPORT'])
 
-dest_stats = df[iata_mask_dest].groupby('DESTINATION_AIRPORT').agg(
+dest_stats = df[iata_mask_dest].groupby('DESTINATION_AIRPORT', observed=True).agg(
     avg_arrival_delay=('ARRIVAL_DELAY', 'mean'),
     flight_count=('DESTINATION_AIRPORT', 'size'),
 ).reset_index()
+dest_stats['DESTINATION_AIRPORT'] = dest_stats['DESTINATION_AIRPORT'].astype(str)
 dest_stats['airport_name'] = dest_stats['DESTINATION_AIRPORT'].map(airport_names).fillna(dest_stats['DESTINATION_AIRPORT'])
 
 top_origin = origin_stats.nlargest(10, 'avg_departure_delay')
@@ -285,7 +288,7 @@ cancel_rate = round(float(df['CANCELLED'].mean() * 100), 3)
 divert_rate = round(float(df['DIVERTED'].mean() * 100), 3)
 
 cancel_reasons_map = {'A': 'Airline/Carrier', 'B': 'Weather', 'C': 'NAS', 'D': 'Security'}
-cancel_reasons = df['CANCELLATION_REASON'].dropna().map(cancel_reasons_map).value_counts()
+cancel_reasons = df['CANCELLATION_REASON'].dropna().astype(str).map(cancel_reasons_map).value_counts()
 
 # Cancelamentos por mês
 monthly_cancel = (df.groupby('MONTH')['CANCELLED'].mean() * 100)
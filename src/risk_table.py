@@ -0,0 +1,233 @@
+"""
+Tabela de Risco — P(IS_DELAYED) pré-calculada para as combinações que existem na grade
+
+Etapa posterior ao `03_supervised_classification.py`: enumera as combinações
+companhia × origem × destino × mês × dia da semana × hora de partida que
+ocorrem nos voos processados, monta um voo representativo por combinação
+(medianas de horário de partida/chegada, distância e duração) e pontua todas
+em lote com o modelo escolhido (default: o melhor de ml_model_comparison.json).
+
+Cada combinação vira uma chave int64 de base mista
+
+    ((((companhia·A + origem)·A + destino)·13 + mês)·8 + dia_semana)·24 + hora
+
+(A = nº de aeroportos do vocabulário) e a tabela é gravada ordenada por chave:
+
+    models/risk_table/keys.npy      int64, ordenado
+    models/risk_table/proba.npy     float32, P(atraso) da combinação
+    models/risk_table/flights.npy   int32, voos observados na combinação
+    models/risk_table/meta.json     vocabulários, modelo e data de geração
+
+`RiskTable.load` abre os arrays por memory-map; a consulta é uma busca
+binária (`searchsorted`) — sem modelo, transformer nem sklearn no caminho.
+
+Uso:
+    python src/risk_table.py                          # melhor modelo do 03
+    python src/risk_table.py --model random_forest --engine numpy
+
+    from risk_table import RiskTable
+    table = RiskTable.load()
+    table.lookup("AA", "ATL", "LAX", month=1, day_of_week=4, hour=13)   # (P, voos) ou None
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+RISK_DIR   = Path("./models/risk_table")
+KEY_COLS   = ["AIRLINE", "ORIGIN_AIRPORT", "DESTINATION_AIRPORT", "MONTH", "DAY_OF_WEEK", "HOUR"]
+REP_COLS   = ["SCHEDULED_DEPARTURE", "SCHEDULED_ARRIVAL", "DISTANCE", "SCHEDULED_TIME"]
+N_MONTHS, N_DAYS, N_HOURS = 13, 8, 24   # MONTH 1–12, DAY_OF_WEEK 1–7, hora 0–23
+
+
+def departure_hour(scheduled_departure) -> np.ndarray:
+    """Hora (0–23) de SCHEDULED_DEPARTURE em HHMM (2400 → 23)."""
+    return np.clip(np.asarray(scheduled_departure, dtype=np.int64) // 100, 0, N_HOURS - 1)
+
+
+def _codes(values, vocab: np.ndarray) -> np.ndarray:
+    """Posição de cada valor no vocabulário ordenado (−1 = fora do vocabulário)."""
+    values = np.asarray(values, dtype=object).astype(str)
+    pos = np.minimum(np.searchsorted(vocab, values), max(len(vocab) - 1, 0))
+    return np.where((len(vocab) > 0) & (vocab[pos] == values), pos, -1)
+
+
+class RiskTable:
+    """Tabela chave → (P(atraso), voos) ordenada, consultada por busca binária."""
+
+    def __init__(self, keys: np.ndarray, proba: np.ndarray, flights: np.ndarray, meta: dict):
+        self.keys = keys
+        self.proba = proba
+        self.flights = flights
+        self.meta = meta
+        self.airlines = np.array(meta["airlines"])
+        self.airports = np.array(meta["airports"])
+        self._airline_idx = {a: i for i, a in enumerate(meta["airlines"])}
+        self._airport_idx = {a: i for i, a in enumerate(meta["airports"])}
+
+    # ── Chaves ─────────────────────────────────────────────────────────────────
+    def encode(self, airline, origin, destination, month, day_of_week, hour) -> np.ndarray:
+        """Chaves int64 vetorizadas (−1 onde algum componente é desconhecido)."""
+        a = _codes(airline, self.airlines)
+        o = _codes(origin, self.airports)
+        d = _codes(destination, self.airports)
+        month, dow, hour = (np.asarray(v, dtype=np.int64) for v in (month, day_of_week, hour))
+        n_airports = len(self.airports)
+        key = ((((a * n_airports + o) * n_airports + d) * N_MONTHS + month) * N_DAYS + dow) * N_HOURS + hour
+        valid = ((a >= 0) & (o >= 0) & (d >= 0) & (month >= 1) & (month < N_MONTHS)
+                 & (dow >= 1) & (dow < N_DAYS) & (hour >= 0) & (hour < N_HOURS))
+        return np.where(valid, key, -1)
+
+    def _key(self, airline: str, origin: str, destination: str, month: int,
+             day_of_week: int, hour: int) -> int:
+        """Chave de uma combinação em Python puro (caminho de baixa latência)."""
+        a = self._airline_idx.get(airline)
+        o = self._airport_idx.get(origin)
+        d = self._airport_idx.get(destination)
+        if a is None or o is None or d is None or not (1 <= month < N_MONTHS and 1 <= day_of_week < N_DAYS
+                                                       and 0 <= hour < N_HOURS):
+            return -1
+        n_airports = len(self.airports)
+        return ((((a * n_airports + o) * n_airports + d) * N_MONTHS + month) * N_DAYS
+                + day_of_week) * N_HOURS + hour
+
+    # ── Consulta ───────────────────────────────────────────────────────────────
+    def lookup(self, airline: str, origin: str, destination: str, month: int,
+               day_of_week: int, hour: int):
+        """(P(atraso), voos observados) da combinação, ou None se não está na tabela."""
+        key = self._key(airline, origin, destination, int(month), int(day_of_week), int(hour))
+        if key < 0:
+            return None
+        i = int(self.keys.searchsorted(key))
+        if i == len(self.keys) or self.keys[i] != key:
+            return None
+        return float(self.proba[i]), int(self.flights[i])
+
+    def lookup_frame(self, df) -> np.ndarray:
+        """P(atraso) para cada voo de `df` (HOUR ou SCHEDULED_DEPARTURE); NaN se ausente."""
+        hour = df["HOUR"] if "HOUR" in df.columns else departure_hour(df["SCHEDULED_DEPARTURE"])
+        keys = self.encode(df["AIRLINE"], df["ORIGIN_AIRPORT"], df["DESTINATION_AIRPORT"],
+                           df["MONTH"], df["DAY_OF_WEEK"], hour)
+        pos = np.minimum(self.keys.searchsorted(keys), max(len(self.keys) - 1, 0))
+        found = (keys >= 0) & (len(self.keys) > 0) & (np.asarray(self.keys[pos]) == keys)
+        return np.where(found, np.asarray(self.proba[pos], dtype=np.float64), np.nan)
+
+    # ── Persistência ───────────────────────────────────────────────────────────
+    def save(self, path: Path = RISK_DIR) -> Path:
+        path.mkdir(parents=True, exist_ok=True)
+        np.save(path / "keys.npy", np.asarray(self.keys, dtype=np.int64))
+        np.save(path / "proba.npy", np.asarray(self.proba, dtype=np.float32))
+        np.save(path / "flights.npy", np.asarray(self.flights, dtype=np.int32))
+        (path / "meta.json").write_text(json.dumps(self.meta, indent=2, ensure_ascii=False))
+        return path
+
+    @classmethod
+    def load(cls, path: Path = RISK_DIR, mmap: bool = True) -> "RiskTable":
+        mode = "r" if mmap else None
+        return cls(np.load(path / "keys.npy", mmap_mode=mode),
+                   np.load(path / "proba.npy", mmap_mode=mode),
+                   np.load(path / "flights.npy", mmap_mode=mode),
+                   json.loads((path / "meta.json").read_text()))
+
+
+# ==============================================================================
+# Construção
+# ==============================================================================
+def representative_flights(flights):
+    """Um voo por combinação de KEY_COLS: medianas de REP_COLS e nº de voos."""
+    import pandas as pd
+
+    df = pd.DataFrame({
+        "AIRLINE": flights["AIRLINE"].astype(str).to_numpy(),
+        "ORIGIN_AIRPORT": flights["ORIGIN_AIRPORT"].astype(str).to_numpy(),
+        "DESTINATION_AIRPORT": flights["DESTINATION_AIRPORT"].astype(str).to_numpy(),
+        "MONTH": flights["MONTH"].to_numpy(dtype=np.int64),
+        "DAY_OF_WEEK": flights["DAY_OF_WEEK"].to_numpy(dtype=np.int64),
+        "HOUR": departure_hour(flights["SCHEDULED_DEPARTURE"]),
+        **{c: flights[c].to_numpy(dtype=np.float64) for c in REP_COLS},
+    })
+    grouped = df.groupby(KEY_COLS, sort=False)
+    reps = grouped[REP_COLS].median()
+    reps["FLIGHTS"] = grouped.size()
+    return reps.reset_index()
+
+
+def build_risk_table(flights, model, transformer, meta: dict) -> RiskTable:
+    """Pontua os voos representativos de `flights` e devolve a tabela ordenada."""
+    from flights_io import STREAM_BATCH_ROWS
+    from score_batch import model_input
+
+    reps = representative_flights(flights)
+    airlines = np.sort(reps["AIRLINE"].unique())
+    airports = np.sort(np.union1d(reps["ORIGIN_AIRPORT"].unique(), reps["DESTINATION_AIRPORT"].unique()))
+    table = RiskTable(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32),
+                      np.empty(0, dtype=np.int32),
+                      dict(meta, airlines=airlines.tolist(), airports=airports.tolist()))
+    keys = table.encode(*(reps[c] for c in KEY_COLS))
+
+    proba = np.concatenate([
+        model.predict_proba(model_input(model, transformer, reps.iloc[i:i + STREAM_BATCH_ROWS]))[:, 1]
+        for i in range(0, len(reps), STREAM_BATCH_ROWS)
+    ]).astype(np.float32)
+
+    order = np.argsort(keys, kind="stable")
+    table.keys = keys[order]
+    table.proba = proba[order]
+    table.flights = reps["FLIGHTS"].to_numpy(dtype=np.int32)[order]
+    table.meta["n_keys"] = int(len(order))
+    return table
+
+
+def best_model_name(dash_dir: Path = Path("./data/processed/dashboard")) -> str:
+    """Nome do .pkl do melhor modelo segundo ml_model_comparison.json."""
+    with open(dash_dir / "ml_model_comparison.json") as f:
+        return json.load(f)["best_model"].lower().replace(" ", "_")
+
+
+def main():
+    from flights_io import load_processed_flights
+    from score_batch import MODEL_DIR, load_model, load_transformer
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--model", default=None,
+                        help="nome do .pkl em --model-dir (default: melhor modelo do 03)")
+    parser.add_argument("--model-dir", type=Path, default=MODEL_DIR)
+    parser.add_argument("--engine", choices=["sklearn", "numpy"], default="sklearn")
+    parser.add_argument("--out", type=Path, default=RISK_DIR)
+    args = parser.parse_args()
+
+    model_name = args.model or best_model_name()
+    print("=" * 80)
+    print(f"TABELA DE RISCO — {model_name} ({args.engine})")
+    print("=" * 80)
+
+    t0 = time.time()
+    flights = load_processed_flights(columns=KEY_COLS[:-1] + REP_COLS)
+    transformer = load_transformer(args.model_dir)
+    model = load_model(args.model_dir, model_name, args.engine)
+    meta = {"model": model_name, "engine": args.engine,
+            "transformer_fingerprint": transformer.fingerprint(),
+            "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "source_flights": int(len(flights))}
+    table = build_risk_table(flights, model, transformer, meta)
+    table.save(args.out)
+    size_kb = sum(f.stat().st_size for f in args.out.iterdir()) / 1024
+    print(f"✓ {len(table.keys):,} combinações de {len(flights):,} voos em {time.time() - t0:.1f}s "
+          f"→ {args.out} ({size_kb:,.0f} KB)")
+
+    # Latência da consulta individual sobre a tabela em memory-map
+    table = RiskTable.load(args.out)
+    combos = representative_flights(flights).set_index(KEY_COLS).index
+    queries = [combos[i] for i in np.random.default_rng(42).integers(0, len(combos), size=10_000)]
+    t0 = time.perf_counter()
+    hits = sum(table.lookup(*q) is not None for q in queries)
+    elapsed = time.perf_counter() - t0
+    print(f"  Consulta: {elapsed / max(len(queries), 1) * 1e6:.1f} µs/voo "
+          f"({hits:,}/{len(queries):,} encontrados)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""
+Scoring em Lote — P(IS_DELAYED) de novas grades de voos com os modelos treinados
+
+Lê a grade (CSV no schema de flights.csv, Parquet ou dataset particionado) em
+blocos, aplica o FeatureTransformer salvo pelo 02 (encoders.json / sidecar +
+scaler) e pontua com o modelo escolhido em um pool de processos — cada worker
+carrega transformer e modelo uma única vez, com 1 thread (o paralelismo é
+entre blocos). As probabilidades são gravadas em Parquet à medida que os
+blocos terminam, na ordem de entrada:
+
+    ROW_ID            posição do voo no arquivo de entrada (int64, estável)
+    <chave do voo>    YEAR, MONTH, DAY, AIRLINE, FLIGHT_NUMBER, ORIGIN_AIRPORT
+                      (as que existirem na entrada)
+    IS_DELAYED_PROBA  P(atraso > 15 min) (float32)
+    IS_DELAYED_PRED   1 se P ≥ --threshold (int8)
+
+Input : grade de voos (colunas do FeatureTransformer: MONTH, DAY_OF_WEEK,
+        SCHEDULED_DEPARTURE, SCHEDULED_ARRIVAL, DISTANCE, SCHEDULED_TIME,
+        AIRLINE, ORIGIN_AIRPORT, DESTINATION_AIRPORT)
+Output: Parquet com as probabilidades (default data/processed/scores.parquet)
+
+Uso:
+    python src/score_batch.py data/schedule_2016_01.csv
+    python src/score_batch.py data/schedule.parquet --model random_forest --workers 4
+    python src/score_batch.py data/schedule_2016_01.csv --engine numpy   # models/compiled/
+"""
+import argparse
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from feature_store import RowGroupWriter
+from feature_transformer import FeatureTransformer, check_models_manifest
+from flights_io import (SPLIT_KEY, STREAM_BATCH_ROWS, batch_to_frame, iter_flights_batches,
+                        iter_flights_dataset)
+from numpy_inference import COMPILED_DIR, PROBE_TOL, CompiledModel, sklearn_version
+
+MODEL_DIR = Path("./models")
+OUT_FILE  = Path("./data/processed/scores.parquet")
+DEFAULT_MODEL = "gradient_boosting"
+
+
+# ==============================================================================
+# Entrada do modelo
+# ==============================================================================
+def model_input(model, transformer: FeatureTransformer, flights: pd.DataFrame) -> pd.DataFrame:
+    """Matriz que `model` recebeu no treino, a partir de voos brutos."""
+    X = transformer.transform_frame(flights).astype(np.float32)
+    if type(model).__name__ == "NativeCategoryBoosting" or getattr(model, "native", False):
+        # native_frame sem importar o sklearn: numéricas + códigos das categorias
+        return pd.concat([X[transformer.num_cols].reset_index(drop=True),
+                          transformer.category_codes(flights).reset_index(drop=True)], axis=1)
+    return X
+
+
+def load_model(model_dir: Path, model_name: str, engine: str = "sklearn"):
+    """Modelo do 03: .pkl (engine "sklearn") ou arrays compilados (engine "numpy").
+
+    Um compilado gerado com outra versão do sklearn só é aceito se ainda
+    reproduzir o .pkl no lote de prova (ValueError caso contrário); sem
+    sklearn instalado vale a conferência feita na exportação.
+    """
+    if engine == "numpy":
+        path = model_dir / COMPILED_DIR.name / model_name
+        compiled = CompiledModel.load(path)
+        installed = sklearn_version()
+        if installed is not None and compiled.meta.get("sklearn_version") != installed:
+            diff = compiled.probe_diff(joblib.load(model_dir / f"{model_name}.pkl"), path)
+            if diff > PROBE_TOL:
+                raise ValueError(
+                    f"{path} foi compilado com scikit-learn {compiled.meta.get('sklearn_version')} "
+                    f"e diverge do .pkl no {installed} (máx |ΔP| = {diff:.1e}) — execute novamente "
+                    f"o 03_supervised_classification.py"
+                )
+        return compiled
+    return joblib.load(model_dir / f"{model_name}.pkl")
+
+
+def load_transformer(model_dir: Path) -> FeatureTransformer:
+    """FeatureTransformer de `model_dir`, conferido contra o models_manifest.json
+    (ValueError se os modelos foram treinados com outro transformer)."""
+    transformer = FeatureTransformer.load(model_dir)
+    check_models_manifest(model_dir, transformer)
+    return transformer
+
+
+def required_columns(transformer: FeatureTransformer) -> list:
+    return list(dict.fromkeys(transformer.num_cols + transformer.te_cols + ["SCHEDULED_DEPARTURE"]))
+
+
+def iter_schedule(path: Path, batch_rows: int = STREAM_BATCH_ROWS):
+    """Blocos da grade: CSV pelo leitor em blocos do Arrow, Parquet por row group/lote."""
+    if path.suffix == ".csv":
+        for batch in iter_flights_batches(path):
+            yield batch_to_frame(batch)
+    elif path.is_dir():
+        yield from iter_flights_dataset(path, batch_rows=batch_rows)
+    else:
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_rows):
+            yield batch.to_pandas()
+
+
+# ==============================================================================
+# Workers
+# ==============================================================================
+_WORKER = {}
+
+
+def init_scorer(model_dir: str, model_name: str, threads: int, engine: str = "sklearn"):
+    """Carrega transformer e modelo no processo atual (initializer do pool)."""
+    from threadpoolctl import threadpool_limits
+
+    _WORKER["transformer"] = FeatureTransformer.load(Path(model_dir))
+    model = load_model(Path(model_dir), model_name, engine)
+    if hasattr(model, "get_params") and "n_jobs" in model.get_params():
+        model.set_params(n_jobs=threads)
+    _WORKER["model"] = model
+    _WORKER["limits"] = threadpool_limits(limits=threads)
+
+
+def score_chunk(flights: pd.DataFrame) -> np.ndarray:
+    """P(IS_DELAYED) de um bloco de voos brutos com o modelo de `init_scorer`."""
+    model, transformer = _WORKER["model"], _WORKER["transformer"]
+    return model.predict_proba(model_input(model, transformer, flights))[:, 1].astype(np.float32)
+
+
+def _output_table(flights: pd.DataFrame, row_start: int, proba: np.ndarray, threshold: float):
+    import pyarrow as pa
+
+    out = flights[[c for c in SPLIT_KEY if c in flights.columns]].reset_index(drop=True)
+    out.insert(0, "ROW_ID", np.arange(row_start, row_start + len(flights), dtype=np.int64))
+    out["IS_DELAYED_PROBA"] = proba
+    out["IS_DELAYED_PRED"] = (proba >= threshold).astype(np.int8)
+    return pa.Table.from_pandas(out, preserve_index=False)
+
+
+def score_file(path: Path, out: Path = OUT_FILE, model_dir: Path = MODEL_DIR,
+               model_name: str = DEFAULT_MODEL, workers: int = None,
+               batch_rows: int = STREAM_BATCH_ROWS, threshold: float = 0.5,
+               engine: str = "sklearn") -> int:
+    """Pontua `path` bloco a bloco e grava `out`; retorna o nº de voos pontuados.
+
+    Com `workers=0` pontua no próprio processo. No pool, no máximo 2 blocos por
+    worker ficam em voo — a memória não cresce com o tamanho da grade.
+    """
+    transformer = load_transformer(model_dir)
+    required = required_columns(transformer)
+    workers = os.cpu_count() or 1 if workers is None else workers
+    init_args = (str(model_dir), model_name, 1 if workers else (os.cpu_count() or 1), engine)
+
+    out.parent.mkdir(parents=True, exist_ok=True)
+    writer = RowGroupWriter(out)
+    n_rows = 0
+    pending = deque()
+
+    def write_done(flights, row_start, proba):
+        writer.write(_output_table(flights, row_start, proba, threshold))
+
+    def chunks():
+        nonlocal n_rows
+        for flights in iter_schedule(path, batch_rows):
+            missing = [c for c in required if c not in flights.columns]
+            if missing:
+                raise ValueError(f"Colunas ausentes na grade {path}: {missing}")
+            yield flights, n_rows
+            n_rows += len(flights)
+
+    if not workers:
+        init_scorer(*init_args)
+        for flights, row_start in chunks():
+            write_done(flights, row_start, score_chunk(flights))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_scorer,
+                                 initargs=init_args) as pool:
+            for flights, row_start in chunks():
+                pending.append((flights, row_start, pool.submit(score_chunk, flights)))
+                while len(pending) >= 2 * workers:
+                    flights_done, start_done, fut = pending.popleft()
+                    write_done(flights_done, start_done, fut.result())
+            while pending:
+                flights_done, start_done, fut = pending.popleft()
+                write_done(flights_done, start_done, fut.result())
+    writer.close()
+    return n_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("schedule", type=Path, help="grade de voos (CSV, Parquet ou dataset)")
+    parser.add_argument("--out", type=Path, default=OUT_FILE)
+    parser.add_argument("--model", default=DEFAULT_MODEL,
+                        help="nome do .pkl em --model-dir (ex.: random_forest)")
+    parser.add_argument("--model-dir", type=Path, default=MODEL_DIR)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="processos de scoring (default: nº de núcleos; 0 = no processo)")
+    parser.add_argument("--batch-rows", type=int, default=STREAM_BATCH_ROWS)
+    parser.add_argument("--engine", choices=["sklearn", "numpy"], default="sklearn",
+                        help="numpy = modelo compilado em models/compiled/ (sem scikit-learn)")
+    parser.add_argument("--threshold", type=float, default=0.5,
+                        help="limiar de IS_DELAYED_PRED (ex.: optimal_threshold do 03)")
+    args = parser.parse_args()
+
+    t0 = time.time()
+    n = score_file(args.schedule, args.out, args.model_dir, args.model, args.workers,
+                   args.batch_rows, args.threshold, args.engine)
+    elapsed = time.time() - t0
+    print(f"✓ {n:,} voos pontuados com {args.model} → {args.out}")
+    print(f"  {elapsed:.1f}s  ({n / max(elapsed, 1e-9):,.0f} voos/s)")
+
+
+if __name__ == "__main__":
+    main()
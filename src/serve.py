@@ -0,0 +1,421 @@
+"""
+Serviço de Predição — P(IS_DELAYED) sob demanda via HTTP local, com micro-batching
+
+Servidor HTTP/1.1 mínimo em asyncio (só biblioteca padrão, keep-alive) sobre
+o FeatureTransformer e o modelo salvos em models/. Transformer, tabelas de
+target encoding e modelo são carregados uma vez na subida — em cada worker do
+pool, ou no próprio processo com `--workers 0`.
+
+Requisições concorrentes entram em uma fila; o coletor junta até
+`--max-batch` voos ou espera no máximo `--max-wait-ms` após o primeiro, e
+envia o lote inteiro ao pool — o estimador roda vetorizado, e até `workers`
+lotes são pontuados ao mesmo tempo. Cada voo é validado e convertido antes de
+entrar na fila (400 para o voo inválido); se o lote ainda assim falhar, suas
+requisições são pontuadas uma a uma, e só a que falhar recebe o erro.
+
+Endpoints:
+    POST /predict   um voo (objeto JSON) ou lista de voos, com as colunas do
+                    FeatureTransformer (MONTH, DAY_OF_WEEK, SCHEDULED_DEPARTURE,
+                    SCHEDULED_ARRIVAL, DISTANCE, SCHEDULED_TIME, AIRLINE,
+                    ORIGIN_AIRPORT, DESTINATION_AIRPORT)
+                    → {"IS_DELAYED_PROBA": 0.41, "IS_DELAYED_PRED": 0} (ou lista)
+    GET  /stats     latência p50/p99 (ms), requisições/s, lotes e tamanho médio
+    GET  /risk      consulta à tabela de risco pré-calculada (risk_table.py), sem
+                    modelo: ?AIRLINE=AA&ORIGIN_AIRPORT=ATL&DESTINATION_AIRPORT=LAX
+                    &MONTH=1&DAY_OF_WEEK=4&HOUR=13 → {"IS_DELAYED_PROBA", "FLIGHTS"}
+    GET  /best-time grade mês × dia × hora de P(atraso) de uma rota (best_time.py),
+                    pontuada em uma única chamada: ?AIRLINE=AA&ORIGIN_AIRPORT=ATL
+                    &DESTINATION_AIRPORT=LAX[&DISTANCE=..&SCHEDULED_TIME=..]
+    GET  /health    modelo carregado
+
+Uso:
+    python src/serve.py                               # 127.0.0.1:8000, gradient_boosting
+    python src/serve.py --model random_forest --workers 4 --port 8080
+    python src/serve.py --engine numpy                # models/compiled/, sem scikit-learn
+    python src/serve.py --bench 20000 --concurrency 256 --port 8000   # carga contra um servidor no ar
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import parse_qs
+
+import numpy as np
+import pandas as pd
+
+from best_time import GRID_DAYS, GRID_HOURS, GRID_MONTHS, ROUTES_FILE, route_grid, summarize
+from risk_table import KEY_COLS, RISK_DIR, RiskTable
+from score_batch import (DEFAULT_MODEL, MODEL_DIR, init_scorer, load_transformer, required_columns,
+                         score_chunk)
+
+MAX_BATCH      = 512
+MAX_WAIT_MS    = 2.0
+LATENCY_WINDOW = 20_000   # últimas requisições usadas no p50/p99
+
+
+# ==============================================================================
+# Micro-batching
+# ==============================================================================
+class MicroBatcher:
+    """Fila de voos → lotes de até `max_batch`, pontuados no `pool`."""
+
+    def __init__(self, pool, workers: int, max_batch: int = MAX_BATCH,
+                 max_wait_ms: float = MAX_WAIT_MS):
+        self.pool = pool
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.queue = asyncio.Queue()
+        self.slots = asyncio.Semaphore(max(workers, 1))
+        self.batches = 0
+        self.flights = 0
+
+    async def score(self, records: list) -> np.ndarray:
+        fut = asyncio.get_running_loop().create_future()
+        await self.queue.put((records, fut))
+        return await fut
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            items = [await self.queue.get()]
+            size = len(items[0][0])
+            deadline = loop.time() + self.max_wait
+            while size < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0 and self.queue.empty():
+                    break
+                try:
+                    item = self.queue.get_nowait() if not self.queue.empty() else \
+                        await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                items.append(item)
+                size += len(item[0])
+            await self.slots.acquire()
+            loop.create_task(self._dispatch(items))
+
+    async def _score(self, items: list) -> list:
+        """Uma chamada ao pool para o lote; devolve as probabilidades por requisição."""
+        flights = pd.DataFrame.from_records([r for records, _ in items for r in records])
+        proba = await asyncio.get_running_loop().run_in_executor(self.pool, score_chunk, flights)
+        self.batches += 1
+        self.flights += len(proba)
+        bounds = np.cumsum([0] + [len(records) for records, _ in items])
+        return [proba[a:b] for a, b in zip(bounds[:-1], bounds[1:])]
+
+    async def _dispatch(self, items: list):
+        try:
+            try:
+                results = await self._score(items)
+            except Exception as exc:
+                # Um voo que passou pela validação e ainda quebra o modelo não
+                # derruba o lote: cada requisição é pontuada sozinha
+                if len(items) == 1:
+                    results = [exc]
+                else:
+                    results = []
+                    for item in items:
+                        try:
+                            results += await self._score([item])
+                        except Exception as item_exc:
+                            results.append(item_exc)
+        finally:
+            self.slots.release()
+        for (_, fut), result in zip(items, results):
+            if fut.done():
+                continue
+            if isinstance(result, Exception):
+                fut.set_exception(result)
+            else:
+                fut.set_result(result)
+
+
+def coerce_record(record, numeric: list, categorical: list) -> dict:
+    """Voo de POST /predict nos tipos do FeatureTransformer: numéricas → float
+    (nulo → NaN), categóricas → str (nulo → None). ValueError se inválido."""
+    if not isinstance(record, dict):
+        raise ValueError(f"voo deve ser um objeto JSON, recebido {type(record).__name__}")
+    missing = [c for c in numeric + categorical if c not in record]
+    if missing:
+        raise ValueError(f"Colunas ausentes: {missing}")
+    out = {}
+    for col in numeric:
+        value = record[col]
+        if value is None:
+            out[col] = np.nan
+            continue
+        if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+            raise ValueError(f"{col}: número esperado, recebido {value!r}")
+        try:
+            out[col] = float(value)
+        except ValueError:
+            raise ValueError(f"{col}: número esperado, recebido {value!r}") from None
+    for col in categorical:
+        value = record[col]
+        if value is not None and (isinstance(value, bool) or not isinstance(value, (str, int))):
+            raise ValueError(f"{col}: texto esperado, recebido {value!r}")
+        out[col] = None if value is None else str(value)
+    return out
+
+
+# ==============================================================================
+# HTTP
+# ==============================================================================
+class ScoringService:
+    def __init__(self, batcher: MicroBatcher, required: list, categorical: list, model_name: str,
+                 threshold: float, risk_table: RiskTable = None, profiles: pd.DataFrame = None):
+        self.batcher = batcher
+        self.risk_table = risk_table
+        self.profiles = profiles
+        self.categorical = [c for c in required if c in categorical]
+        self.numeric = [c for c in required if c not in categorical]
+        self.model_name = model_name
+        self.threshold = threshold
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.requests = 0
+        self.started = time.perf_counter()
+
+    def stats(self) -> dict:
+        lat = np.array(self.latencies) * 1000
+        elapsed = time.perf_counter() - self.started
+        p50, p99 = np.percentile(lat, [50, 99]).round(3).tolist() if len(lat) else (None, None)
+        return {
+            "model": self.model_name,
+            "requests": self.requests,
+            "requests_per_s": round(self.requests / elapsed, 1),
+            "latency_ms": {"p50": p50, "p99": p99, "window": len(lat)},
+            "batches": self.batcher.batches,
+            "mean_batch_size": round(self.batcher.flights / max(self.batcher.batches, 1), 1),
+        }
+
+    async def predict(self, body: bytes) -> tuple:
+        payload = json.loads(body)
+        records = payload if isinstance(payload, list) else [payload]
+        if not records:
+            return 400, {"error": "Nenhum voo"}
+        try:
+            records = [coerce_record(r, self.numeric, self.categorical) for r in records]
+        except ValueError as exc:
+            return 400, {"error": str(exc)}
+        proba = await self.batcher.score(records)
+        out = [{"IS_DELAYED_PROBA": round(float(p), 6), "IS_DELAYED_PRED": int(p >= self.threshold)}
+               for p in proba]
+        return 200, out if isinstance(payload, list) else out[0]
+
+    def risk(self, query: str) -> tuple:
+        if self.risk_table is None:
+            return 404, {"error": "Tabela de risco não carregada (rode src/risk_table.py)"}
+        params = {k: v[0] for k, v in parse_qs(query).items()}
+        missing = [c for c in KEY_COLS if c not in params]
+        if missing:
+            return 400, {"error": f"Parâmetros ausentes: {missing}"}
+        try:
+            found = self.risk_table.lookup(*(params[c] for c in KEY_COLS))
+        except ValueError as exc:
+            return 400, {"error": str(exc)}
+        if found is None:
+            return 404, {"error": "Combinação fora da tabela de risco"}
+        return 200, {"IS_DELAYED_PROBA": round(found[0], 6), "FLIGHTS": found[1]}
+
+    async def best_time(self, query: str) -> tuple:
+        params = {k: v[0] for k, v in parse_qs(query).items()}
+        route = ["AIRLINE", "ORIGIN_AIRPORT", "DESTINATION_AIRPORT"]
+        missing = [c for c in route if c not in params]
+        if missing:
+            return 400, {"error": f"Parâmetros ausentes: {missing}"}
+        try:
+            grid = route_grid(self.profiles, *(params[c] for c in route),
+                              distance=float(params["DISTANCE"]) if "DISTANCE" in params else None,
+                              scheduled_time=float(params["SCHEDULED_TIME"])
+                              if "SCHEDULED_TIME" in params else None)
+        except (KeyError, ValueError) as exc:
+            return 400, {"error": str(exc.args[0])}
+        # A grade já é um lote: vai direto ao pool, sem passar pelo micro-batching
+        proba = await asyncio.get_running_loop().run_in_executor(self.batcher.pool, score_chunk, grid)
+        proba = proba.astype(np.float64).reshape(len(GRID_MONTHS), len(GRID_DAYS), len(GRID_HOURS))
+        return 200, {"airline": params["AIRLINE"], "origin": params["ORIGIN_AIRPORT"],
+                     "destination": params["DESTINATION_AIRPORT"], **summarize(proba)}
+
+    async def route(self, method: str, path: str, body: bytes) -> tuple:
+        path, _, query = path.partition("?")
+        if method == "POST" and path == "/predict":
+            t0 = time.perf_counter()
+            try:
+                status, out = await self.predict(body)
+            except (ValueError, KeyError, TypeError) as exc:
+                return 400, {"error": str(exc)}
+            self.latencies.append(time.perf_counter() - t0)
+            self.requests += 1
+            return status, out
+        if method == "GET" and path == "/best-time":
+            return await self.best_time(query)
+        if method == "GET" and path == "/risk":
+            return self.risk(query)
+        if method == "GET" and path == "/stats":
+            return 200, self.stats()
+        if method == "GET" and path == "/health":
+            return 200, {"status": "ok", "model": self.model_name}
+        return 404, {"error": f"{method} {path} não encontrado"}
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Conexão keep-alive: uma requisição por vez, até o cliente fechar.
+
+        Requisição malformada → 400 e erro inesperado ao atendê-la → 500, ambos
+        em JSON; nos dois casos a conexão é encerrada depois da resposta.
+        """
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                keep_alive = False
+                try:
+                    method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                    headers = {}
+                    while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                        name, _, value = line.decode("latin-1").partition(":")
+                        headers[name.strip().lower()] = value.strip()
+                    body = await reader.readexactly(int(headers.get("content-length", 0)))
+                except ValueError as exc:
+                    status, out = 400, {"error": f"Requisição malformada: {exc}"}
+                else:
+                    try:
+                        status, out = await self.route(method, path, body)
+                        keep_alive = headers.get("connection", "").lower() != "close"
+                    except Exception as exc:
+                        print(f"⚠️  {method} {path}: {exc!r}")
+                        status, out = 500, {"error": f"Erro interno: {type(exc).__name__}"}
+                data = json.dumps(out, separators=(",", ":")).encode()
+                head = (f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                        f"Content-Type: application/json\r\n"
+                        f"Content-Length: {len(data)}\r\n")
+                if not keep_alive:
+                    head += "Connection: close\r\n"
+                writer.write((head + "\r\n").encode() + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+
+async def serve(host: str, port: int, model_dir: Path, model_name: str, workers: int,
+                max_batch: int, max_wait_ms: float, threshold: float, engine: str = "sklearn",
+                risk_dir: Path = RISK_DIR):
+    transformer = load_transformer(model_dir)                  # recusa modelo/transformer divergentes
+    required = required_columns(transformer)
+    init_args = (str(model_dir), model_name, 1 if workers else (os.cpu_count() or 1), engine)
+    if workers:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=init_scorer, initargs=init_args)
+        await asyncio.gather(*[asyncio.get_running_loop().run_in_executor(pool, time.sleep, 0.1)
+                               for _ in range(workers)])   # sobe os workers antes de aceitar conexões
+    else:
+        init_scorer(*init_args)
+        pool = ThreadPoolExecutor(max_workers=1)
+
+    batcher = MicroBatcher(pool, workers, max_batch, max_wait_ms)
+    risk_table = RiskTable.load(risk_dir) if (risk_dir / "keys.npy").exists() else None
+    profiles = pd.read_parquet(ROUTES_FILE) if ROUTES_FILE.exists() else None
+    service = ScoringService(batcher, required, transformer.te_cols, model_name, threshold,
+                             risk_table, profiles)
+    server = await asyncio.start_server(service.handle, host, port, backlog=1024)
+    print(f"✓ {model_name} ({engine}) servindo em http://{host}:{port}  "
+          f"(workers={workers}, max_batch={max_batch}, max_wait={max_wait_ms}ms)")
+    batch_task = asyncio.create_task(batcher.run())
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        batch_task.cancel()
+        pool.shutdown(cancel_futures=True)
+        print(f"  {json.dumps(service.stats())}")
+
+
+# ==============================================================================
+# Benchmark (cliente)
+# ==============================================================================
+async def bench(host: str, port: int, n_requests: int, concurrency: int, flights: list):
+    """Dispara `n_requests` POST /predict de um voo, `concurrency` conexões keep-alive."""
+    latencies = []
+    remaining = iter(range(n_requests))
+
+    async def client():
+        reader, writer = await asyncio.open_connection(host, port)
+        for _ in remaining:
+            body = json.dumps(random.choice(flights)).encode()
+            t0 = time.perf_counter()
+            writer.write(f"POST /predict HTTP/1.1\r\nHost: {host}\r\n"
+                         f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+            await writer.drain()
+            length = 0
+            while (line := await reader.readline()) not in (b"\r\n", b""):
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":")[1])
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - t0)
+        writer.close()
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*[client() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - t0
+    p50, p99 = np.percentile(np.array(latencies) * 1000, [50, 99])
+    print(f"✓ {len(latencies):,} requisições em {elapsed:.1f}s  "
+          f"({len(latencies) / elapsed:,.0f} req/s, p50 {p50:.1f}ms, p99 {p99:.1f}ms)")
+
+
+def sample_flights(path: Path, required: list, n: int = 1000) -> list:
+    """Voos de exemplo para o benchmark (do dataset processado)."""
+    df = pd.read_parquet(path, columns=required).head(n)
+    return json.loads(df.to_json(orient="records"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--model", default=DEFAULT_MODEL,
+                        help="nome do .pkl em --model-dir (ex.: random_forest)")
+    parser.add_argument("--model-dir", type=Path, default=MODEL_DIR)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="processos de scoring (0 = no processo do servidor)")
+    parser.add_argument("--engine", choices=["sklearn", "numpy"], default="sklearn",
+                        help="numpy = modelo compilado em models/compiled/ (sem scikit-learn)")
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH)
+    parser.add_argument("--max-wait-ms", type=float, default=MAX_WAIT_MS)
+    parser.add_argument("--threshold", type=float, default=0.5,
+                        help="limiar de IS_DELAYED_PRED (ex.: optimal_threshold do 03)")
+    parser.add_argument("--risk-table", type=Path, default=RISK_DIR,
+                        help="tabela de risco servida em GET /risk (se existir)")
+    parser.add_argument("--bench", type=int, default=0,
+                        help="modo cliente: nº de requisições contra um servidor no ar")
+    parser.add_argument("--concurrency", type=int, default=128)
+    parser.add_argument("--bench-data", type=Path,
+                        default=Path("./data/processed/flights_sample_processed.parquet"))
+    args = parser.parse_args()
+
+    if args.bench:
+        required = required_columns(load_transformer(args.model_dir))
+        flights = sample_flights(args.bench_data, required)
+        asyncio.run(bench(args.host, args.port, args.bench, args.concurrency, flights))
+        return
+    try:
+        asyncio.run(serve(args.host, args.port, args.model_dir, args.model, args.workers,
+                          args.max_batch, args.max_wait_ms, args.threshold, args.engine,
+                          args.risk_table))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
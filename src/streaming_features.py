@@ -0,0 +1,169 @@
+"""
+Feature Engineering em Streaming — modo `--streaming` do 02_feature_engineering.py
+
+Mesmas etapas do modo em memória (filtro de cancelados, IS_DELAYED > 15 min,
+guarda anti-leakage, split 70/15/15 por hash, mediana, target encoding, OHE e
+StandardScaler), em duas passadas sobre o dataset Parquet particionado, com a
+memória limitada a um lote de `batch_rows` linhas:
+
+    passada 1  split de cada voo pelo hash (sem estratificação: decisão linha a
+               linha) e, só nas linhas de treino, `FeatureTransformer.partial_fit`
+               — sketches de quantis para as medianas, voos/atrasados por
+               (fold, categoria) e contagens do OHE; os momentos do scaler saem
+               dessas contagens no `finish_partial_fit`
+    passada 2  transforma cada lote (treino com target encoding out-of-fold) e
+               acrescenta row groups a X_/y_/codes_{split}.parquet e a
+               split_assignment.parquet
+
+Os folds do out-of-fold vêm do hash do voo (flights_io.split_folds), já que não
+há permutação global das linhas.
+
+Uso:
+    python src/02_feature_engineering.py --streaming
+    python src/02_feature_engineering.py --streaming --source data/processed/flights_cleaned.parquet
+"""
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from derived_features import departure_period, is_delayed
+from feature_store import RowGroupWriter, SplitWriter
+from feature_transformer import FEATURES_CAT_TARGET_ENC, FEATURES_NUM, OHE_COL, FeatureTransformer
+from flights_io import (SPLIT_FILE, SPLIT_FRACTIONS, SPLIT_KEY, SPLIT_NAMES, STAGE_COLUMNS,
+                        STREAM_BATCH_ROWS, assign_split, ensure_flights_dataset,
+                        iter_flights_dataset, split_folds, split_unit)
+
+TARGET = "IS_DELAYED"
+
+
+def prepare_chunk(df: pd.DataFrame) -> pd.DataFrame:
+    """Seção 1 do 02 em um lote: sem cancelados, IS_DELAYED > 15 min e DEPARTURE_PERIOD.
+
+    Nulos categóricos não precisam virar 'UNKNOWN' aqui: o FeatureTransformer
+    já os trata como 'UNKNOWN' ao codificar. O índice do lote é preservado
+    (posição da linha no dataset processado — ver `SOURCE_ROW`).
+    """
+    if "CANCELLED" in df.columns:
+        df = df[df["CANCELLED"] != 1]
+    if "ARRIVAL_DELAY" in df.columns:
+        df = df.assign(**{TARGET: is_delayed(df["ARRIVAL_DELAY"])})
+    else:
+        df = df.dropna(subset=[TARGET]).copy()
+    if OHE_COL not in df.columns:
+        df[OHE_COL] = departure_period(df["SCHEDULED_DEPARTURE"])
+    return df
+
+
+def _peak_rss_mb() -> float:
+    """Pico de memória residente do processo em MB; NaN onde `resource` não
+    existe (Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return float("nan")
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_streaming(
+    leakage_cols: list,
+    source: Path = None,
+    out_dir: Path = Path("./data/processed"),
+    model_dir: Path = Path("./models"),
+    batch_rows: int = STREAM_BATCH_ROWS,
+) -> FeatureTransformer:
+    """Executa as duas passadas e grava feature store, split_assignment e artefatos."""
+    source = ensure_flights_dataset() if source is None else source
+    columns = STAGE_COLUMNS["feature_engineering"]
+    all_feats = FEATURES_NUM + FEATURES_CAT_TARGET_ENC + [OHE_COL]
+
+    def chunks():
+        offset = 0
+        for df in iter_flights_dataset(source, columns=columns, batch_rows=batch_rows):
+            df.index = pd.RangeIndex(offset, offset + len(df))
+            offset += len(df)
+            df = prepare_chunk(df)
+            if len(df):
+                yield df
+
+    forbidden = [c for c in leakage_cols if c in all_feats]
+    if forbidden:
+        raise ValueError(f"⛔ DATA LEAKAGE DETECTADO! Colunas proibidas na lista de features: {forbidden}")
+    print(f"✓ Leakage guard OK — features: {all_feats}")
+
+    # ── Passada 1: estatísticas do treino ──────────────────────────────────────
+    print("\n" + "=" * 80)
+    print(f"PASSADA 1 — estatísticas do treino  ({source}, lotes de {batch_rows:,} linhas)")
+    print("=" * 80)
+    t0 = time.time()
+    transformer = FeatureTransformer(FEATURES_NUM, FEATURES_CAT_TARGET_ENC, OHE_COL)
+    split_counts = np.zeros(len(SPLIT_NAMES), dtype=np.int64)
+    split_delayed = np.zeros(len(SPLIT_NAMES), dtype=np.int64)
+    for df in chunks():
+        unit = split_unit(df)
+        codes = assign_split(df, SPLIT_FRACTIONS, unit=unit)
+        y = df[TARGET].to_numpy()
+        split_counts += np.bincount(codes, minlength=len(SPLIT_NAMES))
+        split_delayed += np.bincount(codes, weights=y, minlength=len(SPLIT_NAMES)).astype(np.int64)
+        train = codes == 0
+        if train.any():
+            transformer.partial_fit(df.loc[train, all_feats], y[train],
+                                    split_folds(unit[train], transformer.n_folds))
+    transformer.finish_partial_fit()
+
+    print(f"  {'Split':<12} {'Amostras':>10}  {'IS_DELAYED=1':>14}")
+    print(f"  {'-'*40}")
+    for name, n, d in zip(SPLIT_NAMES, split_counts, split_delayed):
+        print(f"  {name:<12} {n:>10,}  {d / max(n, 1) * 100:>13.2f}%")
+    for col in transformer.te_cols:
+        print(f"  ✓ Target Encoding: {col} → {len(transformer.te_keys[col]):,} categorias")
+    print(f"  ✓ OHE: {OHE_COL} → {transformer.ohe_columns}")
+    print(f"✓ Passada 1 em {time.time() - t0:.1f}s  (pico de memória: {_peak_rss_mb():.0f} MB)")
+
+    # ── Passada 2: transforma e grava por lote ─────────────────────────────────
+    print("\n" + "=" * 80)
+    print("PASSADA 2 — transformação e gravação em row groups")
+    print("=" * 80)
+    t0 = time.time()
+    writers = [SplitWriter(name, out_dir) for name in SPLIT_NAMES]
+    assignment = RowGroupWriter(SPLIT_FILE)
+    for df in chunks():
+        unit = split_unit(df)
+        codes = assign_split(df, SPLIT_FRACTIONS, unit=unit)
+        rows = np.empty(len(df), dtype=np.int32)
+        for i, writer in enumerate(writers):
+            mask = codes == i
+            if not mask.any():
+                continue
+            X = df.loc[mask, all_feats]
+            if i == 0:
+                matrix = transformer.transform_out_of_fold(X, split_folds(unit[mask], transformer.n_folds))
+            else:
+                matrix = transformer.transform(X)
+            rows[mask] = np.arange(writer.rows, writer.rows + mask.sum(), dtype=np.int32)
+            writer.write(pd.DataFrame(matrix, columns=transformer.feature_columns),
+                         df.loc[mask, TARGET].to_numpy(), codes=transformer.category_codes(X))
+        assignment.write(_assignment_table(df, codes, rows))
+
+    outputs = [p for writer in writers for p in writer.close()] + [assignment.close()]
+    transformer.save(model_dir, extra={"leakage_guard": leakage_cols})
+    outputs += [model_dir / "scaler.pkl", model_dir / "encoders.json", model_dir / "feature_transformer.npz"]
+    print(f"✓ Passada 2 em {time.time() - t0:.1f}s  (pico de memória: {_peak_rss_mb():.0f} MB)")
+    print("✓ Arquivos gerados:")
+    for p in outputs:
+        print(f"    {str(p):<50}  {p.stat().st_size / 1024**2:>7.1f} MB")
+    return transformer
+
+
+def _assignment_table(df: pd.DataFrame, codes: np.ndarray, rows: np.ndarray):
+    """Lote do split_assignment.parquet: chave do voo + split + linha em X_<split>
+    + linha de origem no dataset processado (índice do lote)."""
+    import pyarrow as pa
+
+    frame = df[SPLIT_KEY].assign(
+        SPLIT=pd.Categorical.from_codes(codes, categories=list(SPLIT_NAMES)),
+        ROW=rows,
+        SOURCE_ROW=df.index.to_numpy(dtype=np.int64),
+    )
+    return pa.Table.from_pandas(frame, preserve_index=False)
@@ -0,0 +1,370 @@
+"""
+Estatísticas em Streaming — acumuladores de passada única e mescláveis
+
+Cada acumulador consome o dataset em blocos (`update(chunk)`) com memória
+constante e pode ser combinado com outro acumulador do mesmo tipo
+(`merge(other)`), o que permite processar blocos/partições em processos
+separados e juntar os parciais no final:
+
+    Moments        contagem, média, variância (Welford/Chan), mín e máx
+    QuantileSketch quantis (mediana, Q1, Q3) a partir de centróides ponderados;
+                   exato enquanto o nº de valores distintos cabe em `max_bins`
+                   (atrasos são minutos inteiros: na prática, sempre exato)
+    CoMoments      médias e co-momentos de várias colunas → matriz de correlação
+    HeavyHitters   contagens dos valores mais frequentes (Misra-Gries); exato
+                   enquanto o nº de distintos cabe em `capacity`
+
+`SummaryStats` agrupa os acumuladores do eda_summary.json, e
+`summarize_csv` / `summarize_dataset` fazem a passada sobre flights.csv
+(uma faixa de bytes por processo) ou sobre o cache Parquet particionado (um
+fragmento por processo).
+
+Uso:
+    from streaming_stats import SummaryStats, summarize_csv
+    stats = summarize_csv(Path("./data/flights.csv"), SummaryStats.for_eda())
+    stats.moments["ARRIVAL_DELAY"].to_dict()
+    stats.comoments.corr()
+"""
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+def _values(column) -> np.ndarray:
+    """Coluna numérica como float64 sem nulos."""
+    values = np.asarray(column, dtype=np.float64)
+    return values[~np.isnan(values)]
+
+
+# ==============================================================================
+# Acumuladores
+# ==============================================================================
+class Moments:
+    """Média e variância por Welford, com merge de Chan entre parciais."""
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, column) -> "Moments":
+        values = _values(column)
+        if len(values):
+            other = Moments()
+            other.n = len(values)
+            other.mean = float(values.mean())
+            other.m2 = float(((values - other.mean) ** 2).sum())
+            other.min = float(values.min())
+            other.max = float(values.max())
+            self.merge(other)
+        return self
+
+    def merge(self, other: "Moments") -> "Moments":
+        if other.n == 0:
+            return self
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.mean += delta * other.n / n
+        self.m2 += other.m2 + delta ** 2 * self.n * other.n / n
+        self.n = n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def std(self) -> float:
+        """Desvio padrão amostral (ddof=1, como `Series.std`)."""
+        return float(np.sqrt(self.m2 / (self.n - 1))) if self.n > 1 else float("nan")
+
+    def to_dict(self) -> dict:
+        return {"count": self.n, "mean": float(self.mean), "std": self.std,
+                "min": float(self.min), "max": float(self.max)}
+
+
+class QuantileSketch:
+    """Quantis a partir de centróides (valor, peso) ordenados.
+
+    Enquanto houver até `max_bins` valores distintos, guarda a distribuição
+    exata e `quantile` reproduz `Series.quantile` (interpolação linear). Acima
+    disso, funde pares de centróides vizinhos em suas médias ponderadas.
+    """
+
+    def __init__(self, max_bins: int = 4096):
+        self.max_bins = max_bins
+        self.values = np.empty(0, dtype=np.float64)
+        self.counts = np.empty(0, dtype=np.int64)
+        self.exact = True
+
+    @property
+    def n(self) -> int:
+        return int(self.counts.sum())
+
+    def update(self, column) -> "QuantileSketch":
+        values, counts = np.unique(_values(column), return_counts=True)
+        return self._absorb(values, counts)
+
+    def add(self, value: float, count: int) -> "QuantileSketch":
+        """Acrescenta `count` ocorrências de um mesmo valor (ex.: nulos imputados)."""
+        if count <= 0:
+            return self
+        return self._absorb(np.array([value], dtype=np.float64), np.array([count], dtype=np.int64))
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        self.exact &= other.exact
+        return self._absorb(other.values, other.counts)
+
+    def _absorb(self, values: np.ndarray, counts: np.ndarray) -> "QuantileSketch":
+        if not len(values):
+            return self
+        values, inverse = np.unique(np.concatenate([self.values, values]), return_inverse=True)
+        self.counts = np.bincount(inverse, weights=np.concatenate([self.counts, counts]),
+                                  minlength=len(values)).astype(np.int64)
+        self.values = values
+        while len(self.values) > self.max_bins:
+            self._compress()
+        return self
+
+    def _compress(self):
+        """Funde centróides vizinhos (0+1, 2+3, ...) — metade dos bins."""
+        pairs = np.arange(len(self.values)) // 2
+        counts = np.bincount(pairs, weights=self.counts)
+        self.values = np.bincount(pairs, weights=self.values * self.counts) / counts
+        self.counts = counts.astype(np.int64)
+        self.exact = False
+
+    def quantile(self, q: float) -> float:
+        n = self.n
+        if n == 0:
+            return float("nan")
+        rank = q * (n - 1)
+        lo, hi = int(np.floor(rank)), int(np.ceil(rank))
+        cum = np.cumsum(self.counts)
+        v_lo, v_hi = self.values[np.searchsorted(cum, [lo, hi], side="right")]
+        return float(v_lo + (rank - lo) * (v_hi - v_lo))
+
+    def to_dict(self) -> dict:
+        return {"q1": self.quantile(0.25), "median": self.quantile(0.5),
+                "q3": self.quantile(0.75), "exact": self.exact}
+
+
+class CoMoments:
+    """Médias e matriz de co-momentos de várias colunas (linhas com nulo são ignoradas)."""
+
+    def __init__(self, columns: list):
+        self.columns = list(columns)
+        k = len(self.columns)
+        self.n = 0
+        self.mean = np.zeros(k)
+        self.c = np.zeros((k, k))
+
+    def update(self, df: pd.DataFrame) -> "CoMoments":
+        x = df[self.columns].to_numpy(dtype=np.float64, na_value=np.nan)
+        x = x[~np.isnan(x).any(axis=1)]
+        if len(x):
+            other = CoMoments(self.columns)
+            other.n = len(x)
+            other.mean = x.mean(axis=0)
+            centered = x - other.mean
+            other.c = centered.T @ centered
+            self.merge(other)
+        return self
+
+    def merge(self, other: "CoMoments") -> "CoMoments":
+        if other.columns != self.columns:
+            raise ValueError(f"Colunas diferentes: {self.columns} vs {other.columns}")
+        if other.n == 0:
+            return self
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.c += other.c + np.outer(delta, delta) * self.n * other.n / n
+        self.mean += delta * other.n / n
+        self.n = n
+        return self
+
+    def corr(self) -> pd.DataFrame:
+        std = np.sqrt(np.diag(self.c))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            corr = self.c / np.outer(std, std)
+        return pd.DataFrame(corr, index=self.columns, columns=self.columns)
+
+
+class HeavyHitters:
+    """Contagens dos valores mais frequentes por Misra-Gries com merge.
+
+    Até `capacity` valores distintos as contagens são exatas; acima disso o
+    resumo subtrai a (capacity+1)-ésima contagem de todos os contadores, e
+    cada contagem fica subestimada em no máximo n / (capacity + 1).
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self.capacity = capacity
+        self.counts = pd.Series(dtype=np.int64)
+        self.n = 0
+        self.exact = True
+
+    def update(self, column) -> "HeavyHitters":
+        counts = pd.Series(column).astype(str, copy=False).value_counts()
+        return self._absorb(counts[counts > 0].astype(np.int64), int(counts.sum()))
+
+    def merge(self, other: "HeavyHitters") -> "HeavyHitters":
+        self.exact &= other.exact
+        return self._absorb(other.counts, other.n)
+
+    def _absorb(self, counts: pd.Series, n: int) -> "HeavyHitters":
+        self.counts = self.counts.add(counts, fill_value=0).astype(np.int64)
+        self.n += n
+        if len(self.counts) > self.capacity:
+            cut = np.sort(self.counts.to_numpy())[::-1][self.capacity]
+            self.counts = self.counts[self.counts > cut] - cut
+            self.exact = False
+        return self
+
+    @property
+    def nunique(self):
+        """Nº de valores distintos (só conhecido enquanto o resumo é exato)."""
+        return len(self.counts) if self.exact else None
+
+    def top(self, k: int) -> dict:
+        ordered = self.counts.rename_axis("value").reset_index(name="count")
+        ordered = ordered.sort_values(["count", "value"], ascending=[False, True]).head(k)
+        return {str(v): int(c) for v, c in zip(ordered["value"], ordered["count"])}
+
+
+# ==============================================================================
+# Resumo do EDA
+# ==============================================================================
+EDA_MOMENT_COLS = ['ARRIVAL_DELAY', 'DEPARTURE_DELAY', 'DISTANCE', 'AIR_TIME', 'TAXI_OUT', 'TAXI_IN']
+EDA_QUANTILE_COLS = ['ARRIVAL_DELAY', 'DEPARTURE_DELAY']
+EDA_CORR_COLS = EDA_MOMENT_COLS
+EDA_HEAVY_HITTER_COLS = ['AIRLINE', 'ORIGIN_AIRPORT', 'DESTINATION_AIRPORT']
+
+
+class SummaryStats:
+    """Conjunto de acumuladores atualizado bloco a bloco e mesclável."""
+
+    def __init__(self, moments: list = (), quantiles: list = (), corr: list = (),
+                 heavy_hitters: list = ()):
+        self._spec = (list(moments), list(quantiles), list(corr), list(heavy_hitters))
+        self.rows = 0
+        self.moments = {c: Moments() for c in moments}
+        self.quantiles = {c: QuantileSketch() for c in quantiles}
+        self.comoments = CoMoments(corr) if corr else None
+        self.heavy_hitters = {c: HeavyHitters() for c in heavy_hitters}
+
+    @classmethod
+    def for_eda(cls) -> "SummaryStats":
+        return cls(EDA_MOMENT_COLS, EDA_QUANTILE_COLS, EDA_CORR_COLS, EDA_HEAVY_HITTER_COLS)
+
+    def spawn(self) -> "SummaryStats":
+        """Acumulador vazio com a mesma configuração (parcial de um worker)."""
+        return SummaryStats(*self._spec)
+
+    @property
+    def columns(self) -> list:
+        cols = [*self.moments, *self.quantiles, *self.heavy_hitters]
+        if self.comoments is not None:
+            cols += self.comoments.columns
+        return list(dict.fromkeys(cols))
+
+    def update(self, df: pd.DataFrame) -> "SummaryStats":
+        self.rows += len(df)
+        for col, acc in self.moments.items():
+            acc.update(df[col])
+        for col, acc in self.quantiles.items():
+            acc.update(df[col])
+        if self.comoments is not None:
+            self.comoments.update(df)
+        for col, acc in self.heavy_hitters.items():
+            acc.update(df[col])
+        return self
+
+    def merge(self, other: "SummaryStats") -> "SummaryStats":
+        self.rows += other.rows
+        for group in ("moments", "quantiles", "heavy_hitters"):
+            mine, theirs = getattr(self, group), getattr(other, group)
+            for col, acc in theirs.items():
+                mine[col].merge(acc)
+        if self.comoments is not None:
+            self.comoments.merge(other.comoments)
+        return self
+
+    def describe(self, col: str) -> dict:
+        """mean/median/std/min/max de uma coluna (formato do eda_summary.json)."""
+        moments = self.moments[col]
+        return {
+            "mean": float(moments.mean),
+            "median": self.quantiles[col].quantile(0.5),
+            "std": moments.std,
+            "min": float(moments.min),
+            "max": float(moments.max),
+        }
+
+    def to_dict(self, top_k: int = 5) -> dict:
+        out = {"rows": self.rows, "numeric": {}, "categorical": {}}
+        for col, acc in self.moments.items():
+            out["numeric"][col] = acc.to_dict()
+            if col in self.quantiles:
+                out["numeric"][col].update(self.quantiles[col].to_dict())
+        for col, acc in self.heavy_hitters.items():
+            out["categorical"][col] = {"nunique": acc.nunique, f"top_{top_k}": acc.top(top_k)}
+        if self.comoments is not None:
+            corr = self.comoments.corr().round(4)
+            out["correlation_matrix"] = {c: corr[c].to_dict() for c in corr.columns}
+        return out
+
+
+# ==============================================================================
+# Passadas sobre o dataset
+# ==============================================================================
+def _summarize_csv_block(path: str, names: list, bounds: tuple, stats: SummaryStats,
+                         dtypes: dict) -> SummaryStats:
+    """Worker: resumo parcial de uma faixa de bytes do CSV."""
+    from flights_io import read_csv_block
+
+    return stats.update(read_csv_block(path, names, *bounds, dtypes=dtypes,
+                                       columns=stats.columns).to_pandas())
+
+
+def summarize_csv(path: Path, stats: SummaryStats, dtypes: dict = None,
+                  block_size: int = None, workers: int = None) -> SummaryStats:
+    """Resume um CSV: uma faixa de bytes alinhada em fim de linha por tarefa do
+    pool de processos, parciais mesclados na ordem do arquivo (memória ~ um
+    bloco por processo)."""
+    from flights_io import DEFAULT_BLOCK_SIZE, DTYPES_FLIGHTS, csv_block_ranges
+
+    dtypes = DTYPES_FLIGHTS if dtypes is None else dtypes
+    names, ranges = csv_block_ranges(path, block_size or DEFAULT_BLOCK_SIZE)
+    n = len(ranges)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for partial in pool.map(_summarize_csv_block, [str(path)] * n, [names] * n, ranges,
+                                [stats.spawn()] * n, [dtypes] * n):
+            stats.merge(partial)
+    return stats
+
+
+def _summarize_fragment(path: str, stats: SummaryStats) -> SummaryStats:
+    """Worker: resumo parcial de um arquivo Parquet (um fragmento do dataset)."""
+    import pyarrow.parquet as pq
+
+    pf = pq.ParquetFile(path)
+    columns = [c for c in stats.columns if c in pf.schema_arrow.names]
+    for batch in pf.iter_batches(columns=columns):
+        stats.update(batch.to_pandas())
+    return stats
+
+
+def summarize_dataset(path: Path, stats: SummaryStats, workers: int = None) -> SummaryStats:
+    """Resume um dataset Parquet particionado: um fragmento por processo, parciais mesclados.
+
+    As colunas de partição (YEAR/MONTH) não estão nos arquivos e não podem
+    ser usadas nos acumuladores.
+    """
+    files = sorted(str(p) for p in Path(path).rglob("*.parquet") if p.is_file())
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for partial in pool.map(_summarize_fragment, files, [stats.spawn()] * len(files)):
+            stats.merge(partial)
+    return stats
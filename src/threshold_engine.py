@@ -0,0 +1,110 @@
+"""
+Threshold Engine — curvas de precision / recall / F1 / custo em uma única ordenação
+
+As probabilidades são ordenadas uma vez (decrescente); somas acumuladas dos
+rótulos dão TP e FP para cada limiar distinto (prever 1 se P ≥ limiar), e
+FN = positivos − TP. Qualquer grade de limiares é avaliada por `searchsorted`
+sobre os limiares distintos, sem varrer o conjunto de novo: O(n log n) para
+construir e O(k log n) para k limiares.
+
+Por segmento (ex.: período do dia, companhia), uma única ordenação por
+(segmento, −P) gera as curvas de todos os segmentos.
+
+Uso:
+    from threshold_engine import ThresholdCurve, curves_by_segment
+    curve = ThresholdCurve.from_scores(y_test, y_prob)
+    curve.at(np.arange(0.01, 1.0, 0.01))["f1"]
+    curve.best("f1")                                  # (limiar, F1) ótimo
+    curves_by_segment(y_test, y_prob, codes_test["DEPARTURE_PERIOD"])
+"""
+import numpy as np
+
+
+def _safe_div(num: np.ndarray, den: np.ndarray) -> np.ndarray:
+    """num / den com 0 onde den == 0 (zero_division=0 do sklearn)."""
+    num, den = np.asarray(num, dtype=np.float64), np.asarray(den, dtype=np.float64)
+    return np.divide(num, den, out=np.zeros(np.broadcast(num, den).shape), where=den > 0)
+
+
+class ThresholdCurve:
+    """TP/FP acumulados por limiar distinto (decrescente) de um vetor de scores."""
+
+    def __init__(self, thresholds: np.ndarray, tp: np.ndarray, fp: np.ndarray, n_pos: int, n: int):
+        self.thresholds = thresholds   # limiares distintos, decrescentes
+        self.tp = tp                   # TP se prever 1 para P ≥ thresholds[i]
+        self.fp = fp
+        self.n_pos = int(n_pos)
+        self.n = int(n)
+
+    @classmethod
+    def from_scores(cls, y, scores) -> "ThresholdCurve":
+        y = np.asarray(y)
+        scores = np.asarray(scores, dtype=np.float64)
+        order = np.argsort(-scores, kind="stable")
+        return cls._from_sorted(scores[order], y[order] == 1)
+
+    @classmethod
+    def _from_sorted(cls, scores: np.ndarray, positive: np.ndarray) -> "ThresholdCurve":
+        """Curva a partir de scores já em ordem decrescente."""
+        tp = np.cumsum(positive, dtype=np.int64)
+        fp = np.arange(1, len(scores) + 1, dtype=np.int64) - tp
+        last = np.flatnonzero(np.append(scores[1:] != scores[:-1], True))   # fim de cada empate
+        return cls(scores[last], tp[last], fp[last], tp[-1] if len(tp) else 0, len(scores))
+
+    # ── Contagens em qualquer grade ────────────────────────────────────────────
+    def counts_at(self, thresholds) -> dict:
+        """TP, FP, FN, TN para prever 1 se P ≥ t, para cada t de `thresholds`."""
+        t = np.asarray(thresholds, dtype=np.float64)
+        k = np.searchsorted(-self.thresholds, -t, side="right")   # nº de limiares ≥ t
+        tp = np.append(0, self.tp)[k]
+        fp = np.append(0, self.fp)[k]
+        fn = self.n_pos - tp
+        return {"tp": tp, "fp": fp, "fn": fn, "tn": self.n - self.n_pos - fp}
+
+    def at(self, thresholds, cost_fp: float = 1.0, cost_fn: float = 1.0) -> dict:
+        """Precision, recall, F1 e custo (cost_fp·FP + cost_fn·FN) em `thresholds`."""
+        c = self.counts_at(thresholds)
+        c["precision"] = _safe_div(c["tp"], c["tp"] + c["fp"])
+        c["recall"] = _safe_div(c["tp"], self.n_pos)
+        c["f1"] = _safe_div(2 * c["tp"], 2 * c["tp"] + c["fp"] + c["fn"])
+        c["cost"] = cost_fp * c["fp"] + cost_fn * c["fn"]
+        c["predicted_positive"] = c["tp"] + c["fp"]
+        return c
+
+    def curve(self, cost_fp: float = 1.0, cost_fn: float = 1.0) -> dict:
+        """Métricas em todos os limiares distintos (resolução máxima)."""
+        out = self.at(self.thresholds, cost_fp, cost_fn)
+        out["thresholds"] = self.thresholds
+        return out
+
+    def best(self, metric: str = "f1", thresholds=None, cost_fp: float = 1.0,
+             cost_fn: float = 1.0, exclude_trivial: bool = False) -> tuple:
+        """(limiar, valor) que maximiza `metric` — ou minimiza, se metric == "cost".
+
+        Sem `thresholds`, procura entre todos os limiares distintos. Com
+        `exclude_trivial`, ignora limiares que preveem tudo 0 ou tudo 1.
+        """
+        grid = self.thresholds if thresholds is None else np.asarray(thresholds, dtype=np.float64)
+        stats = self.at(grid, cost_fp, cost_fn)
+        values = stats[metric].astype(np.float64)
+        if exclude_trivial:
+            trivial = (stats["predicted_positive"] == 0) | (stats["predicted_positive"] == self.n)
+            values = np.where(trivial, np.inf if metric == "cost" else -np.inf, values)
+        i = int(np.argmin(values) if metric == "cost" else np.argmax(values))
+        return float(grid[i]), float(values[i])
+
+
+def curves_by_segment(y, scores, segments) -> dict:
+    """Uma curva por valor de `segments`, com uma única ordenação por (segmento, −P)."""
+    y = np.asarray(y)
+    scores = np.asarray(scores, dtype=np.float64)
+    segments = np.asarray(segments)
+    order = np.lexsort((-scores, segments))
+    seg_sorted = segments[order]
+    bounds = np.flatnonzero(np.append(True, seg_sorted[1:] != seg_sorted[:-1]))
+    bounds = np.append(bounds, len(order))
+    scores, positive = scores[order], y[order] == 1
+    return {
+        seg_sorted[start].item(): ThresholdCurve._from_sorted(scores[start:end], positive[start:end])
+        for start, end in zip(bounds[:-1], bounds[1:])
+    }
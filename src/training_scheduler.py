@@ -0,0 +1,165 @@
+"""
+Agendador de Treino — modelos ajustados em paralelo sobre matrizes em memory-map
+
+As matrizes de treino de cada modelo (X_train do feature store, o
+native_frame do motor "hist", y_train) são gravadas uma única vez como .npy em
+um diretório temporário (em /dev/shm quando existe) e cada processo as abre
+com `np.load(mmap_mode="r")`: os workers leem as mesmas páginas, sem cópia
+nem pickle dos dados. X_train / y_train do feature store já são vistas sobre
+os .npy de `feature_store.materialize_split` e entram pelo próprio arquivo.
+
+Os núcleos são divididos entre os modelos:
+
+    single-thread  (ex.: LogisticRegression, GradientBoostingClassifier exato)
+                   1 núcleo cada
+    multithread    (n_jobs das florestas, OpenMP do HistGradientBoosting)
+                   o restante, em partes iguais — aplicado no worker via
+                   `n_jobs` e `threadpoolctl.threadpool_limits`
+
+Todos os modelos treinam ao mesmo tempo; o tempo total tende ao do mais lento.
+Os workers nascem por fork, sem reimportar o script chamador (03 roda em nível
+de módulo); onde não há fork (Windows) os modelos treinam em sequência no
+próprio processo, cada um com todos os núcleos.
+
+Uso:
+    from training_scheduler import train_concurrently
+    fitted = train_concurrently(models, inputs, y_train)   # name → (modelo, segundos)
+"""
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Estimadores que escalam com threads (por nome da classe)
+MULTITHREADED = (
+    "RandomForestClassifier", "ExtraTreesClassifier",
+    "HistGradientBoostingClassifier", "NativeCategoryBoosting",
+)
+
+
+def is_multithreaded(model) -> bool:
+    return type(model).__name__ in MULTITHREADED
+
+
+def core_budget(models: dict, n_cores: int = None) -> dict:
+    """Threads por modelo: 1 para os single-thread, o resto dividido entre os multithread."""
+    n_cores = n_cores or os.cpu_count() or 1
+    multi = [name for name, model in models.items() if is_multithreaded(model)]
+    spare = max(n_cores - (len(models) - len(multi)), len(multi))
+    budget = {name: 1 for name in models}
+    for i, name in enumerate(multi):
+        budget[name] = max(1, spare // len(multi) + (i < spare % len(multi)))
+    return budget
+
+
+def _mapped_file(values: np.ndarray):
+    """Arquivo .npy de que `values` é a vista inteira (np.load com mmap_mode), ou None."""
+    base = values
+    while base is not None and not isinstance(base, np.memmap):
+        base = base.base
+    if (base is not None and base.filename and base.shape == values.shape
+            and base.dtype == values.dtype and base.ctypes.data == values.ctypes.data
+            and base.flags.f_contiguous == values.flags.f_contiguous):
+        return str(base.filename)
+    return None
+
+
+class SharedMatrices:
+    """Matrizes .npy em um diretório temporário, abertas por memory-map nos workers."""
+
+    def __init__(self):
+        shm = Path("/dev/shm")
+        self._dir = tempfile.TemporaryDirectory(prefix="tc3-train-",
+                                                dir=shm if shm.is_dir() else None)
+        self.path = Path(self._dir.name)
+        self._ids = {}
+
+    def add(self, data) -> dict:
+        """Grava `data` (DataFrame ou array) uma vez por objeto; devolve a referência."""
+        if id(data) in self._ids:
+            return self._ids[id(data)]
+        ref = {"file": str(self.path / f"m{len(self._ids)}.npy"), "columns": None}
+        if isinstance(data, pd.DataFrame):
+            ref["columns"] = data.columns.tolist()
+            values = np.asfortranarray(data.to_numpy(dtype=np.result_type(*data.dtypes)))
+        else:
+            values = np.asarray(data)
+        mapped = _mapped_file(values)
+        if mapped:
+            ref["file"] = mapped
+        else:
+            np.save(ref["file"], values)
+        self._ids[id(data)] = ref
+        return ref
+
+    def close(self):
+        self._dir.cleanup()
+
+
+def open_shared(ref: dict):
+    values = np.load(ref["file"], mmap_mode="r")
+    if ref["columns"] is None:
+        return values
+    return pd.DataFrame(values, columns=ref["columns"], copy=False)
+
+
+def _fit(model, X, y, threads: int) -> tuple:
+    """Ajusta com o nº de threads do orçamento; devolve (modelo, segundos)."""
+    from threadpoolctl import threadpool_limits
+
+    if "n_jobs" in model.get_params():
+        model.set_params(n_jobs=threads)
+    t0 = time.time()
+    with threadpool_limits(limits=threads):
+        model.fit(X, y)
+    return model, time.time() - t0
+
+
+def _fit_one(model, x_ref: dict, y_ref: dict, threads: int) -> tuple:
+    """Worker: abre X/y por memory-map e ajusta com o nº de threads do orçamento."""
+    return _fit(model, open_shared(x_ref), open_shared(y_ref), threads)
+
+
+def _fork_context():
+    """Contexto "fork" do multiprocessing, ou None onde não existe (Windows).
+
+    Com spawn/forkserver cada worker reimportaria o __main__ do chamador — o
+    03 roda em nível de módulo e recomeçaria o pipeline dentro do worker.
+    """
+    if "fork" not in multiprocessing.get_all_start_methods():
+        return None
+    return multiprocessing.get_context("fork")
+
+
+def train_concurrently(models: dict, inputs: dict, y, n_cores: int = None) -> dict:
+    """Ajusta todos os `models` em processos paralelos; `inputs[name]` é o X de treino
+    de cada um. Retorna name → (modelo ajustado, segundos de treino)."""
+    n_jobs = {name: model.get_params().get("n_jobs") for name, model in models.items()}
+    context = _fork_context()
+    if context is None:
+        threads = n_cores or os.cpu_count() or 1
+        fitted = {name: _fit(model, inputs[name], np.asarray(y), threads)
+                  for name, model in models.items()}
+    else:
+        budget = core_budget(models, n_cores)
+        shared = SharedMatrices()
+        try:
+            y_ref = shared.add(np.asarray(y))
+            refs = {name: shared.add(inputs[name]) for name in models}
+            with ProcessPoolExecutor(max_workers=len(models), mp_context=context) as pool:
+                futures = {name: pool.submit(_fit_one, model, refs[name], y_ref, budget[name])
+                           for name, model in models.items()}
+                fitted = {name: fut.result() for name, fut in futures.items()}
+        finally:
+            shared.close()
+
+    # n_jobs volta ao valor configurado (a predição usa todos os núcleos)
+    for name, (model, _) in fitted.items():
+        if "n_jobs" in model.get_params():
+            model.set_params(n_jobs=n_jobs[name])
+    return fitted
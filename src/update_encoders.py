@@ -0,0 +1,105 @@
+"""
+Atualização Incremental dos Encoders — absorve um novo lote de voos sem refit
+
+Soma um lote rotulado (ex.: um mês novo de flights.csv) às estatísticas
+suficientes guardadas em models/ (voos e atrasados por categoria, Σx e Σx²
+do scaler) e grava encoders.json, scaler.pkl e feature_transformer.npz
+atualizados. O custo é proporcional ao lote, não ao histórico.
+
+Os artefatos vão para um diretório versionado novo, não para models/: os
+modelos (.pkl, compiled/, risk_table/) foram treinados com o encoding e o
+scaler anteriores, e alimentá-los com o transformer atualizado daria entradas
+fora da distribuição do treino. O novo transformer tem outro fingerprint:
+servi-lo exige retreinar os modelos sobre features geradas com ele, e os
+caminhos de scoring recusam um diretório em que os dois divergem (ver
+feature_transformer.check_models_manifest).
+
+Input : CSV no schema de flights.csv, ou Parquet (arquivo ou dataset particionado)
+Output: models/encoder_updates/<UTC>/{encoders.json, scaler.pkl, feature_transformer.npz}
+
+Uso:
+    python src/update_encoders.py data/flights_2016_01.csv
+    python src/update_encoders.py data/flights_2016_02.csv --model-dir models/encoder_updates/<UTC>
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pandas as pd
+
+from derived_features import is_delayed
+from feature_transformer import ENCODERS_FILE, FeatureTransformer
+from flights_io import read_flights_dataset, read_flights_sampled
+
+MODEL_DIR   = Path("./models")
+UPDATES_DIR = MODEL_DIR / "encoder_updates"
+
+
+def load_batch(path: Path) -> pd.DataFrame:
+    """Lê o lote tipado: CSV pelo leitor em blocos, Parquet/dataset pelo flights_io."""
+    if path.suffix == ".csv":
+        return read_flights_sampled(path, fraction=1.0)
+    if path.is_dir():
+        return read_flights_dataset(path)
+    return pd.read_parquet(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("batch", type=Path, help="arquivo de voos do novo período")
+    parser.add_argument("--model-dir", type=Path, default=MODEL_DIR,
+                        help="artefatos de partida (models/ ou uma atualização anterior)")
+    parser.add_argument("--out-dir", type=Path, default=None,
+                        help=f"destino (default: {UPDATES_DIR}/<UTC>/)")
+    args = parser.parse_args()
+
+    now = datetime.now(timezone.utc)
+    out_dir = args.out_dir or UPDATES_DIR / now.strftime("%Y%m%dT%H%M%SZ")
+    if out_dir.resolve() == args.model_dir.resolve():
+        parser.error("--out-dir não pode sobrescrever --model-dir: os modelos treinados "
+                     "ficariam dessincronizados dos encoders")
+
+    t0 = time.time()
+    ft = FeatureTransformer.load_json(args.model_dir)
+    fingerprint_before = ft.fingerprint()
+    df = load_batch(args.batch)
+
+    # Mesmas regras do 02: sem cancelados, IS_DELAYED com ARRIVAL_DELAY nulo → 0
+    n_read = len(df)
+    df = df[df["CANCELLED"] != 1]
+    y = is_delayed(df["ARRIVAL_DELAY"])
+    print(f"✓ Lote: {n_read:,} voos lidos → {len(df):,} rotulados  ({args.batch})")
+
+    n_keys = {col: len(ft.te_keys[col]) for col in ft.te_cols}
+    global_before = ft.global_mean
+    ft.update(df, y)
+
+    for col in ft.te_cols:
+        print(f"  ✓ {col}: {len(ft.te_keys[col]):,} categorias "
+              f"(+{len(ft.te_keys[col]) - n_keys[col]} novas)")
+    print(f"  ✓ global_mean: {global_before:.4f} → {ft.global_mean:.4f}  "
+          f"({ft.n_samples_:,} voos acumulados)")
+
+    # Preserva os campos extras do encoders.json e registra a atualização
+    with open(args.model_dir / ENCODERS_FILE) as f:
+        previous = json.load(f)
+    extra = {k: v for k, v in previous.items() if k not in ft.to_encoders_json()}
+    extra["updates"] = previous.get("updates", []) + [{
+        "at": now.isoformat(),
+        "source": str(args.batch),
+        "rows": int(len(df)),
+        "from": str(args.model_dir),
+        "fingerprint_before": fingerprint_before,
+    }]
+    extra["retrain_required"] = True
+    ft.save(out_dir, extra=extra)
+    print(f"✓ Artefatos atualizados em {out_dir}/  ({time.time() - t0:.1f}s)")
+    print(f"  ⚠️  RETREINO NECESSÁRIO: transformer {fingerprint_before} → {ft.fingerprint()}. "
+          f"Os modelos em {args.model_dir}/ seguem com os encoders anteriores; "
+          f"não os sirva com estes sem retreinar.")
+
+
+if __name__ == "__main__":
+    main()
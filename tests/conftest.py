@@ -0,0 +1,6 @@
+"""Coloca src/ no sys.path: os módulos do pipeline são importados pelo nome,
+como nos scripts (`python src/...`)."""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
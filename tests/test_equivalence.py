@@ -0,0 +1,193 @@
+"""
+Equivalência dos caminhos rápidos com as implementações de referência
+
+Em um frame sintético pequeno (voos com as colunas do FeatureTransformer):
+
+    CompiledModel.predict_proba   == predict_proba do sklearn, por tipo de modelo
+    RiskTable.lookup              == RiskTable.lookup_frame, voo a voo
+    ThresholdCurve.at             == precision / recall / F1 / matriz de confusão do sklearn
+    target encoding out-of-fold   não vê o rótulo do próprio fold (sem vazamento)
+
+Uso:
+    python -m pytest -q tests
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.metrics import confusion_matrix, f1_score, precision_score, recall_score
+
+from derived_features import departure_period
+from feature_transformer import FEATURES_CAT_TARGET_ENC, FEATURES_NUM, OHE_COL, FeatureTransformer
+from native_boosting import NATIVE_CAT_COLS, NativeCategoryBoosting, native_frame
+from numpy_inference import CompiledModel, export_model
+from risk_table import KEY_COLS, RiskTable
+from threshold_engine import ThresholdCurve
+
+N_ROWS   = 3000
+AIRLINES = ["AA", "B6", "DL", "UA", "WN"]
+AIRPORTS = ["ATL", "BOS", "DEN", "JFK", "LAX", "ORD", "SEA", "SFO"]
+
+
+@pytest.fixture(scope="module")
+def flights():
+    """Voos sintéticos com atraso dependente de companhia, origem e horário."""
+    rng = np.random.RandomState(42)
+    dep = rng.randint(0, 24, N_ROWS) * 100 + rng.randint(0, 60, N_ROWS)
+    df = pd.DataFrame({
+        "MONTH": rng.randint(1, 13, N_ROWS),
+        "DAY_OF_WEEK": rng.randint(1, 8, N_ROWS),
+        "SCHEDULED_DEPARTURE": dep,
+        "SCHEDULED_ARRIVAL": (dep + 200) % 2400,
+        "DISTANCE": rng.randint(100, 3000, N_ROWS).astype(float),
+        "SCHEDULED_TIME": rng.randint(40, 400, N_ROWS).astype(float),
+        "AIRLINE": rng.choice(AIRLINES, N_ROWS),
+        "ORIGIN_AIRPORT": rng.choice(AIRPORTS, N_ROWS),
+        "DESTINATION_AIRPORT": rng.choice(AIRPORTS, N_ROWS),
+    })
+    df.loc[rng.rand(N_ROWS) < 0.02, "DISTANCE"] = np.nan
+    df[OHE_COL] = departure_period(df["SCHEDULED_DEPARTURE"])
+    logit = (0.8 * (df["AIRLINE"] == "WN") + 0.5 * (df["ORIGIN_AIRPORT"] == "ORD")
+             + 0.06 * (dep // 100) - 1.2)
+    y = (rng.rand(N_ROWS) < 1 / (1 + np.exp(-logit))).astype(np.int8)
+    return df, pd.Series(y, name="IS_DELAYED")
+
+
+@pytest.fixture(scope="module")
+def features(flights):
+    """Matriz padronizada (como o feature store) e códigos das categorias."""
+    df, y = flights
+    ft = FeatureTransformer()
+    X = pd.DataFrame(ft.fit_transform(df, y), columns=ft.feature_columns)
+    return X, ft.category_codes(df), y
+
+
+# ==============================================================================
+# CompiledModel × sklearn
+# ==============================================================================
+@pytest.mark.parametrize("make_model", [
+    lambda: LogisticRegression(max_iter=500),
+    lambda: SGDClassifier(loss="log_loss", random_state=42),
+    lambda: RandomForestClassifier(n_estimators=20, max_depth=8, random_state=42),
+    lambda: GradientBoostingClassifier(n_estimators=30, max_depth=3, random_state=42),
+], ids=["logistic", "sgd", "random_forest", "gradient_boosting"])
+def test_compiled_matches_sklearn(features, tmp_path, make_model):
+    X, _, y = features
+    model = make_model().fit(X, y)
+    compiled = CompiledModel.load(export_model(model, tmp_path / "model", probe=X))
+    np.testing.assert_allclose(compiled.predict_proba(X), model.predict_proba(X), atol=1e-6)
+    np.testing.assert_array_equal(compiled.predict(X), model.predict(X))
+
+
+def test_compiled_native_matches_sklearn(features, tmp_path):
+    X, codes, y = features
+    frame = native_frame(X, codes)
+    model = NativeCategoryBoosting(max_iter=30, min_samples_leaf=20, early_stopping=False).fit(frame, y)
+    compiled = CompiledModel.load(export_model(model, tmp_path / "native", probe=frame))
+
+    # Faltantes nas numéricas e códigos fora do treino (−1 e além do vocabulário)
+    unseen = frame.copy()
+    unseen.loc[::7, "DISTANCE"] = np.nan
+    unseen.loc[::5, NATIVE_CAT_COLS[0]] = -1
+    unseen.loc[1::5, NATIVE_CAT_COLS[1]] = 999
+    for data in (frame, unseen):
+        np.testing.assert_allclose(compiled.predict_proba(data), model.predict_proba(data), atol=1e-6)
+
+
+# ==============================================================================
+# RiskTable: lookup × lookup_frame
+# ==============================================================================
+def test_risk_lookup_matches_lookup_frame(flights):
+    df, _ = flights
+    rng = np.random.RandomState(0)
+    meta = {"airlines": sorted(AIRLINES), "airports": sorted(AIRPORTS)}
+    empty = RiskTable(np.empty(0, dtype=np.int64), np.empty(0), np.empty(0), meta)
+    hour = df["SCHEDULED_DEPARTURE"] // 100
+    keys = np.unique(empty.encode(df["AIRLINE"], df["ORIGIN_AIRPORT"], df["DESTINATION_AIRPORT"],
+                                  df["MONTH"], df["DAY_OF_WEEK"], hour))
+    keys = keys[keys >= 0][::2]                      # metade das combinações fica fora
+    table = RiskTable(keys, rng.rand(len(keys)).astype(np.float32),
+                      rng.randint(1, 100, len(keys)).astype(np.int32), meta)
+
+    queries = df.assign(HOUR=hour)[KEY_COLS].copy()
+    queries.loc[::11, "AIRLINE"] = "ZZ"              # companhia fora do vocabulário
+    queries.loc[::13, "DAY_OF_WEEK"] = 9             # componente fora da faixa
+    vectorized = table.lookup_frame(queries)
+    for row, expected in zip(queries.itertuples(index=False), vectorized):
+        found = table.lookup(*row)
+        if found is None:
+            assert np.isnan(expected)
+        else:
+            assert found[0] == pytest.approx(expected, rel=0, abs=1e-7)
+    assert np.isfinite(vectorized).any() and np.isnan(vectorized).any()
+
+
+# ==============================================================================
+# ThresholdCurve × sklearn.metrics
+# ==============================================================================
+def test_threshold_curve_matches_sklearn():
+    rng = np.random.RandomState(1)
+    y = (rng.rand(2000) < 0.3).astype(int)
+    scores = np.round(np.clip(0.3 * y + rng.rand(2000) * 0.7, 0, 1), 2)   # com empates
+    grid = np.concatenate([[0.0, 1.0, 1.5], np.arange(0.01, 1.0, 0.01), np.unique(scores)[:20]])
+    stats = ThresholdCurve.from_scores(y, scores).at(grid)
+    for i, t in enumerate(grid):
+        pred = (scores >= t).astype(int)
+        tn, fp, fn, tp = confusion_matrix(y, pred, labels=[0, 1]).ravel()
+        assert (stats["tp"][i], stats["fp"][i], stats["fn"][i], stats["tn"][i]) == (tp, fp, fn, tn)
+        assert stats["precision"][i] == pytest.approx(precision_score(y, pred, zero_division=0))
+        assert stats["recall"][i] == pytest.approx(recall_score(y, pred, zero_division=0))
+        assert stats["f1"][i] == pytest.approx(f1_score(y, pred, zero_division=0))
+
+
+# ==============================================================================
+# Target encoding out-of-fold sem vazamento
+# ==============================================================================
+def _te_block(ft: FeatureTransformer, scaled: np.ndarray) -> np.ndarray:
+    """Colunas de target encoding de uma matriz padronizada, na escala original."""
+    cols = slice(len(ft.num_cols), len(ft.num_cols) + len(ft.te_cols))
+    return scaled[:, cols] * ft.scale_[cols] + ft.mean_[cols]
+
+
+def _streaming_oof(df: pd.DataFrame, y: np.ndarray, folds: np.ndarray) -> tuple:
+    ft = FeatureTransformer()
+    for rows in np.array_split(np.arange(len(df)), 3):          # em lotes, como no --streaming
+        ft.partial_fit(df.iloc[rows], y[rows], folds[rows])
+    ft.finish_partial_fit()
+    return ft, _te_block(ft, ft.transform_out_of_fold(df, folds))
+
+
+def test_transform_out_of_fold_does_not_leak(flights):
+    df, y = flights
+    y = y.to_numpy()
+    folds = np.random.RandomState(7).randint(0, FeatureTransformer().n_folds, len(df))
+    ft, base = _streaming_oof(df, y, folds)
+
+    # Trocar os rótulos de um fold não pode mudar o encoding das suas próprias linhas
+    own = folds == 0
+    ft_flipped, flipped = _streaming_oof(df, np.where(own, 1 - y, y), folds)
+    np.testing.assert_allclose(flipped[own], base[own], rtol=0, atol=1e-12)
+    assert not np.allclose(flipped[~own], base[~own])
+
+    # O encoding de cada linha é a média suavizada das linhas dos outros folds
+    col = FEATURES_CAT_TARGET_ENC[0]
+    others = ~own
+    prior = y[others].mean()
+    for key in np.unique(df[col]):
+        match = (df[col] == key).to_numpy()
+        n, s = (match & others).sum(), y[match & others].sum()
+        expected = (s + ft.smoothing * prior) / (n + ft.smoothing)
+        np.testing.assert_allclose(base[match & own, 0], expected, rtol=1e-10)
+
+
+def test_fit_transform_oof_does_not_leak(flights):
+    df, y = flights
+    y = y.to_numpy()
+    ft = FeatureTransformer()
+    base = _te_block(ft, ft.fit_transform(df, y))
+    folds = np.random.RandomState(42).permutation(len(df)) % ft.n_folds   # folds do fit em memória
+    own = folds == 0
+    ft_flipped = FeatureTransformer()
+    flipped = _te_block(ft_flipped, ft_flipped.fit_transform(df, np.where(own, 1 - y, y)))
+    np.testing.assert_allclose(flipped[own], base[own], rtol=0, atol=1e-12)